@@ -1,23 +1,31 @@
-from flask import Flask, jsonify
-from app.models import db
-from flask_jwt_extended import JWTManager
-from flask_cors import CORS
-from app.routes.auth import auth, bcrypt
-from app.routes.post import post_bp
-from app.routes.comment import comment_bp
-from app.routes.health_check import health_check_bp
-from app.routes.chat import chat_bp
-from app.extensions import socketio
-from flask_migrate import Migrate
-from app.models import db
 import os
 import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))  # 🔥 Add this line
-from config import Config
-from webargs.flaskparser import parser
+
+# Keep this module import-light: the offline scripts (train_model.py, build_lexicon.py,
+# export_model.py) import app.utils.* and must not need Flask, boto3 or the server's env.
+# Everything the web app needs is imported in create_app().
 
 def create_app():
+    from flask import Flask, jsonify
+    from flask_jwt_extended import JWTManager
+    from flask_cors import CORS
+    from flask_migrate import Migrate
+    from werkzeug.middleware.proxy_fix import ProxyFix
+    from webargs.flaskparser import parser
+    from config import Config
+    from app.models import db
+    from app.routes.auth import auth, bcrypt
+    from app.routes.post import post_bp
+    from app.routes.comment import comment_bp
+    from app.routes.health_check import health_check_bp
+    from app.routes.chat import chat_bp
+    from app.extensions import socketio
+    from app.utils.revocation import create_revocation_store
+    from app.utils.rate_limit import create_rate_limiter
+    from app.utils import moderation_queue  # registers the Post listeners that enqueue moderation jobs
+
     app = Flask(__name__)
     app.config.from_object(Config)
     db.init_app(app)
@@ -34,21 +42,41 @@ def create_app():
     app.register_blueprint(chat_bp, url_prefix='/api/chat')
 
     # Initialize SocketIO with app
-    socketio.init_app(app, cors_allowed_origins="*")
+    socketio.init_app(app, cors_allowed_origins="*", message_queue=Config.SOCKETIO_MESSAGE_QUEUE or None)
     
     # Import socket event handlers after socketio is initialized
     from app.routes import chat  # This registers the socket event handlers
 
-    # JWT Token blacklist set (should be persistent in production)
-    token_blacklist = set()
+    # Client IP from X-Forwarded-For behind trusted proxies (wraps the Socket.IO middleware too)
+    if Config.TRUSTED_PROXIES > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=Config.TRUSTED_PROXIES)
+
+    # JWT revocation store (backend selected in Config)
+    revocation_store = create_revocation_store(
+        Config.REVOCATION_BACKEND,
+        redis_url=Config.REVOCATION_REDIS_URL,
+        negative_ttl=Config.REVOCATION_NEGATIVE_CACHE_TTL,
+        max_cached=Config.REVOCATION_CACHE_SIZE,
+    )
 
     @jwt.token_in_blocklist_loader
     def is_token_revoked(jwt_header, jwt_payload):
         jti = jwt_payload["jti"]
-        return jti in token_blacklist
+        return revocation_store.is_revoked(jti)
+
+    # Expose the store for use in routes
+    app.revocation_store = revocation_store
 
-    # Expose blacklist for use in routes
-    app.token_blacklist = token_blacklist
+    # Message, typing and comment rate limits (app.rate_limiter is None when disabled)
+    app.rate_limiter = create_rate_limiter(
+        Config.RATE_LIMIT_BACKEND,
+        redis_url=Config.RATE_LIMIT_REDIS_URL,
+        limits={
+            'message': {'user': Config.RATE_LIMIT_MESSAGE_USER, 'ip': Config.RATE_LIMIT_MESSAGE_IP},
+            'typing': {'user': Config.RATE_LIMIT_TYPING_USER, 'ip': Config.RATE_LIMIT_TYPING_IP},
+            'comment': {'user': Config.RATE_LIMIT_COMMENT_USER, 'ip': Config.RATE_LIMIT_COMMENT_IP},
+        },
+    ) if Config.RATE_LIMIT_ENABLED else None
 
     # Error handler for validation
     @parser.error_handler
@@ -1,5 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
+import random
 import uuid
+from datetime import datetime
 
 db = SQLAlchemy()
 
@@ -15,23 +17,43 @@ class Post(db.Model):
     content = db.Column(db.Text, nullable=False)
     user_id = db.Column(db.String(36), db.ForeignKey('user.id'))
     url = db.Column(db.String(255), nullable=True)
+    # Uniform position in the random feed (app/utils/feed.py)
+    random_key = db.Column(db.Float, nullable=False, default=random.random, index=True)
+    # Moderation verdict, filled in by the moderation worker (NULL = not classified yet)
+    is_bullying = db.Column(db.Boolean, nullable=True)
+    bullying_probability = db.Column(db.Float, nullable=True)
+    model_version = db.Column(db.String(16), nullable=True)
+    moderated_at = db.Column(db.DateTime, nullable=True)
+
+    user = db.relationship('User', lazy='select')
 
     def to_dict(self):
         return {
             'id': self.id,
             'content': self.content,
             'user_id': self.user_id,
-            'url': self.url
+            'url': self.url,
+            'is_bullying': self.is_bullying,
+            'bullying_probability': self.bullying_probability
         }
 
 class Comment(db.Model):
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     content = db.Column(db.Text, nullable=False)
     is_bullying = db.Column(db.Boolean, default=False)
+    bullying_probability = db.Column(db.Float, nullable=True)
+    model_version = db.Column(db.String(16), nullable=True)  # Detector version behind is_bullying
     user_id = db.Column(db.String(36), db.ForeignKey('user.id'))
     post_id = db.Column(db.String(36), db.ForeignKey('post.id'))
     created_at = db.Column(db.DateTime, server_default=db.func.now())
 
+    user = db.relationship('User', lazy='select')
+
+    __table_args__ = (
+        db.Index('ix_comment_post_id_created_at', 'post_id', 'created_at'),   # comments of a post, newest first
+        db.Index('ix_comment_user_id_is_bullying', 'user_id', 'is_bullying'), # comment gating, can-chat
+    )
+
 
 class Message(db.Model):
     """Model for storing chat messages with cyberbullying detection"""
@@ -44,7 +66,20 @@ class Message(db.Model):
     timestamp = db.Column(db.DateTime, server_default=db.func.now())
     is_bullying = db.Column(db.Boolean, default=False)
     bullying_probability = db.Column(db.Float, default=0.0)
+    model_version = db.Column(db.String(16), nullable=True)  # Detector version behind is_bullying
     is_read = db.Column(db.Boolean, default=False)
+    seq = db.Column(db.BigInteger, nullable=True)  # Server-assigned, increasing in send order
+
+    __table_args__ = (
+        # History and conversation list, one index per direction
+        db.Index('ix_messages_sender_receiver_timestamp', 'sender', 'receiver', 'timestamp'),
+        db.Index('ix_messages_receiver_sender_timestamp', 'receiver', 'sender', 'timestamp'),
+        # Unread counts per partner
+        db.Index('ix_messages_receiver_is_read_sender', 'receiver', 'is_read', 'sender'),
+        # Bullying counts (can-chat, bullying report)
+        db.Index('ix_messages_sender_is_bullying', 'sender', 'is_bullying'),
+        db.Index('ix_messages_receiver_is_bullying', 'receiver', 'is_bullying'),
+    )
     
     def to_dict(self):
         return {
@@ -55,5 +90,47 @@ class Message(db.Model):
             'timestamp': self.timestamp.isoformat() if self.timestamp else None,
             'is_bullying': self.is_bullying,
             'bullying_probability': self.bullying_probability,
-            'is_read': self.is_read
-        }
\ No newline at end of file
+            'is_read': self.is_read,
+            'seq': self.seq
+        }
+
+class RevokedToken(db.Model):
+    """JWT revoked by /logout; kept until the token itself expires"""
+    __tablename__ = 'revoked_token'
+
+    jti = db.Column(db.String(36), primary_key=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class UserModerationStats(db.Model):
+    """Running bullying counts per user, updated in the same transaction as the flagged row"""
+    __tablename__ = 'user_moderation_stats'
+
+    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), primary_key=True)
+    bullying_comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    bullying_message_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    @property
+    def total(self):
+        return self.bullying_comment_count + self.bullying_message_count
+
+
+class ModerationJob(db.Model):
+    """Pending detector run for a post (app/utils/moderation_queue.py)"""
+    __tablename__ = 'moderation_job'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    post_id = db.Column(db.String(36), db.ForeignKey('post.id'), nullable=False)
+    status = db.Column(db.String(16), nullable=False, default='pending')  # pending, processing, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    enqueued_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    worker = db.Column(db.String(64), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    __table_args__ = (
+        # Claiming the oldest pending jobs, backlog counts
+        db.Index('ix_moderation_job_status_id', 'status', 'id'),
+        db.Index('ix_moderation_job_post_id', 'post_id'),
+    )
@@ -85,10 +85,10 @@ def refresh():
 @jwt_required(refresh=True)
 def logout():
     try:
-        jti = get_jwt()["jti"]
-        # Access the blacklist from the app context
-        current_app.token_blacklist.add(jti)
-        print(current_app.token_blacklist)
+        token = get_jwt()
+        # Revoked until the refresh token would have expired anyway
+        current_app.revocation_store.revoke(token["jti"], token["exp"])
+        print(f"🔒 Revoked token {token['jti']}")
         return jsonify({"msg": "Logout successful"}), 200
     except Exception as e:
         print(e)
@@ -96,7 +96,7 @@ def logout():
 
 # --- New API: List users with bullying comment count (paginated) ---
 from marshmallow import validate
-from app.models import Comment, Message
+from app.models import UserModerationStats
 
 class PaginationSchema(Schema):
     page = fields.Int(load_default=1, validate=validate.Range(min=1))
@@ -109,36 +109,20 @@ def list_users_with_bullying(args):
     try:
         page = args['page']
         limit = args['limit']
-        users_query = User.query.paginate(page=page, per_page=limit, error_out=False)
-        users = users_query.items
-        user_ids = [user.id for user in users]
-        usernames = [user.username for user in users]
+        users_query = db.session.query(User, UserModerationStats).outerjoin(
+            UserModerationStats, UserModerationStats.user_id == User.id
+        ).paginate(page=page, per_page=limit, error_out=False)
         
-        # Count bullying comments
-        bullying_comment_counts = dict(
-            db.session.query(Comment.user_id, db.func.count(Comment.id))
-            .filter(Comment.is_bullying == True, Comment.user_id.in_(user_ids))
-            .group_by(Comment.user_id)
-            .all()
-        )
-        
-        # Count bullying messages (sent by the user)
-        bullying_message_counts = dict(
-            db.session.query(Message.sender, db.func.count(Message.id))
-            .filter(Message.is_bullying == True, Message.sender.in_(usernames))
-            .group_by(Message.sender)
-            .all()
-        )
-        
-        result = [
-            {
+        result = []
+        for user, stats in users_query.items:
+            comment_count = stats.bullying_comment_count if stats else 0
+            message_count = stats.bullying_message_count if stats else 0
+            result.append({
                 'username': user.username,
-                'bullyingCommentCount': bullying_comment_counts.get(user.id, 0),
-                'bullyingMessageCount': bullying_message_counts.get(user.username, 0),
-                'totalBullyingCount': bullying_comment_counts.get(user.id, 0) + bullying_message_counts.get(user.username, 0)
-            }
-            for user in users
-        ]
+                'bullyingCommentCount': comment_count,
+                'bullyingMessageCount': message_count,
+                'totalBullyingCount': comment_count + message_count
+            })
         response = {
             'users': result,
             'total': users_query.total,
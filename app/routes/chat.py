@@ -7,13 +7,43 @@ from flask_socketio import emit, join_room, leave_room
 from app.extensions import socketio
 from app.models import db, Message, User, Comment
 from app.utils.detector import predict_text
+from app.utils.moderation import get_counts, record_bullying
+from app.utils.pagination import encode_cursor, decode_cursor, CursorError
+from app.utils.presence import create_presence_registry
+from app.utils.presence_feed import ContactCache, PresenceFeed
+from app.utils.read_receipts import read_receipts
+from app.utils.message_writer import message_writer, next_seq
 from datetime import datetime
-from sqlalchemy import or_, and_
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from sqlalchemy import or_, and_, case, func
+from config import Config
 
 chat_bp = Blueprint('chat', __name__)
 
-# Store online users: {username: socket_id}
-online_users = {}
+# Who is online, on which sockets (shared between nodes with PRESENCE_BACKEND=redis)
+presence = create_presence_registry(
+    Config.PRESENCE_BACKEND,
+    redis_url=Config.PRESENCE_REDIS_URL,
+    ttl=Config.PRESENCE_TTL,
+)
+
+
+# Join/leave deltas for each user's contacts, batched every PRESENCE_DELTA_MS
+presence_feed = PresenceFeed(
+    presence,
+    ContactCache(ttl=Config.PRESENCE_CONTACTS_TTL),
+    flush_ms=Config.PRESENCE_DELTA_MS,
+)
+
+
+def _on_presence_expired(usernames):
+    """Sweeper callback: users whose sockets expired (their node died) are offline"""
+    print(f"⌛ Presence expired for {', '.join(usernames)}")
+    for username in usernames:
+        presence_feed.record(username, False)
+    if Config.PRESENCE_FULL_BROADCAST:
+        socketio.emit('online_users', presence.online_users())
 
 
 # ============================================
@@ -29,19 +59,30 @@ def handle_connect():
         print("Connection rejected: No username provided")
         return False
     
-    # Store user's socket ID
-    online_users[username] = request.sid
+    # Store user's socket ID (a user may have several)
+    came_online = presence.connect(username, request.sid)
+    presence.start_sweeper(_on_presence_expired)
+    presence_feed.start(current_app._get_current_object())
     
     # Join a personal room for private messaging
     join_room(username)
     
     print(f'✅ {username} connected with session ID: {request.sid}')
     
-    # Notify all clients about the new user
-    emit('user_joined', username, broadcast=True)
+    if came_online:
+        # Contacts learn about it in the next presence delta
+        presence_feed.record(username, True)
+        
+        if Config.PRESENCE_FULL_BROADCAST:
+            # Legacy clients: notify everyone and resend the whole list
+            emit('user_joined', username, broadcast=True)
+            emit('online_users', presence.online_users(), broadcast=True)
+    elif Config.PRESENCE_FULL_BROADCAST:
+        # Another socket of an online user: only this one needs the list
+        emit('online_users', presence.online_users())
     
-    # Send updated online users list to all clients
-    emit('online_users', list(online_users.keys()), broadcast=True)
+    # Starting point for this socket's deltas
+    emit('presence_snapshot', presence_feed.snapshot(username))
     
     return True
 
@@ -49,26 +90,93 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection"""
-    # Find username by session ID
-    username = None
-    for user, sid in list(online_users.items()):
-        if sid == request.sid:
-            username = user
-            break
+    # Remove this socket; the user stays online while another socket is connected
+    username, went_offline = presence.disconnect(request.sid)
     
     if username:
-        # Remove from online users
-        del online_users[username]
-        
         # Leave personal room
         leave_room(username)
         
-        # Update online users list for all clients
-        emit('online_users', list(online_users.keys()), broadcast=True)
+        if went_offline:
+            presence_feed.record(username, False)
+            
+            if Config.PRESENCE_FULL_BROADCAST:
+                # Update online users list for all clients
+                emit('online_users', presence.online_users(), broadcast=True)
         
         print(f'❌ {username} disconnected')
 
 
+@socketio.on('presence_snapshot')
+def handle_presence_snapshot(data=None):
+    """Resend the online contacts with their version (client resync)"""
+    username = presence.user_for(request.sid)
+    if username:
+        emit('presence_snapshot', presence_feed.snapshot(username))
+
+
+# ============================================
+# Message classification
+# ============================================
+
+# Worker pool for classify-after-delivery ('async') and 'hold' modes
+_classification_pool = ThreadPoolExecutor(
+    max_workers=Config.CHAT_CLASSIFY_WORKERS,
+    thread_name_prefix='chat-classifier'
+)
+
+
+def _classify_message(app, message_id, sender, receiver, message_content):
+    """Run the detector for a stored message and write the verdict back"""
+    bullying_result = predict_text(message_content, threshold=0.6)
+    is_bullying = bool(bullying_result['label'])
+    bullying_probability = bullying_result['probability']
+
+    verdict = {
+        'is_bullying': is_bullying,
+        'bullying_probability': bullying_probability,
+        'model_version': bullying_result['model_version']
+    }
+    if Config.CHAT_PERSIST_MODE == 'write_behind':
+        # The row may still be queued; the update is applied after it
+        message_writer.update(message_id, sender, verdict, receiver=receiver)
+    else:
+        with app.app_context():
+            try:
+                Message.query.filter_by(id=message_id).update(verdict, synchronize_session=False)
+                if is_bullying:
+                    record_bullying(username=sender, messages=1)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+    if is_bullying:
+        print(f"⚠️ BULLYING DETECTED in message {message_id}! Probability: {bullying_probability:.2f}")
+        print(f"   Found words: {bullying_result.get('found_lexical', [])}")
+
+    return {
+        'id': message_id,
+        'is_bullying': is_bullying,
+        'bullying_probability': bullying_probability
+    }
+
+
+def _publish_verdict(sender, receiver):
+    """Future callback: push the verdict to both parties as 'message_classified'"""
+    def callback(future):
+        error = future.exception()
+        if error is not None:
+            print(f"❌ Error classifying message: {str(error)}")
+            return
+        verdict = future.result()
+        socketio.emit('message_classified', verdict, room=receiver)
+        socketio.emit('message_classified', verdict, room=sender)
+    return callback
+
+
 @socketio.on('send_message')
 def handle_send_message(data):
     """
@@ -81,6 +189,15 @@ def handle_send_message(data):
         "message": "text content",
         "timestamp": "ISO format timestamp"
     }
+
+    CHAT_CLASSIFY_MODE decides when the detector runs:
+    - 'blocking': classify, then save and deliver (verdict included)
+    - 'async':    save and deliver immediately, verdict follows as 'message_classified'
+    - 'hold':     save, wait up to CHAT_CLASSIFY_HOLD_TIMEOUT for the verdict, then
+                  deliver; if the wait times out the verdict follows as 'message_classified'
+
+    CHAT_PERSIST_MODE decides when it is saved: 'sync' commits before the ack,
+    'write_behind' journals it and leaves the insert to the next group commit.
     """
     try:
         sender = data.get('sender')
@@ -94,52 +211,102 @@ def handle_send_message(data):
             return
         
         # Security check: verify sender matches connected user
-        if online_users.get(sender) != request.sid:
+        if presence.user_for(request.sid) != sender:
             emit('error', {'message': 'Unauthorized: Sender mismatch'})
             print(f"⚠️ Unauthorized message attempt from {sender}")
             return
         
+        # Floods stop here, before the detector and the database
+        limiter = current_app.rate_limiter
+        if limiter is not None:
+            allowed, retry_after = limiter.allow('message', user=sender, ip=request.remote_addr)
+            if not allowed:
+                emit('error', {'message': 'Rate limit exceeded, slow down', 'retry_after': round(retry_after, 2)})
+                return
+        
         # Parse timestamp
         try:
             timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
         except:
             timestamp = datetime.utcnow()
         
-        # 🔍 CYBERBULLYING DETECTION
-        bullying_result = predict_text(message_content, threshold=0.6)
-        is_bullying = bool(bullying_result['label'])
-        bullying_probability = bullying_result['probability']
-        
+        mode = Config.CHAT_CLASSIFY_MODE
         print(f"📝 Message from {sender} to {receiver}")
-        if is_bullying:
-            print(f"⚠️ BULLYING DETECTED! Probability: {bullying_probability:.2f}")
-            print(f"   Found words: {bullying_result.get('found_lexical', [])}")
+
+        if mode == 'blocking':
+            # 🔍 CYBERBULLYING DETECTION
+            bullying_result = predict_text(message_content, threshold=0.6)
+            is_bullying = bool(bullying_result['label'])
+            bullying_probability = bullying_result['probability']
+            model_version = bullying_result['model_version']
+            
+            if is_bullying:
+                print(f"⚠️ BULLYING DETECTED! Probability: {bullying_probability:.2f}")
+                print(f"   Found words: {bullying_result.get('found_lexical', [])}")
+        else:
+            # Verdict is filled in by the classification pool
+            is_bullying = None
+            bullying_probability = None
+            model_version = None
         
-        # Save message to database
-        new_message = Message(
-            sender=sender,
-            receiver=receiver,
-            content=message_content,
-            timestamp=timestamp,
-            is_bullying=is_bullying,
-            bullying_probability=bullying_probability,
-            is_read=False
-        )
-        db.session.add(new_message)
-        db.session.commit()
+        # Save message to database (id and seq are assigned here, so they are known before the insert)
+        row = {
+            'id': str(uuid.uuid4()),
+            'seq': next_seq(),
+            'sender': sender,
+            'receiver': receiver,
+            'content': message_content,
+            'timestamp': timestamp,
+            'is_bullying': bool(is_bullying),
+            'bullying_probability': bullying_probability or 0.0,
+            'model_version': model_version,
+            'is_read': False
+        }
+        if Config.CHAT_PERSIST_MODE == 'write_behind':
+            message_writer.start(current_app._get_current_object())
+            message_writer.add(row)
+        else:
+            db.session.add(Message(**row))
+            if is_bullying:
+                record_bullying(username=sender, messages=1)
+            db.session.commit()
+        presence_feed.contacts.add_pair(sender, receiver)
+
+        if mode != 'blocking':
+            app = current_app._get_current_object()
+            classification = _classification_pool.submit(
+                _classify_message, app, row['id'], sender, receiver, message_content
+            )
+            verdict = None
+            if mode == 'hold':
+                try:
+                    verdict = classification.result(timeout=Config.CHAT_CLASSIFY_HOLD_TIMEOUT)
+                except FutureTimeoutError:
+                    print(f"⏱️ Classification of {row['id']} timed out - delivering unclassified")
+                except Exception as e:
+                    print(f"❌ Error classifying message: {str(e)}")
+            if verdict is not None:
+                is_bullying = verdict['is_bullying']
+                bullying_probability = verdict['bullying_probability']
+            else:
+                classification.add_done_callback(_publish_verdict(sender, receiver))
         
         # Prepare message data for transmission
         message_data = {
-            'id': new_message.id,
+            'id': row['id'],
+            'seq': row['seq'],
             'sender': sender,
             'message': message_content,
             'timestamp': timestamp.isoformat(),
             'is_bullying': is_bullying,
             'bullying_probability': bullying_probability
         }
+        if is_bullying is None:
+            message_data['classification'] = 'pending'
         
-        # Send to receiver if online (to their personal room)
-        if receiver in online_users:
+        # Send to receiver if online (to their personal room, on whichever node)
+        receiver_online = presence.is_online(receiver)
+        if receiver_online:
             emit('receive_message', message_data, room=receiver)
             print(f"✉️ Message delivered to {receiver}")
         else:
@@ -147,8 +314,9 @@ def handle_send_message(data):
         
         # Confirm to sender
         emit('message_sent', {
-            'id': new_message.id,
-            'status': 'delivered' if receiver in online_users else 'saved',
+            'id': row['id'],
+            'seq': row['seq'],
+            'status': 'delivered' if receiver_online else 'saved',
             'is_bullying': is_bullying
         })
         
@@ -166,22 +334,14 @@ def handle_mark_as_read(data):
         username = data.get('username')
         
         # Verify user authorization
-        if online_users.get(username) != request.sid:
+        if presence.user_for(request.sid) != username:
             return
         
-        # Update messages
-        Message.query.filter(
-            Message.id.in_(message_ids),
-            Message.receiver == username
-        ).update({'is_read': True}, synchronize_session=False)
-        
-        db.session.commit()
-        
-        emit('messages_marked_read', {'count': len(message_ids)})
+        # Written with the other receipts of this window; 'messages_marked_read' follows the write
+        read_receipts.add(username, message_ids, sid=request.sid)
         
     except Exception as e:
         print(f"❌ Error marking messages as read: {str(e)}")
-        db.session.rollback()
 
 
 @socketio.on('typing')
@@ -191,8 +351,15 @@ def handle_typing(data):
     receiver = data.get('receiver')
     is_typing = data.get('is_typing', False)
     
+    # Excess typing events are dropped silently
+    limiter = current_app.rate_limiter
+    if limiter is not None:
+        allowed, _ = limiter.allow('typing', user=presence.user_for(request.sid), ip=request.remote_addr)
+        if not allowed:
+            return
+    
     # Send typing status to receiver if online
-    if receiver in online_users:
+    if presence.is_online(receiver):
         emit('user_typing', {
             'sender': sender,
             'is_typing': is_typing
@@ -207,10 +374,11 @@ def handle_typing(data):
 @jwt_required()
 def get_messages(username):
     """
-    Get message history between current user and specified user
+    Get message history between current user and specified user, newest page first
     Query params:
     - limit: number of messages to return (default: 50)
-    - offset: pagination offset (default: 0)
+    - cursor: next_cursor from the previous page, to scroll further back
+    - offset: legacy pagination offset (default: 0), ignored when cursor is given
     """
     current_user_id = get_jwt_identity()
     
@@ -220,43 +388,98 @@ def get_messages(username):
         return jsonify({'msg': 'User not found'}), 404
     
     current_username = current_user_obj.username
-    limit = request.args.get('limit', 50, type=int)
+    limit = max(1, request.args.get('limit', 50, type=int))
     offset = request.args.get('offset', 0, type=int)
-    print(f"Fetching messages between {current_username} and {username} (limit={limit}, offset={offset})")
-    
-    # Fetch messages between the two users
-    messages = Message.query.filter(
-        or_(
-            and_(Message.sender == current_username, Message.receiver == username),
-            and_(Message.sender == username, Message.receiver == current_username)
-        )
-    ).order_by(Message.timestamp.desc()).limit(limit).offset(offset).all()
-    
-    # Mark received messages as read
-    unread_message_ids = [
+    cursor = request.args.get('cursor')
+    print(f"Fetching messages between {current_username} and {username} (limit={limit}, "
+          f"{'cursor' if cursor else f'offset={offset}'})")
+    
+    message_writer.sync(current_username)  # include their messages still waiting for a group commit
+    
+    before = None
+    if cursor:
+        try:
+            before = decode_cursor(cursor, ('ts', 'id'), ('ts',))
+        except CursorError as e:
+            return jsonify({'msg': str(e)}), 400
+    
+    # One extra row tells whether there is another page
+    if offset and not cursor:
+        # Legacy offset paging: cost grows with the offset
+        messages = Message.query.filter(
+            or_(
+                and_(Message.sender == current_username, Message.receiver == username),
+                and_(Message.sender == username, Message.receiver == current_username)
+            )
+        ).order_by(Message.timestamp.desc(), Message.id.desc()).offset(offset).limit(limit + 1).all()
+    else:
+        messages = message_history(current_username, username, limit + 1, before=before)
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    next_cursor = encode_cursor(ts=messages[-1].timestamp, id=messages[-1].id) if has_more else None
+    
+    # Mark received messages as read (coalesced with other receipts, written in the next flush)
+    unread_message_ids = {
         msg.id for msg in messages 
         if msg.receiver == current_username and not msg.is_read
-    ]
+    }
     
     if unread_message_ids:
-        Message.query.filter(Message.id.in_(unread_message_ids)).update(
-            {'is_read': True}, 
-            synchronize_session=False
-        )
-        db.session.commit()
+        read_receipts.add(current_username, unread_message_ids)
+        # Report what this reader has read: stored flags plus their queued receipts
+        unread_message_ids &= read_receipts.pending_ids(current_username)
     
     # Return messages in chronological order (oldest first)
+    message_dicts = [msg.to_dict() for msg in reversed(messages)]
+    for message in message_dicts:
+        if message['id'] in unread_message_ids:
+            message['is_read'] = True
+    
     return jsonify({
-        'messages': [msg.to_dict() for msg in reversed(messages)],
+        'messages': message_dicts,
         'total': len(messages),
-        'has_more': len(messages) == limit
+        'has_more': has_more,
+        'next_cursor': next_cursor
     }), 200
 
 
+def message_history(user, partner, limit, before=None):
+    """
+    Newest `limit` messages between two users, ordered by (timestamp, id)
+    descending, optionally strictly older than `before` (a decoded cursor
+    {'ts', 'id'}).
+
+    Each direction is read separately so that it is a seek on the
+    (sender, receiver, timestamp) index that stops after `limit` rows; the
+    two short lists are then merged. Cost does not depend on how far back
+    the cursor points.
+    """
+    directions = [(user, partner)] if user == partner else [(user, partner), (partner, user)]
+    messages = []
+    for sender, receiver in directions:
+        query = Message.query.filter(Message.sender == sender, Message.receiver == receiver)
+        if before is not None:
+            query = query.filter(or_(
+                Message.timestamp < before['ts'],
+                and_(Message.timestamp == before['ts'], Message.id < before['id'])
+            ))
+        messages += query.order_by(Message.timestamp.desc(), Message.id.desc()).limit(limit).all()
+    messages.sort(key=lambda m: (m.timestamp, m.id), reverse=True)
+    return messages[:limit]
+
+
+MAX_CONVERSATIONS_PAGE = 200
+
+
 @chat_bp.route('/conversations', methods=['GET'])
 @jwt_required()
 def get_conversations():
-    """Get list of users the current user has chatted with"""
+    """
+    Get list of users the current user has chatted with, most recent first
+    Query params (optional; without them every conversation is returned):
+    - limit: number of conversations per page (max: MAX_CONVERSATIONS_PAGE)
+    - cursor: next_cursor from the previous page
+    """
     current_user_id = get_jwt_identity()
     
     # Get current user's username from ID
@@ -265,50 +488,85 @@ def get_conversations():
         return jsonify({'msg': 'User not found'}), 404
     
     current_username = current_user_obj.username
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = max(1, min(limit, MAX_CONVERSATIONS_PAGE))
+    try:
+        after = decode_cursor(request.args['cursor'], ('ts', 'partner'), ('ts',)) if request.args.get('cursor') else None
+    except CursorError as e:
+        return jsonify({'msg': str(e)}), 400
+    
+    message_writer.sync(current_username)  # include their messages still waiting for a group commit
+    # Unread counts leave out this user's queued receipts instead of waiting for their flush
+    rows = conversation_summaries(current_username, limit=limit, after=after,
+                                  read_ids=read_receipts.pending_ids(current_username))
+    has_more = limit is not None and len(rows) > limit
+    rows = rows[:limit] if has_more else rows
+    
+    online = presence.online_among([partner for _, partner, _ in rows])
+    conversations = [{
+        'username': partner,
+        'unread_count': int(unread_count or 0),
+        'last_message': last_message.to_dict(),
+        'is_online': partner in online
+    } for last_message, partner, unread_count in rows]
+    
+    next_cursor = None
+    if has_more:
+        last_message, partner, _ = rows[-1]
+        next_cursor = encode_cursor(ts=last_message.timestamp, partner=partner)
     
-    # Get unique users from sent and received messages
-    sent_to = db.session.query(Message.receiver).filter(
-        Message.sender == current_username
-    ).distinct().all()
-    
-    received_from = db.session.query(Message.sender).filter(
-        Message.receiver == current_username
-    ).distinct().all()
-    
-    # Combine and deduplicate
-    conversation_users = set([user[0] for user in sent_to] + [user[0] for user in received_from])
-    
-    # Get unread count for each conversation
-    conversations = []
-    for username in conversation_users:
-        unread_count = Message.query.filter(
-            Message.sender == username,
-            Message.receiver == current_username,
-            Message.is_read == False
-        ).count()
-        
-        # Get last message
-        last_message = Message.query.filter(
-            or_(
-                and_(Message.sender == current_username, Message.receiver == username),
-                and_(Message.sender == username, Message.receiver == current_username)
-            )
-        ).order_by(Message.timestamp.desc()).first()
-        
-        conversations.append({
-            'username': username,
-            'unread_count': unread_count,
-            'last_message': last_message.to_dict() if last_message else None,
-            'is_online': username in online_users
-        })
-    
-    # Sort by last message timestamp
-    conversations.sort(
-        key=lambda x: x['last_message']['timestamp'] if x['last_message'] else '',
-        reverse=True
-    )
-    
-    return jsonify({'conversations': conversations}), 200
+    return jsonify({
+        'conversations': conversations,
+        'has_more': has_more,
+        'next_cursor': next_cursor
+    }), 200
+
+
+def conversation_summaries(username, limit=None, after=None, read_ids=None):
+    """
+    One row per conversation partner of `username`: (last Message, partner,
+    unread count), newest conversation first, ties broken by partner name.
+
+    Built as a single statement: a window over the user's messages numbers
+    them per partner (newest first) and sums the unread ones, and the outer
+    query keeps the newest row of each partner. `after` is a decoded cursor
+    ({'ts', 'partner'}) and `limit` fetches one extra row to detect more pages.
+    `read_ids` are message ids to count as read although not stored as such
+    (queued read receipts).
+    """
+    partner = case((Message.sender == username, Message.receiver), else_=Message.sender)
+    is_unread = and_(Message.receiver == username, Message.is_read == False)
+    if read_ids:
+        is_unread = and_(is_unread, Message.id.notin_(list(read_ids)))
+    unread = case((is_unread, 1), else_=0)
+    ranked = db.session.query(
+        Message.id.label('id'),
+        partner.label('partner'),
+        Message.timestamp.label('last_timestamp'),
+        func.row_number().over(
+            partition_by=partner,
+            order_by=(Message.timestamp.desc(), Message.id.desc())
+        ).label('rn'),
+        func.sum(unread).over(partition_by=partner).label('unread_count'),
+    ).filter(
+        or_(Message.sender == username, Message.receiver == username)
+    ).subquery()
+    
+    query = db.session.query(Message, ranked.c.partner, ranked.c.unread_count).join(
+        ranked, Message.id == ranked.c.id
+    ).filter(ranked.c.rn == 1)
+    
+    if after is not None:
+        query = query.filter(or_(
+            ranked.c.last_timestamp < after['ts'],
+            and_(ranked.c.last_timestamp == after['ts'], ranked.c.partner > after['partner'])
+        ))
+    
+    query = query.order_by(ranked.c.last_timestamp.desc(), ranked.c.partner)
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return query.all()
 
 
 @chat_bp.route('/online-users', methods=['GET'])
@@ -327,10 +585,11 @@ def get_online_users():
     # Get all users except current user
     users = User.query.filter(User.username != current_username).all()
     
+    online = presence.online_among([user.username for user in users])
     users_list = [{
         'username': user.username,
         'email': user.email,
-        'is_online': user.username in online_users
+        'is_online': user.username in online
     } for user in users]
     
     return jsonify({'users': users_list}), 200
@@ -356,10 +615,7 @@ def get_bullying_report():
     ).count()
     
     # Messages sent by current user that were flagged as bullying
-    sent_bullying = Message.query.filter(
-        Message.sender == current_username,
-        Message.is_bullying == True
-    ).count()
+    _, sent_bullying = get_counts(current_user_id)
     
     return jsonify({
         'received_bullying_count': received_bullying,
@@ -389,17 +645,8 @@ def can_chat():
         # Get MAX_BULLYING_COUNT from config
         max_bullying_count = current_app.config.get('MAX_BULLYING_COUNT', 5)
         
-        # Count bullying comments by this user
-        bullying_comments_count = Comment.query.filter(
-            Comment.user_id == current_user_id,
-            Comment.is_bullying == True
-        ).count()
-        
-        # Count bullying chat messages sent by this user
-        bullying_messages_count = Message.query.filter(
-            Message.sender == current_username,
-            Message.is_bullying == True
-        ).count()
+        # Bullying comments and chat messages by this user (one primary-key read)
+        bullying_comments_count, bullying_messages_count = get_counts(current_user_id)
         
         # Total bullying count
         total_bullying_count = bullying_comments_count + bullying_messages_count
@@ -1,9 +1,12 @@
-from flask import Blueprint, request, jsonify
+import math
+from flask import Blueprint, request, jsonify, current_app
 from app.models import db, Comment
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.utils.detector import is_bullying
+from app.utils.detector import predict_text
+from app.utils.moderation import get_counts, record_bullying
 from marshmallow import Schema, fields
 from webargs.flaskparser import use_args
+from sqlalchemy.orm import joinedload
 from config import Config
 
 comment_bp = Blueprint('comment', __name__)
@@ -18,38 +21,70 @@ def comment(args, post_id):
     try:
         user_id = get_jwt_identity()
         
+        # Comment floods are turned away before the detector runs
+        limiter = current_app.rate_limiter
+        if limiter is not None:
+            allowed, retry_after = limiter.allow('comment', user=user_id, ip=request.remote_addr)
+            if not allowed:
+                response = jsonify({"msg": "Too many comments, slow down", "retry_after": round(retry_after, 2)})
+                response.headers['Retry-After'] = str(math.ceil(retry_after))
+                return response, 429
+        
         # Check if user has more than allowed bullying comments
-        bullying_count = Comment.query.filter_by(user_id=user_id, is_bullying=True).count()
+        bullying_count, _ = get_counts(user_id)
         if bullying_count >= Config.MAX_BULLYING_COUNT:
             return jsonify({"msg": "user is blocked from commenting"}), 403
         
-        is_bully = is_bullying(args['content'])
-        comment = Comment(content=args['content'], user_id=user_id, post_id=post_id, is_bullying=is_bully)
+        result = predict_text(args['content'], threshold=0.6)
+        is_bully = bool(result['label'])
+        comment = Comment(content=args['content'], user_id=user_id, post_id=post_id, is_bullying=is_bully,
+                          bullying_probability=result['probability'], model_version=result['model_version'])
         db.session.add(comment)
+        if is_bully:
+            record_bullying(user_id=user_id, comments=1)
         db.session.commit()
         return jsonify({"msg": "Comment added", "isCyberbullying": is_bully})
     except Exception as e:
         db.session.rollback()
         return jsonify({"msg": "Failed to create comment"}), 400
     
+MAX_COMMENTS_PAGE = 500
+
+
 @comment_bp.route('/comments/<string:post_id>', methods=['GET'])
 @jwt_required()
 def get_comments(post_id):
+    """
+    Comments of a post, newest first, as a JSON list
+    Query params:
+    - page: page number (default: 1)
+    - per_page: comments per page (default: 100, max: MAX_COMMENTS_PAGE)
+    Paging info is returned in the X-Page, X-Per-Page and X-Has-More headers.
+    """
     try:
-        from app.models import User
-        comments = Comment.query.filter_by(post_id=post_id).order_by(Comment.created_at.desc()).all()
+        page = max(1, request.args.get('page', 1, type=int))
+        per_page = max(1, min(request.args.get('per_page', 100, type=int), MAX_COMMENTS_PAGE))
+        # Authors are loaded in the same query; one extra row tells whether there is another page
+        comments = Comment.query.options(joinedload(Comment.user))\
+                                .filter_by(post_id=post_id)\
+                                .order_by(Comment.created_at.desc(), Comment.id.desc())\
+                                .offset((page - 1) * per_page).limit(per_page + 1).all()
+        has_more = len(comments) > per_page
         comments_list = []
-        for comment in comments:
-            user = User.query.filter_by(id=comment.user_id).first()
+        for comment in comments[:per_page]:
             comments_list.append({
                 'id': comment.id,
                 'content': comment.content,
                 'user_id': comment.user_id,
-                'username': user.username if user else None,
+                'username': comment.user.username if comment.user else None,
                 'is_bullying': comment.is_bullying,
                 'created_at': comment.created_at
             })
-        return jsonify(comments_list)
+        response = jsonify(comments_list)
+        response.headers['X-Page'] = str(page)
+        response.headers['X-Per-Page'] = str(per_page)
+        response.headers['X-Has-More'] = 'true' if has_more else 'false'
+        return response
     except Exception as e:
         print(e)
-        return jsonify({"msg": "Failed to fetch comments"}), 400
\ No newline at end of file
+        return jsonify({"msg": "Failed to fetch comments"}), 400
@@ -1,7 +1,29 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, current_app
+from app.utils.moderation_queue import queue_stats
+from app.utils.read_receipts import read_receipts
+from app.utils.message_writer import message_writer
 
 health_check_bp = Blueprint('health_check', __name__)
 
 @health_check_bp.route('/', methods=['GET'])
 def health_check_api():
     return jsonify({"message": "Server Listening"}), 200
+
+
+@health_check_bp.route('/stats', methods=['GET'])
+def stats_api():
+    from app.utils import detector
+    from app.routes import chat
+    return jsonify({"detector": {
+        "ready": detector.is_ready(),
+        "model_version": detector.MODEL_VERSION,
+        "batcher": detector.batcher.stats(),
+        "cache": detector.prediction_cache.stats() if detector.prediction_cache else None,
+        "service": detector.service.stats() if detector.service else None,
+    }, "revocation": current_app.revocation_store.stats(),
+       "rate_limit": current_app.rate_limiter.stats() if current_app.rate_limiter else None,
+       "moderation_queue": queue_stats(),
+       "read_receipts": read_receipts.stats(),
+       "message_writer": message_writer.stats(),
+       "presence": chat.presence.stats(),
+       "presence_feed": chat.presence_feed.stats()}), 200
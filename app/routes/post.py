@@ -1,8 +1,11 @@
 from flask import Blueprint, request, jsonify
 from app.models import db, Post
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
 from marshmallow import Schema, fields
 from webargs.flaskparser import use_args
+from app.utils.feed import CachedCount, feed_position, new_seed, random_feed_page, stable_seed
+from app.utils.pagination import encode_cursor, decode_cursor, CursorError
+from config import Config
 import boto3
 
 post_bp = Blueprint('post', __name__)
@@ -90,6 +93,7 @@ def create_post(args):
         )
         db.session.add(post)
         db.session.commit()
+        post_count.invalidate()
         return jsonify({"msg": "Post created"}), 201
     except Exception as e:
         db.session.rollback()
@@ -108,35 +112,69 @@ def get_posts():
     except Exception as e:
         return jsonify({"msg": "Failed to get posts"}), 400
 
+MAX_POSTS_PAGE = 100
+
+# Post count for the random feed's 'total', refreshed every FEED_COUNT_CACHE_SECONDS
+post_count = CachedCount(Post, ttl=Config.FEED_COUNT_CACHE_SECONDS)
+
+
 @post_bp.route('/posts/random', methods=['GET'])
 @jwt_required()
 def get_random_posts():
+    """
+    Random feed, stable per seed
+    Query params:
+    - per_page: posts per page (default: 10, max: MAX_POSTS_PAGE)
+    - cursor: next_cursor from the previous page (carries the seed)
+    - seed: start a feed with this seed in [0, 1) instead of a new one
+    - page: legacy page number within the seed's feed (default: 1); without a seed
+      or cursor the seed is derived from the access token (its jti), so it stays the
+      same until the client logs in again. Clients should send the returned 'seed'
+      back with ?page=N (or follow next_cursor) to keep one feed across tokens.
+    """
     try:
         # Get page number and size from query params, default to page 1 and 10 items
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
+        page = max(1, request.args.get('page', 1, type=int))
+        per_page = max(1, min(request.args.get('per_page', 10, type=int), MAX_POSTS_PAGE))
+
+        after = None
+        if request.args.get('cursor'):
+            try:
+                after = decode_cursor(request.args['cursor'], ('seed', 'key', 'id', 'wrapped'))
+            except CursorError as e:
+                return jsonify({'msg': str(e)}), 400
+            seed = after['seed']
+            if not isinstance(seed, (int, float)) or not 0 <= seed < 1:
+                return jsonify({'msg': 'Invalid cursor: bad seed'}), 400
+            offset = 0
+        else:
+            seed = request.args.get('seed', type=float)
+            if seed is None or not 0 <= seed < 1:
+                # Legacy clients page without the seed: keep it stable across their pages
+                seed = stable_seed(get_jwt()['jti']) \
+                    if 'page' in request.args else new_seed()
+            offset = (page - 1) * per_page
+
+        # One extra post tells whether there is another page
+        posts = random_feed_page(seed, per_page + 1, after=after, offset=offset)
+        has_more = len(posts) > per_page
+        posts = posts[:per_page]
 
-        # Query posts with random order and pagination
-        posts = Post.query.order_by(db.func.random())\
-                         .paginate(page=page, per_page=per_page, error_out=False)
-
-        from app.models import User
         posts_with_usernames = []
-        for post in posts.items:
-            user = User.query.filter_by(id=post.user_id).first()
+        for post in posts:
             post_dict = post.to_dict()
-            post_dict['username'] = user.username if user else None
+            post_dict['username'] = post.user.username if post.user else None
             posts_with_usernames.append(post_dict)
         response = {
             'posts': posts_with_usernames,
-            'total': posts.total,
-            'pages': posts.pages,
-            'current_page': posts.page
+            'total': post_count.get(),
+            'pages': post_count.pages(per_page),
+            'current_page': page,
+            'seed': seed,
+            'has_more': has_more,
+            'next_cursor': encode_cursor(seed=seed, **feed_position(seed, posts[-1])) if has_more else None
         }
         return jsonify(response), 200
     except Exception as e:
         print(e)
         return jsonify({"msg": "Failed to fetch random posts"}), 400
-
-
-    
\ No newline at end of file
@@ -0,0 +1,42 @@
+"""
+Locations and versioning of the files produced by train_model.py
+"""
+import hashlib
+import os
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MODEL_DIR = os.path.join(BASE_DIR, "models")
+TRAIN_CSV = os.path.join(BASE_DIR, "cyberbullying_data.csv")
+
+TOKENIZER_FILE = "tokenizer.json"
+MODEL_FILE = "bully_model.h5"
+NUMPY_MODEL_FILE = "bully_model.npz"
+LEXICON_FILE = "lexicon.bin"
+
+# Files that together define "the model" being served
+MODEL_FILES = (TOKENIZER_FILE, MODEL_FILE, NUMPY_MODEL_FILE)
+
+
+def file_digest(path):
+    """Short content hash of one file, None when it does not exist"""
+    if not os.path.exists(path):
+        return None
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def model_version(model_dir=MODEL_DIR):
+    """Short content hash of the tokenizer and model weights currently on disk"""
+    h = hashlib.sha256()
+    for name in MODEL_FILES:
+        path = os.path.join(model_dir, name)
+        if not os.path.exists(path):
+            continue
+        h.update(name.encode('utf-8'))
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+    return h.hexdigest()[:16]
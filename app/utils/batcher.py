@@ -0,0 +1,163 @@
+"""
+Micro-batching front end for the cyberbullying detector.
+
+Concurrent callers (chat messages, comments) submit single texts; a
+background thread gathers them into one batch and runs a single forward
+pass when the batch is full or the latency budget of the oldest request
+runs out. Each caller gets back its own result, or an exception: every
+future of a batch is resolved, even when `infer_fn` fails or returns the
+wrong number of results. A caller that stops waiting (predict() timeout)
+cancels its request, and the batch skips it if it has not started yet.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+
+class _Request:
+    __slots__ = ('text', 'threshold', 'future', 'enqueued_at')
+
+    def __init__(self, text, threshold):
+        self.text = text
+        self.threshold = threshold
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class InferenceBatcher:
+    """
+    Gather single predictions into batches for `infer_fn`.
+
+    `infer_fn(texts, thresholds)` must return one result per text, in order.
+    """
+
+    def __init__(self, infer_fn, max_batch_size=32, max_wait_ms=5.0, max_queue_size=1024):
+        self.infer_fn = infer_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue(maxsize=max(1, int(max_queue_size)))
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        # Counters
+        self._batches = 0
+        self._items = 0
+        self._full_flushes = 0
+        self._rejected = 0
+        self._cancelled = 0
+        self._short_results = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    def submit(self, text, threshold=0.5):
+        """Queue a text and return a Future resolving to its result (raises queue.Full)"""
+        self._ensure_started()
+        req = _Request(text, threshold)
+        try:
+            self._queue.put_nowait(req)
+        except queue.Full:
+            with self._stats_lock:
+                self._rejected += 1
+            raise
+        return req.future
+
+    def predict(self, text, threshold=0.5, timeout=None):
+        """Blocking helper: submit and wait for the result (raises concurrent.futures.TimeoutError)"""
+        future = self.submit(text, threshold)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()  # not run yet: leave it out of its batch
+            raise
+
+    def stats(self):
+        with self._stats_lock:
+            batches = self._batches
+            items = self._items
+            return {
+                'batches': batches,
+                'items': items,
+                'full_flushes': self._full_flushes,
+                'rejected': self._rejected,
+                'cancelled': self._cancelled,
+                'short_results': self._short_results,
+                'queue_depth': self._queue.qsize(),
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'avg_batch_size': items / batches if batches else 0.0,
+                'batch_fill_rate': items / (batches * self.max_batch_size) if batches else 0.0,
+                'avg_queue_wait_ms': (self._queue_wait_total / items) * 1000.0 if items else 0.0,
+                'max_queue_wait_ms': self._queue_wait_max * 1000.0,
+            }
+
+    # -----------------------------
+    # Worker
+    # -----------------------------
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='detector-batcher', daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    # Budget spent: only take what is already waiting
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self._flush(batch)
+
+    def _flush(self, batch):
+        # Requests whose caller gave up before the batch ran are dropped
+        live = [req for req in batch if req.future.set_running_or_notify_cancel()]
+        if len(live) < len(batch):
+            with self._stats_lock:
+                self._cancelled += len(batch) - len(live)
+        batch = live
+        if not batch:
+            return
+
+        started = time.perf_counter()
+        waits = [started - req.enqueued_at for req in batch]
+        with self._stats_lock:
+            self._batches += 1
+            self._items += len(batch)
+            if len(batch) >= self.max_batch_size:
+                self._full_flushes += 1
+            self._queue_wait_total += sum(waits)
+            self._queue_wait_max = max(self._queue_wait_max, max(waits))
+
+        try:
+            results = list(self.infer_fn([req.text for req in batch], [req.threshold for req in batch]))
+            if len(results) != len(batch):
+                # Cannot tell which result belongs to whom: fail the whole batch
+                with self._stats_lock:
+                    self._short_results += 1
+                raise RuntimeError(f"Detector returned {len(results)} results for {len(batch)} texts")
+        except Exception as e:
+            for req in batch:
+                req.future.set_exception(e)
+            return
+
+        for req, result in zip(batch, results):
+            req.future.set_result(result)
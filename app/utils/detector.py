@@ -1,117 +1,296 @@
-import os
-import re
-import numpy as np
-import pandas as pd
-from collections import Counter
-from tensorflow.keras.preprocessing.sequence import pad_sequences
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing.text import tokenizer_from_json
-from tensorflow.keras.layers import Layer
-import tensorflow as tf
+"""
+Cyberbullying detector.
 
-# -----------------------------
-# Custom Layer Definition (1D weight to match saved model)
-# -----------------------------
-class SimpleAttention(Layer):
-    def __init__(self, **kwargs):
-        super(SimpleAttention, self).__init__(**kwargs)
-
-    def build(self, input_shape):
-        # 1D attention weight vector
-        self.W = self.add_weight(
-            name='att_weight',
-            shape=(input_shape[-1],),  # match saved model
-            initializer='random_normal',
-            trainable=True
-        )
-        super(SimpleAttention, self).build(input_shape)
-
-    def call(self, x):
-        # Compute attention scores
-        e = tf.keras.backend.tanh(tf.keras.backend.dot(x, tf.expand_dims(self.W, -1)))
-        a = tf.keras.backend.softmax(e, axis=1)
-        output = x * a
-        return tf.keras.backend.sum(output, axis=1)
+Importing this module is cheap: the model, the tokenizer and the lexicon
+are loaded on first use (or by an explicit `warmup()`), so migrations and
+CLI scripts that import the app never pay for them. TensorFlow is only
+imported when DETECTOR_BACKEND is 'keras'; the 'numpy' backend serves the
+exported bully_model.npz without it.
+
+Everything one prediction needs (tokenizer, model, lexicon matcher, model
+version) lives in one immutable _Bundle. A hot reload builds a new bundle
+and swaps it in with a single assignment, and every call reads `_bundle`
+once, so a request never mixes the old tokenizer with the new model.
+"""
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from app.utils.artifacts import (MODEL_DIR, TRAIN_CSV, TOKENIZER_FILE, MODEL_FILE, NUMPY_MODEL_FILE,
+                                 MODEL_FILES, LEXICON_FILE, file_digest, model_version)
+from app.utils.batcher import InferenceBatcher
+from app.utils.detector_service import DetectorServiceClient, DetectorServiceError
+from app.utils.lexicon import LexiconError, LexiconMatcher, generate_bad_words, load_lexicon
+from app.utils.prediction_cache import create_prediction_cache, make_key
+from app.utils.text import clean_text, clean_text_cached
+from app.utils.tokenizer import load_tokenizer, pad_sequences
+from config import Config
 
 # -----------------------------
 # Paths and constants
 # -----------------------------
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-MODEL_DIR = os.path.join(BASE_DIR, "models")
-TRAIN_CSV = os.path.join(BASE_DIR, "cyberbullying_data.csv")
 MAX_LEN = 100
 
 # -----------------------------
-# Text Cleaning
+# Lazy loading
 # -----------------------------
-def clean_text(t):
-    t = str(t).lower()
-    t = re.sub(r'http\S+', ' ', t)
-    t = re.sub(r'@\w+', ' @user ', t)
-    t = re.sub(r'[^a-z0-9@#\s\!\?\.\,\'\u2600-\u27BF]+', ' ', t)
-    t = re.sub(r'\s+', ' ', t).strip()
-    return t
+_Bundle = namedtuple('_Bundle', 'tokenizer model matcher bad_words version')
+_bundle = None  # swapped as a whole on (re)load; read it once per call
 
-# -----------------------------
-# Load Tokenizer
-# -----------------------------
-with open(os.path.join(MODEL_DIR, "tokenizer.json"), "r") as f:
-    tk_json = f.read()
-tokenizer = tokenizer_from_json(tk_json)
+# Mirrors of _bundle for scripts and /stats (inference reads _bundle)
+tokenizer = None
+model = None
+BAD_WORDS = None
+MODEL_VERSION = None
+prediction_cache = None
+_file_signature = None
+_last_update_check = 0.0
+_load_lock = threading.Lock()
+_warmup_thread = None
 
-# -----------------------------
-# Load Model with custom layer
-# -----------------------------
-model = load_model(os.path.join(MODEL_DIR, "bully_model.h5"),
-                   compile=False,
-                   custom_objects={'SimpleAttention': SimpleAttention})
+# Out-of-process inference (run_detector_service.py), with in-process fallback
+service = DetectorServiceClient(
+    Config.DETECTOR_SERVICE_SOCKET,
+    timeout=Config.DETECTOR_SERVICE_TIMEOUT,
+    retry_after=Config.DETECTOR_SERVICE_RETRY_SECONDS,
+    health_ttl=Config.DETECTOR_SERVICE_HEALTH_SECONDS,
+) if Config.DETECTOR_SERVICE_SOCKET else None
+
+def _load_tokenizer():
+    return load_tokenizer(os.path.join(MODEL_DIR, TOKENIZER_FILE))
+
+def _load_keras_model():
+    from tensorflow.keras.models import load_model
+    from app.utils.layers import SimpleAttention
+    return load_model(os.path.join(MODEL_DIR, MODEL_FILE),
+                      compile=False,
+                      custom_objects={'SimpleAttention': SimpleAttention})
+
+def _load_numpy_model():
+    from app.utils.numpy_backend import NumpyBullyModel
+    return NumpyBullyModel.load(os.path.join(MODEL_DIR, NUMPY_MODEL_FILE),
+                                buckets=Config.DETECTOR_LENGTH_BUCKETS)
+
+def _load_model():
+    """Inference backend selected by DETECTOR_BACKEND ('keras' or 'numpy')"""
+    backend = Config.DETECTOR_BACKEND
+    if backend == 'numpy':
+        return _load_numpy_model()
+    if backend == 'keras':
+        return _load_keras_model()
+    raise ValueError(f"Unknown detector backend: {backend}")
+
+def _load_lexicon():
+    """
+    Load the precompiled lexicon. It is rebuilt from the training CSV when it
+    is missing, damaged or was built from a different CSV (when the CSV is
+    not deployed, a valid artifact is used as is).
+    """
+    path = os.path.join(MODEL_DIR, LEXICON_FILE)
+    header = {}
+    try:
+        words, header = load_lexicon(path)
+        source = file_digest(TRAIN_CSV)
+        if source is None or header.get('source_sha256') == source:
+            return words
+        print(f"❌ Lexicon {path} was built from another training CSV ({header.get('source_sha256')}, "
+              f"current {source}) - rebuilding it from the CSV. Run 'python build_lexicon.py'.")
+    except LexiconError as e:
+        print(f"❌ {e}")
+
+    if os.path.exists(TRAIN_CSV):
+        print("⚠️ Falling back to building the lexicon from the training CSV")
+        params = {k: header[k] for k in ('min_bully_freq', 'max_non_bully_freq') if k in header}
+        return frozenset(generate_bad_words(TRAIN_CSV, **params))
+    print("⚠️ No lexicon available - lexical matching disabled")
+    return frozenset()
+
+def _model_files_signature():
+    """(mtime, size) of the model files, used to notice a redeployed model"""
+    sig = []
+    for name in MODEL_FILES:
+        try:
+            st = os.stat(os.path.join(MODEL_DIR, name))
+            sig.append((name, st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            sig.append((name, None, None))
+    return tuple(sig)
+
+def _create_cache():
+    return create_prediction_cache(
+        Config.DETECTOR_CACHE,
+        max_entries=Config.DETECTOR_CACHE_SIZE,
+        ttl_seconds=Config.DETECTOR_CACHE_TTL,
+        path=Config.DETECTOR_CACHE_PATH,
+    )
+
+def reset_prediction_cache():
+    """Open a new prediction cache (a forked process must not reuse the parent's SQLite connection)"""
+    global prediction_cache
+    if prediction_cache is not None:
+        prediction_cache = _create_cache()
+
+def _load_all():
+    """Load every artifact and swap them in as one bundle. Caller holds _load_lock."""
+    global _bundle, tokenizer, model, BAD_WORDS, MODEL_VERSION, prediction_cache, _file_signature
+    signature = _model_files_signature()
+    version = model_version()
+    bad_words = _load_lexicon()
+    bundle = _Bundle(_load_tokenizer(), _load_model(), LexiconMatcher(bad_words), bad_words, version)
+
+    if prediction_cache is None:
+        prediction_cache = _create_cache()
+    if prediction_cache is not None:
+        prediction_cache.invalidate(version)
+
+    _bundle = bundle
+    _file_signature = signature
+    tokenizer, model, BAD_WORDS, MODEL_VERSION = bundle.tokenizer, bundle.model, bundle.bad_words, bundle.version
+
+def _ensure_loaded():
+    """The current bundle, loading it on first use"""
+    bundle = _bundle
+    if bundle is not None:
+        return bundle
+    with _load_lock:
+        if _bundle is None:
+            print("🤖 Loading cyberbullying detector...")
+            _load_all()
+            print(f"✅ Cyberbullying detector ready (model version {_bundle.version})")
+        return _bundle
+
+def _reload_if_changed():
+    """Reload when bully_model.h5 or tokenizer.json changed on disk (checked at most every few seconds)"""
+    global _last_update_check
+    now = time.monotonic()
+    if now - _last_update_check < Config.DETECTOR_RELOAD_CHECK_SECONDS:
+        return
+    _last_update_check = now
+    if _model_files_signature() == _file_signature:
+        return
+    with _load_lock:
+        if _model_files_signature() == _file_signature:
+            return
+        print("🔄 Model files changed on disk - reloading detector")
+        _load_all()
+        print(f"✅ Reloaded detector (model version {_bundle.version})")
+
+def is_ready():
+    """A model is loaded here, or the detector service answered recently"""
+    return _bundle is not None or (service is not None and service.healthy())
+
+def warmup(background=False):
+    """
+    Load the model, tokenizer and lexicon now instead of on the first prediction.
+    With background=True the load runs in a daemon thread, which is returned.
+    Skipped when the detector service answers: the model is then only loaded
+    if the service goes down.
+    """
+    global _warmup_thread
+    if service is not None:
+        try:
+            service.health()
+            return None
+        except DetectorServiceError as e:
+            print(f"⚠️ {e} - loading the detector in-process")
+    if not background:
+        _ensure_loaded()
+        return None
+    with _load_lock:
+        if _warmup_thread is None or not _warmup_thread.is_alive():
+            _warmup_thread = threading.Thread(target=_ensure_loaded, name='detector-warmup', daemon=True)
+            _warmup_thread.start()
+        return _warmup_thread
 
 # -----------------------------
 # Convert sentence to model input
 # -----------------------------
+def _cleaned_to_input(tk, cleaned):
+    return pad_sequences(tk.texts_to_sequences(cleaned), MAX_LEN)
+
 def sentence_to_input(s):
-    s_clean = clean_text(s)
-    seq = tokenizer.texts_to_sequences([s_clean])
-    pad = pad_sequences(seq, maxlen=MAX_LEN, padding='post', truncating='post')
-    return pad
+    return _cleaned_to_input(_ensure_loaded().tokenizer, [clean_text_cached(s)])
 
 # -----------------------------
-# Generate BAD_WORDS dynamically
+# Lexical matching
 # -----------------------------
-def generate_bad_words(csv_path, min_bully_freq=2, max_non_bully_freq=1):
-    df = pd.read_csv(csv_path)
-    bullying_texts = df[df['label'] == 1]['text'].apply(clean_text)
-    non_bullying_texts = df[df['label'] == 0]['text'].apply(clean_text)
+def lexical_flag(s):
+    return _ensure_loaded().matcher.match(clean_text_cached(s))
 
-    def get_word_counts(text_series):
-        words = " ".join(text_series).split()
-        return Counter(words)
+# -----------------------------
+# Predict Text
+# -----------------------------
+def _model_probabilities(bundle, x):
+    """Probabilities for padded rows `x`, served from the prediction cache where possible"""
+    model = bundle.model
+    if prediction_cache is None:
+        return [float(p) for p in model.predict(x, batch_size=len(x), verbose=0)[:, 0]]
 
-    bully_counts = get_word_counts(bullying_texts)
-    non_bully_counts = get_word_counts(non_bullying_texts)
+    keys = [make_key(bundle.version, row) for row in x]
+    probs = prediction_cache.get_many(keys)
+    # Identical rows within one batch are only run once
+    missing = {}
+    for i, (key, prob) in enumerate(zip(keys, probs)):
+        if prob is None:
+            missing.setdefault(key, i)
+    if missing:
+        rows = list(missing.values())
+        out = model.predict(x[rows], batch_size=len(rows), verbose=0)[:, 0]
+        computed = {key: float(p) for key, p in zip(missing, out)}
+        prediction_cache.set_many(computed)
+        probs = [computed[key] if prob is None else prob for key, prob in zip(keys, probs)]
+    return probs
 
-    bad_words_dynamic = set()
-    for word, count in bully_counts.items():
-        if count >= min_bully_freq and non_bully_counts.get(word, 0) <= max_non_bully_freq:
-            bad_words_dynamic.add(word)
-    return bad_words_dynamic
+def _predict_rows(texts, thresholds):
+    """Classify `texts` on the detector service if configured and up, else in this process"""
+    if service is not None and service.available():
+        try:
+            return service.predict_rows(texts, thresholds)
+        except DetectorServiceError as e:
+            print(f"⚠️ {e} - falling back to in-process inference")
+    return predict_rows_local(texts, thresholds)
 
-BAD_WORDS = generate_bad_words(TRAIN_CSV)
+def predict_rows_local(texts, thresholds):
+    """Run one forward pass over `texts` in this process, applying a per-text threshold"""
+    _ensure_loaded()
+    _reload_if_changed()
+    bundle = _bundle  # one consistent set of artifacts for the whole call
+    cleaned = [clean_text_cached(s) for s in texts]
+    x = _cleaned_to_input(bundle.tokenizer, cleaned)
+    probs = _model_probabilities(bundle, x)
+    results = []
+    for lex, prob, threshold in zip(bundle.matcher.match_many(cleaned), probs, thresholds):
+        label = 1 if prob >= threshold or len(lex) > 0 else 0
+        results.append({"probability": prob, "label": int(label), "found_lexical": lex, "model_version": bundle.version})
+    return results
 
-def lexical_flag(s):
-    s_words = clean_text(s).split()
-    found = [w for w in BAD_WORDS if w in s_words]
-    return found
+def predict_batch(texts, threshold=0.5):
+    texts = list(texts)
+    if not texts:
+        return []
+    return _predict_rows(texts, [threshold] * len(texts))
+
+# Concurrent callers are gathered into one model.predict call
+batcher = InferenceBatcher(
+    _predict_rows,
+    max_batch_size=Config.DETECTOR_BATCH_SIZE,
+    max_wait_ms=Config.DETECTOR_BATCH_WAIT_MS,
+    max_queue_size=Config.DETECTOR_QUEUE_SIZE,
+)
 
-# -----------------------------
-# Predict Text
-# -----------------------------
 def predict_text(s, threshold=0.5):
-    x = sentence_to_input(s)
-    prob = float(model.predict(x, verbose=0)[0][0])
-    lex = lexical_flag(s)
-    label = 1 if prob >= threshold or len(lex) > 0 else 0
-    return {"probability": prob, "label": int(label), "found_lexical": lex}
+    if Config.DETECTOR_BATCHING:
+        try:
+            return batcher.predict(s, threshold, timeout=Config.DETECTOR_BATCH_TIMEOUT)
+        except queue.Full:
+            # Queue is saturated: fall back to a direct call
+            pass
+        except FutureTimeoutError:
+            # Batcher stuck or far behind: don't hang the request, run it directly
+            print(f"⏱️ Batched prediction took over {Config.DETECTOR_BATCH_TIMEOUT:g}s - running it directly")
+    return _predict_rows([s], [threshold])[0]
 
 # -----------------------------
 # Wrapper Function
@@ -0,0 +1,354 @@
+"""
+Local detector service: one model in memory, N worker processes.
+
+run_detector_service.py loads the detector once, then forks the workers, so
+with the numpy backend every worker shares the parent's weight pages
+(copy-on-write, never written). The Keras backend cannot be forked once
+TensorFlow has started its thread pools, so each worker loads its own copy
+after the fork instead. Each worker is pinned to one core and runs with a
+fixed number of math threads, so workers do not compete for every core.
+
+App processes send batches over a Unix socket (DETECTOR_SERVICE_SOCKET); the
+workers all accept() on the same listening socket. Each app thread keeps
+one connection open and sends its requests over it one after another; a
+worker serves all of its open connections. Messages are a 4-byte
+big-endian length followed by UTF-8 JSON:
+
+    {"op": "predict", "texts": [...], "thresholds": [...]} -> {"results": [...]}
+    {"op": "health"}                                         -> {"status": "ok", "workers": [...], ...}
+
+DetectorServiceClient marks the service down for `retry_after` seconds
+after any failure; the detector then runs in-process until it is retried.
+healthy() (readiness) only trusts an answer from the last `health_ttl`
+seconds and asks the service otherwise.
+"""
+import json
+import os
+import selectors
+import signal
+import socket
+import struct
+import sys
+import threading
+import time
+
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+_HEADER = struct.Struct('>I')
+
+
+class DetectorServiceError(Exception):
+    pass
+
+
+# -----------------------------
+# Framing
+# -----------------------------
+def _recv_exact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("connection closed mid-message")
+        buf += chunk
+    return bytes(buf)
+
+
+def send_message(sock, payload):
+    data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def recv_message(sock):
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if size > MAX_MESSAGE_BYTES:
+        raise ValueError(f"message of {size} bytes exceeds {MAX_MESSAGE_BYTES}")
+    return json.loads(_recv_exact(sock, size))
+
+
+# -----------------------------
+# Client (app side)
+# -----------------------------
+class DetectorServiceClient:
+    def __init__(self, path, timeout=2.0, retry_after=10.0, health_ttl=5.0):
+        self.path = path
+        self.timeout = float(timeout)
+        self.retry_after = float(retry_after)
+        self.health_ttl = float(health_ttl)
+        self._down_until = 0.0
+        self._last_ok = None  # monotonic time of the last answer
+        self._local = threading.local()  # one connection per thread
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connects = 0
+        self.failures = 0
+        self.last_error = None
+
+    def available(self):
+        """Not marked down: worth trying (says nothing about a service never reached)"""
+        return time.monotonic() >= self._down_until
+
+    def healthy(self):
+        """The service answered within `health_ttl` seconds, asking it now if needed"""
+        last_ok = self._last_ok
+        if last_ok is not None and time.monotonic() - last_ok < self.health_ttl:
+            return True
+        if not self.available():
+            return False
+        try:
+            return self.health().get('status') == 'ok'
+        except DetectorServiceError:
+            return False
+
+    def _connection(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.settimeout(self.timeout)
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+            with self._lock:
+                self.connects += 1
+        return sock
+
+    def _drop_connection(self):
+        sock = getattr(self._local, 'sock', None)
+        self._local.sock = None
+        if sock is not None:
+            sock.close()
+
+    def _call(self, payload):
+        # A kept connection may have been closed by a restarted worker: one retry on a new one
+        for attempt in range(2):
+            reused = getattr(self._local, 'sock', None) is not None
+            try:
+                sock = self._connection()
+                send_message(sock, payload)
+                response = recv_message(sock)
+                break
+            except (OSError, ValueError) as e:
+                self._drop_connection()
+                if reused and attempt == 0 and not isinstance(e, (socket.timeout, ValueError)):
+                    continue
+                with self._lock:
+                    self.failures += 1
+                    self.last_error = str(e)
+                    self._down_until = time.monotonic() + self.retry_after
+                    self._last_ok = None
+                raise DetectorServiceError(f"detector service at {self.path}: {e}") from e
+        self._last_ok = time.monotonic()
+        if 'error' in response:
+            raise DetectorServiceError(response['error'])
+        return response
+
+    def predict_rows(self, texts, thresholds):
+        response = self._call({'op': 'predict', 'texts': list(texts), 'thresholds': list(thresholds)})
+        with self._lock:
+            self.requests += 1
+        return response['results']
+
+    def health(self):
+        return self._call({'op': 'health'})
+
+    def stats(self):
+        return {
+            'socket': self.path,
+            'available': self.available(),
+            'last_answer_seconds_ago': round(time.monotonic() - self._last_ok, 1) if self._last_ok else None,
+            'requests': self.requests,
+            'connects': self.connects,
+            'failures': self.failures,
+            'last_error': self.last_error,
+        }
+
+
+# -----------------------------
+# Server (run_detector_service.py)
+# -----------------------------
+class _PoolState:
+    """Per-worker counters in shared memory, readable by every worker for health replies"""
+
+    def __init__(self, workers):
+        from multiprocessing import RawArray
+        self.pids = RawArray('i', workers)
+        self.cores = RawArray('i', workers)
+        self.served = RawArray('q', workers)
+        self.started = RawArray('d', workers)
+
+    def snapshot(self):
+        out = []
+        for slot in range(len(self.pids)):
+            pid = self.pids[slot]
+            alive = pid > 0
+            if alive:
+                try:
+                    os.kill(pid, 0)
+                except OSError:
+                    alive = False
+            out.append({
+                'slot': slot,
+                'pid': pid,
+                'core': self.cores[slot],
+                'alive': alive,
+                'served': self.served[slot],
+                'uptime_seconds': round(time.time() - self.started[slot], 1) if alive else 0.0,
+            })
+        return out
+
+
+class DetectorPool:
+    def __init__(self, path, workers, threads=1, pin=True):
+        self.path = path
+        self.workers = workers
+        self.threads = threads
+        self.pin = pin
+        self.state = _PoolState(workers)
+        self.children = {}  # pid -> slot
+        self.listener = None
+        self._stopping = False
+        try:
+            self.cores = sorted(os.sched_getaffinity(0))
+        except AttributeError:
+            self.cores = list(range(os.cpu_count() or 1))
+
+    # Parent
+    def serve_forever(self):
+        from app.utils import detector
+        from config import Config
+
+        self.backend = Config.DETECTOR_BACKEND
+        detector.service = None  # this process is the service: never call out to itself
+        if self.backend == 'numpy':
+            # Load before forking: workers share the weight pages
+            detector.warmup()
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.path)
+        self.listener.listen(128)
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        for slot in range(self.workers):
+            self._spawn(slot)
+        print(f"🧠 Detector service on {self.path}: {self.workers} workers, "
+              f"{self.threads} thread(s) each, backend {self.backend}")
+
+        while not self._stopping:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            slot = self.children.pop(pid, None)
+            if slot is not None and not self._stopping:
+                print(f"⚠️ Detector worker {pid} (slot {slot}) exited with status {status} - restarting")
+                self._spawn(slot)
+        self._shutdown()
+
+    def _spawn(self, slot):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = slot
+            return
+        try:
+            self._worker_main(slot)
+        finally:
+            os._exit(0)
+
+    def _stop(self, signum, frame):
+        self._stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+    def _shutdown(self):
+        for pid in list(self.children):
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        self.listener.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        print("🛑 Detector service stopped")
+
+    # Worker
+    def _worker_main(self, slot):
+        from app.utils import detector
+
+        signal.signal(signal.SIGTERM, lambda *_: os._exit(0))
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        core = self.cores[slot % len(self.cores)]
+        if self.pin and hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, {core})
+        self.state.pids[slot] = os.getpid()
+        self.state.cores[slot] = core if self.pin else -1
+        self.state.started[slot] = time.time()
+        detector.reset_prediction_cache()
+
+        if self.backend != 'numpy':
+            import tensorflow as tf
+            tf.config.threading.set_intra_op_parallelism_threads(self.threads)
+            tf.config.threading.set_inter_op_parallelism_threads(1)
+            detector.warmup()
+
+        # Clients keep their connection open: serve every open one, a request at a time
+        selector = selectors.DefaultSelector()
+        self.listener.setblocking(False)  # the workers race for each new connection
+        selector.register(self.listener, selectors.EVENT_READ)
+        while True:
+            for key, _ in selector.select():
+                if key.fileobj is self.listener:
+                    try:
+                        conn, _ = self.listener.accept()
+                    except BlockingIOError:
+                        continue  # another worker took it
+                    conn.settimeout(30)  # for the rest of a message once it started arriving
+                    selector.register(conn, selectors.EVENT_READ)
+                    continue
+                conn = key.fileobj
+                try:
+                    request = recv_message(conn)
+                except (OSError, ValueError):
+                    # Closed by the client (or garbage): forget the connection
+                    selector.unregister(conn)
+                    conn.close()
+                    continue
+                try:
+                    response = self._handle(detector, request)
+                    self.state.served[slot] += 1
+                except Exception as e:
+                    response = {'error': str(e)}
+                    print(f"❌ Detector worker {os.getpid()}: {e}", file=sys.stderr)
+                try:
+                    send_message(conn, response)
+                except OSError:
+                    selector.unregister(conn)
+                    conn.close()
+
+    def _handle(self, detector, request):
+        op = request.get('op')
+        if op == 'predict':
+            texts = request['texts']
+            thresholds = request.get('thresholds') or [0.5] * len(texts)
+            if not texts:
+                return {'results': []}
+            return {'results': detector.predict_rows_local(texts, thresholds)}
+        if op == 'health':
+            return {
+                'status': 'ok',
+                'backend': self.backend,
+                'model_version': detector.MODEL_VERSION,
+                'parent_pid': os.getppid(),
+                'threads_per_worker': self.threads,
+                'workers': self.state.snapshot(),
+            }
+        return {'error': f"unknown op {op!r}"}
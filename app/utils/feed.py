@@ -0,0 +1,109 @@
+"""
+Random post feed without ORDER BY RANDOM().
+
+Every post gets a uniform `random_key` in [0, 1) when it is created
+(indexed). A feed session picks a seed in [0, 1) and walks the posts in
+key order starting at the seed, wrapping around once:
+
+    key >= seed (ascending), then key < seed (ascending)
+
+Each page is a range seek on the random_key index, pages of one session
+never overlap, and the session ends after every post was shown once.
+Different seeds start at different points of the shuffled order.
+"""
+import hashlib
+import math
+import random
+import threading
+import time
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload
+
+from app.models import db, Post
+
+
+def new_seed():
+    return random.random()
+
+
+def stable_seed(session_key):
+    """
+    Seed for clients that page with ?page=N and never send the seed back:
+    derived from a key that is fixed for the browsing session (the access
+    token's jti), so their pages never repeat or skip posts mid-session
+    """
+    digest = hashlib.sha256(str(session_key).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') / 2.0 ** 64
+
+
+def _after(query, after):
+    return query.filter(or_(
+        Post.random_key > after['key'],
+        and_(Post.random_key == after['key'], Post.id > after['id'])
+    ))
+
+
+def random_feed_page(seed, limit, after=None, offset=0):
+    """
+    Up to `limit` posts of the feed for `seed`, authors loaded.
+
+    `after` is the position of the last post already shown
+    ({'key', 'id', 'wrapped'}); `offset` skips posts from there (used for
+    the legacy ?page= parameter).
+    """
+    posts = []
+    ordered = (Post.random_key, Post.id)
+
+    if after is None or not after['wrapped']:
+        first = Post.query.filter(Post.random_key >= seed)
+        if after is not None:
+            first = _after(first, after)
+        posts = first.options(joinedload(Post.user)).order_by(*ordered).offset(offset).limit(limit).all()
+        if len(posts) == limit:
+            return posts
+        if offset and not posts:
+            offset = max(0, offset - first.order_by(None).count())
+        else:
+            offset = 0
+
+    second = Post.query.filter(Post.random_key < seed)
+    if after is not None and after['wrapped']:
+        second = _after(second, after)
+    posts += second.options(joinedload(Post.user)).order_by(*ordered)\
+                   .offset(offset).limit(limit - len(posts)).all()
+    return posts
+
+
+def feed_position(seed, post):
+    """Cursor fields for resuming the feed after `post`"""
+    return {'key': post.random_key, 'id': post.id, 'wrapped': post.random_key < seed}
+
+
+class CachedCount:
+    """Row count refreshed at most every `ttl` seconds instead of a COUNT(*) per request"""
+
+    def __init__(self, model, ttl=60):
+        self.model = model
+        self.ttl = float(ttl)
+        self._value = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._value is not None and now < self._expires_at:
+                return self._value
+        value = db.session.query(db.func.count(self.model.id)).scalar()
+        with self._lock:
+            self._value = value
+            self._expires_at = now + self.ttl
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+
+    def pages(self, per_page):
+        return math.ceil(self.get() / per_page) if per_page else 0
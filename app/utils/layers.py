@@ -0,0 +1,32 @@
+"""
+Custom Keras layers needed to deserialize bully_model.h5.
+
+Kept out of detector.py so that importing the detector never pulls in
+TensorFlow; this module is only imported when the Keras model is loaded.
+"""
+from tensorflow.keras.layers import Layer
+import tensorflow as tf
+
+# -----------------------------
+# Custom Layer Definition (1D weight to match saved model)
+# -----------------------------
+class SimpleAttention(Layer):
+    def __init__(self, **kwargs):
+        super(SimpleAttention, self).__init__(**kwargs)
+
+    def build(self, input_shape):
+        # 1D attention weight vector
+        self.W = self.add_weight(
+            name='att_weight',
+            shape=(input_shape[-1],),  # match saved model
+            initializer='random_normal',
+            trainable=True
+        )
+        super(SimpleAttention, self).build(input_shape)
+
+    def call(self, x):
+        # Compute attention scores
+        e = tf.keras.backend.tanh(tf.keras.backend.dot(x, tf.expand_dims(self.W, -1)))
+        a = tf.keras.backend.softmax(e, axis=1)
+        output = x * a
+        return tf.keras.backend.sum(output, axis=1)
@@ -0,0 +1,164 @@
+"""
+Bullying lexicon: built from the training CSV at training time and shipped
+as a compact, checksummed artifact (models/lexicon.bin) next to the model.
+
+Artifact layout:
+    MAGIC line
+    JSON header line (format, source_sha256, count, sha256, build params)
+
+The lexicon depends only on the training CSV (and the build params), so it
+is versioned by the CSV's content hash (`source_sha256`), not by the model:
+exporting or retraining the model does not make it stale.
+    payload: sorted words, newline separated, UTF-8
+"""
+import hashlib
+import json
+import os
+from collections import Counter
+
+from app.utils.artifacts import MODEL_DIR, LEXICON_FILE, file_digest
+from app.utils.text import clean_texts
+
+MAGIC = b"CSLEXICON\n"
+FORMAT_VERSION = 1
+
+
+class LexiconError(Exception):
+    """Raised when a lexicon artifact is missing, malformed or corrupted"""
+
+
+# -----------------------------
+# Build (training only)
+# -----------------------------
+def generate_bad_words(csv_path, min_bully_freq=2, max_non_bully_freq=1):
+    import pandas as pd
+
+    df = pd.read_csv(csv_path)
+    bullying_texts = clean_texts(df[df['label'] == 1]['text'])
+    non_bullying_texts = clean_texts(df[df['label'] == 0]['text'])
+
+    def get_word_counts(text_series):
+        words = " ".join(text_series).split()
+        return Counter(words)
+
+    bully_counts = get_word_counts(bullying_texts)
+    non_bully_counts = get_word_counts(non_bullying_texts)
+
+    bad_words_dynamic = set()
+    for word, count in bully_counts.items():
+        if count >= min_bully_freq and non_bully_counts.get(word, 0) <= max_non_bully_freq:
+            bad_words_dynamic.add(word)
+    return bad_words_dynamic
+
+
+def write_lexicon(words, source, path=None, model_dir=MODEL_DIR, **build_params):
+    """Write `words`, built from the CSV at `source`, as a versioned lexicon artifact and return its header"""
+    path = path or os.path.join(model_dir, LEXICON_FILE)
+    payload = "\n".join(sorted(words)).encode('utf-8')
+    header = {
+        'format': FORMAT_VERSION,
+        'source_sha256': file_digest(source),
+        'count': len(words),
+        'sha256': hashlib.sha256(payload).hexdigest(),
+    }
+    header.update(build_params)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(json.dumps(header, sort_keys=True).encode('utf-8') + b"\n")
+        f.write(payload)
+    os.replace(tmp_path, path)
+    return header
+
+
+def build_lexicon(csv_path, model_dir=MODEL_DIR, min_bully_freq=2, max_non_bully_freq=1):
+    words = generate_bad_words(csv_path, min_bully_freq=min_bully_freq, max_non_bully_freq=max_non_bully_freq)
+    return write_lexicon(words, csv_path, model_dir=model_dir,
+                         min_bully_freq=min_bully_freq, max_non_bully_freq=max_non_bully_freq)
+
+
+# -----------------------------
+# Load (serving)
+# -----------------------------
+def load_lexicon(path):
+    """Read and verify a lexicon artifact. Returns (frozenset of words, header)"""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        raise LexiconError(f"Cannot read lexicon {path}: {e}")
+
+    if not data.startswith(MAGIC):
+        raise LexiconError(f"{path} is not a lexicon artifact")
+    try:
+        header_end = data.index(b"\n", len(MAGIC))
+        header = json.loads(data[len(MAGIC):header_end])
+    except ValueError:
+        raise LexiconError(f"Malformed lexicon header in {path}")
+    payload = data[header_end + 1:]
+
+    if header.get('format') != FORMAT_VERSION:
+        raise LexiconError(f"Unsupported lexicon format {header.get('format')}")
+    if hashlib.sha256(payload).hexdigest() != header.get('sha256'):
+        raise LexiconError(f"Lexicon checksum mismatch for {path}")
+
+    words = frozenset(payload.decode('utf-8').split("\n")) if payload else frozenset()
+    if len(words) != header.get('count'):
+        raise LexiconError(f"Lexicon word count mismatch for {path}")
+    return words, header
+
+
+# -----------------------------
+# Matching
+# -----------------------------
+class LexiconMatcher:
+    """
+    Single-pass lexical matcher over cleaned text.
+
+    Each token costs one set lookup, independent of lexicon size. Multi-word
+    terms (space separated) are indexed by their first token and only
+    compared where that token occurs. Matches are returned once each, in
+    order of first appearance.
+    """
+
+    def __init__(self, terms):
+        self.terms = frozenset(terms)
+        self._words = set()
+        self._phrases = {}
+        for term in self.terms:
+            tokens = tuple(term.split())
+            if len(tokens) == 1:
+                self._words.add(tokens[0])
+            elif tokens:
+                self._phrases.setdefault(tokens[0], []).append(tokens)
+        for candidates in self._phrases.values():
+            candidates.sort(key=len, reverse=True)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def match_tokens(self, tokens):
+        words = self._words
+        phrases = self._phrases
+        found = []
+        seen = set()
+        for i, tok in enumerate(tokens):
+            if tok in words and tok not in seen:
+                seen.add(tok)
+                found.append(tok)
+            if phrases and tok in phrases:
+                for phrase in phrases[tok]:
+                    if tuple(tokens[i:i + len(phrase)]) == phrase:
+                        term = " ".join(phrase)
+                        if term not in seen:
+                            seen.add(term)
+                            found.append(term)
+        return found
+
+    def match(self, cleaned_text):
+        """Terms found in an already cleaned string"""
+        return self.match_tokens(cleaned_text.split())
+
+    def match_many(self, cleaned_texts):
+        return [self.match_tokens(t.split()) for t in cleaned_texts]
@@ -0,0 +1,485 @@
+"""
+Write-behind persistence for chat messages (CHAT_PERSIST_MODE=write_behind).
+
+handle_send_message normally commits one transaction per message before it
+acknowledges, so a burst of chat is limited by the database's commit
+(fsync) rate. In write-behind mode a message gets its id and sequence
+number from the server, is appended to a local journal, and is delivered
+and acknowledged right away. A background thread then writes the queued
+messages in group commits of up to CHAT_WRITE_BEHIND_MAX_ROWS rows, or
+whatever arrived within CHAT_WRITE_BEHIND_MAX_MS.
+
+The journal (CHAT_JOURNAL_PATH, one per server process) is a series of
+append-only segment files of JSON lines, <path>.000001, <path>.000002 ...
+A new segment is started every CHAT_JOURNAL_SEGMENT_MB, and a segment is
+deleted as soon as everything in it is committed, so the journal stays
+about one segment long. Appends are flushed to the OS, so they survive a
+crash of the process, and fsynced with every group commit. On start the
+writer replays the segments a previous run left, one at a time: rows that
+never reached the database are inserted, and verdict updates are applied
+again (they are idempotent). A lock on <path>.lock keeps a second process
+from using the same journal.
+
+A batch that keeps failing is retried a few times and then written one op
+at a time. Ops that still fail for a reason other than a lost or busy
+database (a constraint violation, bad data) go to a dead-letter file
+(<CHAT_JOURNAL_PATH>.dead) and are counted in stats()['failures'], so one
+bad row cannot hold up the messages behind it. Replay does the same.
+
+Readers that must see their own writes (history, conversation list, read
+receipts) call sync(username) first. It waits only for the queued ops
+that involve that user (as sender or receiver), for at most
+CHAT_WRITE_BEHIND_SYNC_MS, and returns at once when there are none.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+from app.models import db, Message
+from app.utils.moderation import record_bullying
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows: no journal lock
+    fcntl = None
+
+_messages = Message.__table__
+
+
+def _is_transient(error):
+    """Errors that say nothing about the rows: the database is down, busy or locked"""
+    if isinstance(error, (OperationalError, InterfaceError)):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+
+def _reason(error):
+    """The driver's message, without the statement and its parameters"""
+    return str(getattr(error, 'orig', None) or error)
+
+
+# -----------------------------
+# Sequence numbers
+# -----------------------------
+_seq_lock = threading.Lock()
+_last_seq = 0
+
+
+def next_seq():
+    """
+    Increasing message sequence number: microseconds since the epoch, bumped
+    by one on ties, so it also keeps growing across restarts. Unique within a
+    process; across nodes it orders messages by send time.
+    """
+    global _last_seq
+    with _seq_lock:
+        _last_seq = max(_last_seq + 1, time.time_ns() // 1000)
+        return _last_seq
+
+
+# -----------------------------
+# Journal
+# -----------------------------
+def _encode(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class MessageJournal:
+    """Append-only JSON-lines log of accepted writes that are not committed yet, in segments"""
+
+    def __init__(self, path, segment_bytes=16 * 1024 * 1024):
+        self.path = path
+        self.dead_path = path + '.dead'
+        self.segment_bytes = max(1, int(segment_bytes))
+        self._lock_file = open(path + '.lock', 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self._lock_file.close()
+                raise RuntimeError(f"Message journal {path} is used by another process; "
+                                   f"give every server process its own CHAT_JOURNAL_PATH")
+        self._lock = threading.Lock()
+        self._outstanding = Counter()  # segment -> ops not committed yet
+        # Segments of a previous run are only read (replay); this run starts a new one
+        self.current = max(self.segments(), default=0) + 1
+        self._file = open(self.segment_path(self.current), 'a', encoding='utf-8')
+
+    def segment_path(self, index):
+        return f"{self.path}.{index:06d}"
+
+    def segments(self):
+        """Indexes of the segment files on disk, oldest first"""
+        folder, prefix = os.path.split(self.path)
+        prefix += '.'
+        return sorted(int(name[len(prefix):]) for name in os.listdir(folder or '.')
+                      if name.startswith(prefix) and name[len(prefix):].isdigit())
+
+    def append(self, record):
+        """Write `record`; returns the segment it went to"""
+        line = json.dumps(record, default=_encode, separators=(',', ':')) + '\n'
+        with self._lock:
+            if self._file.tell() >= self.segment_bytes:
+                self._rotate()
+            self._file.write(line)
+            self._file.flush()
+            self._outstanding[self.current] += 1
+            return self.current
+
+    def _rotate(self):
+        os.fsync(self._file.fileno())
+        self._file.close()
+        if not self._outstanding[self.current]:
+            os.remove(self.segment_path(self.current))
+        self.current += 1
+        self._file = open(self.segment_path(self.current), 'a', encoding='utf-8')
+
+    def sync(self):
+        with self._lock:
+            os.fsync(self._file.fileno())
+
+    def committed(self, segments):
+        """Mark ops committed ({segment: count}); delete the older segments that are done"""
+        with self._lock:
+            for index, count in segments.items():
+                self._outstanding[index] -= count
+                if self._outstanding[index] <= 0:
+                    del self._outstanding[index]
+                    if index != self.current:
+                        self.remove(index)
+
+    def records(self, index):
+        """Everything in a segment; a torn last line (crash mid-write) is skipped"""
+        path = self.segment_path(index)
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    print(f"⚠️ Skipping a damaged line in {path}")
+
+    def remove(self, index):
+        try:
+            os.remove(self.segment_path(index))
+        except FileNotFoundError:
+            pass
+
+    def dead_letter(self, record, error):
+        """Set aside an op that cannot be written, with the reason"""
+        with open(self.dead_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'error': _reason(error), 'op': record}, default=_encode, separators=(',', ':')) + '\n')
+
+    def size(self):
+        total = 0
+        for index in self.segments():
+            try:
+                total += os.path.getsize(self.segment_path(index))
+            except FileNotFoundError:
+                pass
+        return total
+
+
+# -----------------------------
+# Writer
+# -----------------------------
+class MessageWriter:
+    def __init__(self, journal_path, max_rows=500, max_delay_ms=20, max_queue=100000, retries=3, accept_timeout=5.0,
+                 segment_mb=16, sync_timeout_ms=500):
+        self.journal_path = journal_path
+        self.sync_timeout = max(0.0, float(sync_timeout_ms)) / 1000.0
+        self.segment_bytes = int(float(segment_mb) * 1024 * 1024)
+        self.max_rows = max(1, int(max_rows))
+        self.max_delay = max(0.0, float(max_delay_ms)) / 1000.0
+        self.retries = max(1, int(retries))
+        self.accept_timeout = float(accept_timeout)
+        self._queue = queue.Queue()
+        self._slots = threading.BoundedSemaphore(max(1, int(max_queue)))  # taken before the journal lock
+        self._journal = None
+        self._app = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._append_lock = threading.Lock()  # journal order == queue order
+        self._committed = threading.Condition()
+        self._last_op = {}  # username -> number of their newest accepted op (ops commit in order)
+
+        # Counters
+        self._accepted = 0
+        self._written = 0
+        self._batches = 0
+        self._max_batch = 0
+        self._commit_seconds = 0.0
+        self._replayed = 0
+        self._retries = 0
+        self._failures = 0  # ops sent to the dead-letter file
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    def start(self, app):
+        """Open the journal, replay what a previous run left in it and start the flusher"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._app = app
+            if self._journal is None:
+                self._journal = MessageJournal(self.journal_path, self.segment_bytes)
+                with app.app_context():
+                    try:
+                        self._replayed += self.replay()
+                    finally:
+                        db.session.remove()
+            self._thread = threading.Thread(target=self._run, name='message-writer', daemon=True)
+            self._thread.start()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def add(self, row):
+        """
+        Queue a message row (a dict of `messages` columns, id and seq set).
+        Waits up to `accept_timeout` for room when the queue is full, then raises.
+        """
+        self._accept({'op': 'insert', 'row': row}, (row['sender'], row['receiver']))
+
+    def update(self, message_id, sender, values, receiver=None):
+        """Queue a change to a queued or stored message (classification verdict)"""
+        self._accept({'op': 'update', 'id': message_id, 'sender': sender, 'values': values}, (sender, receiver))
+
+    def sync(self, username=None, timeout=None):
+        """
+        Wait until what was accepted so far for `username` (everything when None)
+        is committed; False on timeout (default `sync_timeout`).
+        """
+        with self._committed:
+            target = self._accepted if username is None else self._last_op.get(username, 0)
+            if self._written >= target:
+                return True
+            return self._committed.wait_for(lambda: self._written >= target,
+                                            timeout=self.sync_timeout if timeout is None else timeout)
+
+    def stats(self):
+        batches = self._batches
+        return {
+            'accepted': self._accepted,
+            'written': self._written,
+            'queued': self._queue.qsize(),
+            'batches': batches,
+            'avg_batch_size': self._written / batches if batches else 0.0,
+            'max_batch_size': self._max_batch,
+            'avg_commit_ms': self._commit_seconds / batches * 1000.0 if batches else 0.0,
+            'replayed': self._replayed,
+            'retries': self._retries,
+            'failures': self._failures,
+            'journal_bytes': self._journal.size() if self._journal else 0,
+            'journal_segments': len(self._journal.segments()) if self._journal else 0,
+        }
+
+    # -----------------------------
+    # Internals
+    # -----------------------------
+    def _accept(self, op, users):
+        if not self.running:
+            raise RuntimeError("MessageWriter.start(app) must be called before writing")
+        # Wait for room without holding the journal lock, so a full queue only slows its senders down
+        if not self._slots.acquire(timeout=self.accept_timeout):
+            raise RuntimeError("Message queue is full: the database is not keeping up")
+        with self._append_lock:
+            segment = self._journal.append(op)
+            self._queue.put((segment, users, op))
+            with self._committed:
+                self._accepted += 1
+                for user in users:
+                    if user:
+                        self._last_op[user] = self._accepted
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_delay
+        while len(batch) < self.max_rows:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for _ in batch:
+            self._slots.release()
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            self._persist([op for _, _, op in batch])
+            self._done(batch, started)
+
+    def _persist(self, ops):
+        """Commit `ops` as one group; split it up when it keeps failing for reasons of its own"""
+        attempt = 0
+        while True:
+            try:
+                self._commit(ops)
+                return
+            except Exception as e:
+                attempt += 1
+                self._retries += 1
+                if not _is_transient(e) and attempt >= self.retries:
+                    print(f"❌ Group commit of {len(ops)} ops keeps failing, writing them one by one: {_reason(e)}")
+                    break
+                # Kept in the queue and the journal; a database outage just backs the queue up
+                print(f"❌ Group commit of {len(ops)} ops failed (attempt {attempt}), retrying: {_reason(e)}")
+                time.sleep(min(attempt, 5))
+
+        for op in ops:
+            while True:
+                try:
+                    self._commit([op])
+                    break
+                except Exception as e:
+                    if _is_transient(e):
+                        time.sleep(1.0)
+                        continue
+                    self._dead_letter(op, e)
+                    break
+
+    def _dead_letter(self, op, error):
+        self._failures += 1
+        self._journal.dead_letter(op, error)
+        target = op['row']['id'] if op['op'] == 'insert' else op['id']
+        print(f"☠️ Message {op['op']} {target} cannot be written, moved to {self._journal.dead_path}: {_reason(error)}")
+
+    def _apply(self, ops, flagged=None):
+        """Insert/update `ops` in the current transaction and count flagged messages per sender"""
+        rows = [op['row'] for op in ops if op['op'] == 'insert']
+        updates = [op for op in ops if op['op'] == 'update']
+        if flagged is None:
+            flagged = Counter(row['sender'] for row in rows if row.get('is_bullying'))
+            flagged.update(op['sender'] for op in updates if op['values'].get('is_bullying'))
+
+        if rows:
+            db.session.execute(_messages.insert(), rows)
+        for op in updates:
+            db.session.execute(_messages.update().where(_messages.c.id == op['id']).values(**op['values']))
+        for sender, count in flagged.items():
+            record_bullying(username=sender, messages=count)
+
+    def _commit(self, ops):
+        with self._app.app_context():
+            try:
+                self._apply(ops)
+                self._journal.sync()
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+    def _done(self, batch, started):
+        """Account for a batch that is now committed or dead-lettered"""
+        self._journal.committed(Counter(segment for segment, _, _ in batch))
+        with self._committed:
+            self._written += len(batch)
+            for _, users, _ in batch:
+                for user in users:
+                    if self._last_op.get(user, self._written + 1) <= self._written:
+                        del self._last_op[user]
+            self._batches += 1
+            self._max_batch = max(self._max_batch, len(batch))
+            self._commit_seconds += time.perf_counter() - started
+            self._committed.notify_all()
+
+    def replay(self, chunk=500):
+        """Apply what older journal segments hold that the database lacks, then delete them; needs an app context"""
+        replayed = updates = 0
+        for index in self._journal.segments():
+            if index >= self._journal.current:
+                break
+            ops = []
+            for op in self._journal.records(index):
+                ops.append(op)
+                if len(ops) >= chunk:
+                    inserted, updated = self._replay_chunk(ops)
+                    replayed, updates, ops = replayed + inserted, updates + updated, []
+            if ops:
+                inserted, updated = self._replay_chunk(ops)
+                replayed, updates = replayed + inserted, updates + updated
+            self._journal.remove(index)
+        if replayed or updates:
+            print(f"📒 Replayed {replayed} messages and {updates} updates from {self.journal_path}")
+        return replayed
+
+    def _replay_chunk(self, ops):
+        """Replay `ops` in one transaction, or one by one when that fails; (inserts, updates) applied"""
+        try:
+            return self._replay_ops(ops)
+        except Exception as e:
+            db.session.rollback()
+            if _is_transient(e):
+                raise
+            print(f"❌ Replaying {len(ops)} journaled ops failed, replaying them one by one: {_reason(e)}")
+        inserted = updated = 0
+        for op in ops:
+            try:
+                counts = self._replay_ops([op])
+                inserted += counts[0]
+                updated += counts[1]
+            except Exception as e:
+                db.session.rollback()
+                if _is_transient(e):
+                    raise
+                self._dead_letter(op, e)
+        return inserted, updated
+
+    def _replay_ops(self, ops):
+        for op in ops:
+            if op['op'] == 'insert' and isinstance(op['row'].get('timestamp'), str):
+                op['row']['timestamp'] = datetime.fromisoformat(op['row']['timestamp'])
+
+        # What the database already has: committed rows and their current verdict
+        ids = list({op['row']['id'] if op['op'] == 'insert' else op['id'] for op in ops})
+        current = dict(db.session.execute(
+            db.select(_messages.c.id, _messages.c.is_bullying).where(_messages.c.id.in_(ids))
+        ).all())
+
+        # Counters were updated in the same transaction as the rows: only count what was lost
+        missing = []
+        flagged = Counter()
+        for op in ops:
+            if op['op'] == 'insert':
+                row = op['row']
+                if row['id'] in current:
+                    continue
+                current[row['id']] = row.get('is_bullying')
+                if row.get('is_bullying'):
+                    flagged[row['sender']] += 1
+            elif op['id'] in current:
+                if op['values'].get('is_bullying') and not current[op['id']]:
+                    flagged[op['sender']] += 1
+                current[op['id']] = op['values'].get('is_bullying', current[op['id']])
+            else:
+                continue  # its message is gone (deleted, or a journal of another database)
+            missing.append(op)
+        self._apply(missing, flagged)
+        db.session.commit()
+        inserted = sum(1 for op in missing if op['op'] == 'insert')
+        return inserted, len(missing) - inserted
+
+
+message_writer = MessageWriter(
+    Config.CHAT_JOURNAL_PATH,
+    max_rows=Config.CHAT_WRITE_BEHIND_MAX_ROWS,
+    max_delay_ms=Config.CHAT_WRITE_BEHIND_MAX_MS,
+    max_queue=Config.CHAT_WRITE_BEHIND_MAX_QUEUE,
+    segment_mb=Config.CHAT_JOURNAL_SEGMENT_MB,
+    sync_timeout_ms=Config.CHAT_WRITE_BEHIND_SYNC_MS,
+)
@@ -0,0 +1,115 @@
+"""
+Per-user bullying counters (the user_moderation_stats table).
+
+Every write that stores a flagged comment or message calls
+record_bullying() before committing, so the counter moves in the same
+transaction as the row it counts. Gate checks then read one row by primary
+key instead of counting history.
+
+moderation_stats.py (top level) backfills the table from existing rows and
+checks it against a full recount.
+"""
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db, User, Comment, Message, UserModerationStats
+
+
+def record_bullying(user_id=None, username=None, comments=0, messages=0):
+    """
+    Add to a user's counters inside the current transaction (the caller
+    commits). Messages identify users by username, comments by id; pass
+    whichever is at hand. Negative amounts (a flag taken back) are allowed;
+    a counter row created for them starts at zero.
+    """
+    if not comments and not messages:
+        return
+    if user_id is None:
+        target = select(User.id).where(User.username == username).scalar_subquery()
+    else:
+        target = user_id
+    stmt = update(UserModerationStats).where(UserModerationStats.user_id == target).values(
+        bullying_comment_count=UserModerationStats.bullying_comment_count + comments,
+        bullying_message_count=UserModerationStats.bullying_message_count + messages,
+    ).execution_options(synchronize_session=False)
+    if db.session.execute(stmt).rowcount:
+        return
+
+    # First flag for this user: create the row. A concurrent writer may
+    # create it first, in which case the increment is applied to theirs.
+    if user_id is None:
+        user_id = db.session.execute(select(User.id).where(User.username == username)).scalar()
+        if user_id is None:
+            return
+    try:
+        with db.session.begin_nested():
+            db.session.add(UserModerationStats(
+                user_id=user_id,
+                bullying_comment_count=max(0, comments),
+                bullying_message_count=max(0, messages),
+            ))
+    except IntegrityError:
+        db.session.execute(stmt.where(UserModerationStats.user_id == user_id))
+
+
+def get_counts(user_id):
+    """(bullying comments, bullying messages) for a user: one primary-key read"""
+    stats = db.session.get(UserModerationStats, user_id)
+    if stats is None:
+        return 0, 0
+    return stats.bullying_comment_count, stats.bullying_message_count
+
+
+def recount(user_ids=None):
+    """Recompute the counters from the comment and messages tables: {user_id: (comments, messages)}"""
+    comment_query = db.session.query(Comment.user_id, db.func.count(Comment.id)).filter(
+        Comment.is_bullying == True, Comment.user_id.isnot(None)
+    )
+    message_query = db.session.query(User.id, db.func.count(Message.id)).join(
+        Message, Message.sender == User.username
+    ).filter(Message.is_bullying == True)
+    if user_ids is not None:
+        comment_query = comment_query.filter(Comment.user_id.in_(user_ids))
+        message_query = message_query.filter(User.id.in_(user_ids))
+
+    counts = {}
+    for user_id, count in comment_query.group_by(Comment.user_id):
+        counts[user_id] = (count, 0)
+    for user_id, count in message_query.group_by(User.id):
+        counts[user_id] = (counts.get(user_id, (0, 0))[0], count)
+    return counts
+
+
+def find_mismatches():
+    """[(user_id, stored (comments, messages), actual (comments, messages))] for every drifted user"""
+    actual = recount()
+    stored = {
+        s.user_id: (s.bullying_comment_count, s.bullying_message_count)
+        for s in UserModerationStats.query.all()
+    }
+    mismatches = []
+    for user_id in sorted(set(actual) | set(stored)):
+        a = actual.get(user_id, (0, 0))
+        s = stored.get(user_id, (0, 0))
+        if a != s:
+            mismatches.append((user_id, s, a))
+    return mismatches
+
+
+def backfill(user_ids=None):
+    """Overwrite the counters with a full recount; returns the number of rows written"""
+    counts = recount(user_ids)
+    query = UserModerationStats.query
+    if user_ids is not None:
+        query = query.filter(UserModerationStats.user_id.in_(user_ids))
+    try:
+        query.delete(synchronize_session=False)
+        db.session.bulk_insert_mappings(UserModerationStats, [
+            {'user_id': user_id, 'bullying_comment_count': c, 'bullying_message_count': m}
+            for user_id, (c, m) in counts.items()
+        ])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(counts)
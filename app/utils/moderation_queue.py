@@ -0,0 +1,173 @@
+"""
+Database-backed moderation queue for posts.
+
+Creating a post, or changing its content, inserts a `moderation_job` row in
+the same flush (SQLAlchemy mapper listeners below). moderation_worker.py
+claims pending jobs in batches, runs the detector over the post contents in
+one call and writes the verdict (probability, label, model version) back
+to the post.
+
+Job states: pending -> processing -> done, or back to pending on error
+until MODERATION_MAX_ATTEMPTS, then failed. A job left in processing
+longer than the visibility timeout (its worker died) is claimed again.
+"""
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, bindparam, event, exists, inspect, literal, or_, select
+
+from app.models import db, Post, ModerationJob
+
+_jobs = ModerationJob.__table__
+_posts = Post.__table__
+
+
+# -----------------------------
+# Enqueue
+# -----------------------------
+def _insert_job(connection, post_id):
+    connection.execute(_jobs.insert().values(
+        post_id=post_id, status='pending', attempts=0, enqueued_at=datetime.utcnow()
+    ))
+
+
+@event.listens_for(Post, 'after_insert')
+def _enqueue_new_post(mapper, connection, target):
+    _insert_job(connection, target.id)
+
+
+@event.listens_for(Post, 'after_update')
+def _enqueue_edited_post(mapper, connection, target):
+    if inspect(target).attrs.content.history.has_changes():
+        _insert_job(connection, target.id)
+
+
+def enqueue_backlog(model_version=None):
+    """
+    Queue every post that has no verdict (or one from a model other than
+    `model_version`) and no job waiting. Returns the number of jobs added.
+    """
+    stale = _posts.c.is_bullying.is_(None)
+    if model_version is not None:
+        stale = or_(stale, _posts.c.model_version.is_(None), _posts.c.model_version != model_version)
+    waiting = exists().where(and_(
+        _jobs.c.post_id == _posts.c.id,
+        _jobs.c.status.in_(('pending', 'processing')),
+    ))
+    rows = select(
+        _posts.c.id, literal('pending'), literal(0), literal(datetime.utcnow())
+    ).where(stale, ~waiting)
+    result = db.session.execute(
+        _jobs.insert().from_select(['post_id', 'status', 'attempts', 'enqueued_at'], rows)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+# -----------------------------
+# Worker side
+# -----------------------------
+def worker_name():
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def requeue_stale(visibility_timeout, max_attempts):
+    """Return jobs of dead workers to the queue (or fail them after max_attempts)"""
+    cutoff = datetime.utcnow() - timedelta(seconds=visibility_timeout)
+    stale = and_(_jobs.c.status == 'processing', _jobs.c.started_at < cutoff)
+    db.session.execute(_jobs.update().where(stale, _jobs.c.attempts >= max_attempts).values(
+        status='failed', finished_at=datetime.utcnow(), error='visibility timeout'))
+    db.session.execute(_jobs.update().where(stale).values(status='pending', worker=None))
+    db.session.commit()
+
+
+def claim_batch(worker, limit):
+    """
+    Mark up to `limit` of the oldest pending jobs as taken by `worker` and
+    return them as (job_id, post_id, enqueued_at, content) tuples.
+    """
+    candidates = select(_jobs.c.id).where(_jobs.c.status == 'pending').order_by(_jobs.c.id).limit(limit)
+    if db.engine.dialect.name != 'sqlite':
+        candidates = candidates.with_for_update(skip_locked=True)
+    ids = db.session.execute(candidates).scalars().all()
+    if not ids:
+        db.session.commit()
+        return []
+
+    started_at = datetime.utcnow()
+    # The status guard makes a concurrent claim of the same rows a no-op
+    db.session.execute(_jobs.update().where(_jobs.c.id.in_(ids), _jobs.c.status == 'pending').values(
+        status='processing', worker=worker, started_at=started_at, attempts=_jobs.c.attempts + 1))
+    db.session.commit()
+
+    rows = db.session.execute(
+        select(_jobs.c.id, _jobs.c.post_id, _jobs.c.enqueued_at, _posts.c.content)
+        .join(_posts, _posts.c.id == _jobs.c.post_id)
+        .where(_jobs.c.id.in_(ids), _jobs.c.worker == worker, _jobs.c.status == 'processing')
+        .order_by(_jobs.c.id)
+    ).all()
+    db.session.commit()
+    return [tuple(row) for row in rows]
+
+
+def complete_batch(jobs, verdicts, model_version):
+    """Write one verdict per claimed job back to its post and close the jobs, in one transaction"""
+    now = datetime.utcnow()
+    try:
+        db.session.execute(
+            _posts.update().where(_posts.c.id == bindparam('p_id')).values(
+                is_bullying=bindparam('p_is_bullying'),
+                bullying_probability=bindparam('p_probability'),
+                model_version=bindparam('p_model_version'),
+                moderated_at=bindparam('p_moderated_at'),
+            ),
+            [{
+                'p_id': post_id,
+                'p_is_bullying': bool(verdict['label']),
+                'p_probability': float(verdict['probability']),
+                'p_model_version': model_version,
+                'p_moderated_at': now,
+            } for (_, post_id, _, _), verdict in zip(jobs, verdicts)]
+        )
+        db.session.execute(
+            _jobs.update().where(_jobs.c.id.in_([job[0] for job in jobs])).values(
+                status='done', finished_at=now, error=None)
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return now
+
+
+def fail_batch(jobs, error, max_attempts):
+    """Put claimed jobs back in the queue, or mark them failed after max_attempts"""
+    ids = [job[0] for job in jobs]
+    try:
+        db.session.execute(_jobs.update().where(_jobs.c.id.in_(ids), _jobs.c.attempts >= max_attempts).values(
+            status='failed', finished_at=datetime.utcnow(), error=str(error)))
+        db.session.execute(_jobs.update().where(_jobs.c.id.in_(ids), _jobs.c.status == 'processing').values(
+            status='pending', worker=None, error=str(error)))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def queue_stats():
+    """Job counts per status and the age of the oldest pending job"""
+    counts = dict(db.session.execute(
+        select(_jobs.c.status, db.func.count(_jobs.c.id)).group_by(_jobs.c.status)
+    ).all())
+    oldest = db.session.execute(
+        select(db.func.min(_jobs.c.enqueued_at)).where(_jobs.c.status == 'pending')
+    ).scalar()
+    return {
+        'pending': counts.get('pending', 0),
+        'processing': counts.get('processing', 0),
+        'done': counts.get('done', 0),
+        'failed': counts.get('failed', 0),
+        'oldest_pending_age_seconds': (datetime.utcnow() - oldest).total_seconds() if oldest else 0.0,
+    }
@@ -0,0 +1,249 @@
+"""
+NumPy inference backend for the CNN + BiLSTM + SimpleAttention detector.
+
+train_model.py (or export_model.py) writes the weights of the served Keras
+model to models/bully_model.npz; NumpyBullyModel runs the same forward pass
+on CPU without importing TensorFlow. It mirrors the layers as they are
+served from bully_model.h5 (app/utils/layers.py), including the tanh in
+SimpleAttention.
+
+Length buckets: most chat messages are far shorter than max_len, so rows
+are grouped into buckets (e.g. 16/32/64/100 tokens) and run at the bucket
+length. The network was trained without masking, so the padded tail still
+affects the output; to stay exact, everything the tail contributes that
+does not depend on the message is precomputed once from the padding
+embedding (backward LSTM states over the tail, conv windows made only of
+padding, the forward LSTM's input projection). Only the forward LSTM's
+recurrence over the tail still has to run per row.
+"""
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+def _sigmoid(x):
+    # Same value as 1 / (1 + exp(-x)), without overflow warnings
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+
+def _relu(x):
+    return np.maximum(x, 0.0)
+
+
+# -----------------------------
+# Export (training only)
+# -----------------------------
+def export_keras_model(model, path):
+    """Write the weights of a loaded bully_model.h5 Keras model to `path` (.npz)"""
+    arrays = {'format': np.array(FORMAT_VERSION), 'max_len': np.array(model.input_shape[1])}
+    convs, dense = [], []
+    for layer in model.layers:
+        kind = type(layer).__name__
+        weights = layer.get_weights()
+        if kind == 'Embedding':
+            arrays['embedding'] = weights[0]
+        elif kind == 'Conv1D':
+            convs.append(weights)
+        elif kind == 'Bidirectional':
+            for prefix, (kernel, recurrent, bias) in (('lstm_fw', weights[:3]), ('lstm_bw', weights[3:])):
+                arrays[f'{prefix}_kernel'] = kernel
+                arrays[f'{prefix}_recurrent'] = recurrent
+                arrays[f'{prefix}_bias'] = bias
+        elif kind == 'SimpleAttention':
+            arrays['attention'] = weights[0]
+        elif kind == 'Dense':
+            dense.append(weights)
+
+    # Layers are listed in creation order, which is also the concatenation order
+    for i, (kernel, bias) in enumerate(convs):
+        arrays[f'conv{i}_kernel'] = kernel
+        arrays[f'conv{i}_bias'] = bias
+    for i, (kernel, bias) in enumerate(dense):
+        arrays[f'dense{i}_kernel'] = kernel
+        arrays[f'dense{i}_bias'] = bias
+    arrays['n_convs'] = np.array(len(convs))
+    arrays['n_dense'] = np.array(len(dense))
+
+    with open(path, 'wb') as f:
+        np.savez(f, **{k: np.asarray(v) for k, v in arrays.items()})
+
+
+# -----------------------------
+# Inference
+# -----------------------------
+class NumpyBullyModel:
+    """Drop-in replacement for the Keras model's predict()"""
+
+    def __init__(self, arrays, buckets=None):
+        f32 = lambda name: np.ascontiguousarray(arrays[name], dtype=np.float32)
+        if int(arrays['format']) != FORMAT_VERSION:
+            raise ValueError(f"Unsupported NumPy model format {int(arrays['format'])}")
+        self.max_len = int(arrays['max_len'])
+        self.embedding = f32('embedding')
+        self.convs = [(f32(f'conv{i}_kernel'), f32(f'conv{i}_bias')) for i in range(int(arrays['n_convs']))]
+        self.lstm_fw = (f32('lstm_fw_kernel'), f32('lstm_fw_recurrent'), f32('lstm_fw_bias'))
+        self.lstm_bw = (f32('lstm_bw_kernel'), f32('lstm_bw_recurrent'), f32('lstm_bw_bias'))
+        self.attention = f32('attention')
+        self.dense = [(f32(f'dense{i}_kernel'), f32(f'dense{i}_bias')) for i in range(int(arrays['n_dense']))]
+        self.buckets = sorted({min(int(b), self.max_len) for b in (buckets or []) if int(b) > 0})
+        if self.buckets and self.buckets[-1] != self.max_len:
+            self.buckets.append(self.max_len)
+        self._prepare_padding_tables()
+
+    @classmethod
+    def load(cls, path, buckets=None):
+        with np.load(path) as arrays:
+            return cls({name: arrays[name] for name in arrays.files}, buckets=buckets)
+
+    def predict(self, x, batch_size=None, verbose=0):
+        """Same contract as keras Model.predict for this network: (B, max_len) -> (B, 1)"""
+        x = np.asarray(x)
+        if not self.buckets or len(x) == 0:
+            return self.forward(x)[:, None]
+
+        out = np.empty(len(x), dtype=np.float32)
+        lengths = self.sequence_lengths(x)
+        bucket_of = np.searchsorted(self.buckets, lengths)
+        for b in np.unique(bucket_of):
+            rows = np.nonzero(bucket_of == b)[0]
+            out[rows] = self.forward_trimmed(x[rows], self.buckets[b])
+        return out[:, None]
+
+    @staticmethod
+    def sequence_lengths(x):
+        """Index after the last non-padding token of each row (0 for empty rows)"""
+        nonzero = x != 0
+        last = nonzero.shape[1] - np.argmax(nonzero[:, ::-1], axis=1)
+        return np.where(nonzero.any(axis=1), last, 0)
+
+    def _prepare_padding_tables(self):
+        pad = self.embedding[0]
+        # Forward LSTM input projection of a padding step
+        kernel, recurrent, bias = self.lstm_fw
+        self._fw_pad_proj = pad @ kernel + bias
+        # Backward LSTM state after p padding steps, p = 0..max_len
+        kernel, recurrent, bias = self.lstm_bw
+        pads = np.broadcast_to(pad, (1, self.max_len, pad.shape[0]))
+        states, _, cells = self._lstm(pads, kernel, recurrent, bias, return_cells=True)
+        units = recurrent.shape[0]
+        zero = np.zeros((1, units), dtype=np.float32)
+        self._bw_pad_h = np.concatenate([zero, states[0]])
+        self._bw_pad_c = np.concatenate([zero, cells[0]])
+        # Conv output of a window made only of padding
+        self._conv_pad = [_relu(sum(pad @ kernel[j] for j in range(kernel.shape[0])) + bias)
+                          for kernel, bias in self.convs]
+
+    # -----------------------------
+    # Layers
+    # -----------------------------
+    @staticmethod
+    def _conv_max(emb, kernel, bias):
+        """Conv1D(padding='valid', relu) followed by GlobalMaxPooling1D"""
+        k = kernel.shape[0]
+        steps = emb.shape[1] - k + 1
+        out = emb[:, 0:steps] @ kernel[0]
+        for j in range(1, k):
+            out += emb[:, j:j + steps] @ kernel[j]
+        return _relu(out + bias).max(axis=1)
+
+    @staticmethod
+    def _lstm_steps(x_proj, recurrent, h, c, return_cells=False):
+        """
+        Keras LSTM recurrence (gates i, f, c, o; sigmoid/tanh) over a
+        precomputed input projection. Returns (hidden states, h, c); with
+        return_cells the last element holds every cell state instead.
+        """
+        batch, steps, _ = x_proj.shape
+        units = recurrent.shape[0]
+        outputs = np.empty((batch, steps, units), dtype=np.float32)
+        cells = np.empty((batch, steps, units), dtype=np.float32) if return_cells else None
+        for t in range(steps):
+            z = x_proj[:, t] + h @ recurrent
+            i = _sigmoid(z[:, :units])
+            f = _sigmoid(z[:, units:2 * units])
+            g = np.tanh(z[:, 2 * units:3 * units])
+            o = _sigmoid(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * np.tanh(c)
+            outputs[:, t] = h
+            if return_cells:
+                cells[:, t] = c
+        if return_cells:
+            return outputs, h, cells
+        return outputs, h, c
+
+    @classmethod
+    def _lstm(cls, emb, kernel, recurrent, bias, h=None, c=None, return_cells=False):
+        batch = emb.shape[0]
+        units = recurrent.shape[0]
+        if h is None:
+            h = np.zeros((batch, units), dtype=np.float32)
+            c = np.zeros((batch, units), dtype=np.float32)
+        return cls._lstm_steps(emb @ kernel + bias, recurrent, h, c, return_cells=return_cells)
+
+    def _attention(self, seq):
+        scores = np.tanh(seq @ self.attention)            # (B, T)
+        scores = scores - scores.max(axis=1, keepdims=True)
+        weights = np.exp(scores)
+        weights /= weights.sum(axis=1, keepdims=True)
+        return (seq * weights[:, :, None]).sum(axis=1)
+
+    def _head(self, features):
+        h = np.concatenate(features, axis=-1)
+        for kernel, bias in self.dense[:-1]:
+            h = _relu(h @ kernel + bias)
+        kernel, bias = self.dense[-1]
+        return _sigmoid(h @ kernel + bias)[:, 0]
+
+    def forward(self, x):
+        """Reference forward pass over the fully padded input"""
+        emb = self.embedding[x]                           # (B, T, D)
+        features = [self._conv_max(emb, kernel, bias) for kernel, bias in self.convs]
+
+        forward, _, _ = self._lstm(emb, *self.lstm_fw)
+        backward, _, _ = self._lstm(emb[:, ::-1], *self.lstm_bw)
+        features.append(self._attention(np.concatenate([forward, backward[:, ::-1]], axis=-1)))
+        return self._head(features)
+
+    def forward_trimmed(self, x, length):
+        """
+        Same result as forward(x) for rows whose tokens all lie in x[:, :length]
+        (everything after is padding), computing only the first `length` steps
+        from the input and taking the padded tail from precomputed tables.
+        """
+        batch = x.shape[0]
+        tail = self.max_len - length
+        emb = self.embedding[x[:, :length]]
+        pad = self.embedding[0]
+
+        # CNN: windows that touch the message see at most k-1 padding rows;
+        # windows made only of padding share one precomputed value
+        features = []
+        for (kernel, bias), pad_value in zip(self.convs, self._conv_pad):
+            k = kernel.shape[0]
+            extra = min(k - 1, tail)
+            ext = np.concatenate([emb, np.broadcast_to(pad, (batch, extra, pad.shape[0]))], axis=1) if extra else emb
+            value = self._conv_max(ext, kernel, bias)
+            if tail >= k:
+                value = np.maximum(value, pad_value)
+            features.append(value)
+
+        # Forward LSTM: message steps, then the padded tail (constant input)
+        kernel, recurrent, bias = self.lstm_fw
+        forward, h, c = self._lstm(emb, kernel, recurrent, bias)
+        if tail:
+            tail_proj = np.broadcast_to(self._fw_pad_proj, (batch, tail, self._fw_pad_proj.shape[0]))
+            forward_tail, _, _ = self._lstm_steps(tail_proj, recurrent, h, c)
+            forward = np.concatenate([forward, forward_tail], axis=1)
+
+        # Backward LSTM: starts from the state after `tail` padding steps
+        h0 = np.repeat(self._bw_pad_h[tail][None], batch, axis=0)
+        c0 = np.repeat(self._bw_pad_c[tail][None], batch, axis=0)
+        backward, _, _ = self._lstm(emb[:, ::-1], *self.lstm_bw, h=h0, c=c0)
+        backward = backward[:, ::-1]
+        if tail:
+            backward_tail = np.broadcast_to(self._bw_pad_h[tail:0:-1], (batch, tail, backward.shape[2]))
+            backward = np.concatenate([backward, backward_tail], axis=1)
+
+        features.append(self._attention(np.concatenate([forward, backward], axis=-1)))
+        return self._head(features)
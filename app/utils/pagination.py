@@ -0,0 +1,40 @@
+"""
+Opaque cursors for keyset pagination.
+
+A cursor is URL-safe base64 of a small JSON object holding the sort key of
+the last row returned. Clients pass it back unchanged as `?cursor=`.
+"""
+import base64
+import json
+from datetime import datetime
+
+
+class CursorError(ValueError):
+    pass
+
+
+def encode_cursor(**values):
+    """Encode sort-key values (datetimes become ISO strings)"""
+    payload = {k: v.isoformat() if isinstance(v, datetime) else v for k, v in values.items()}
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, fields, datetime_fields=()):
+    """
+    Decode a cursor from encode_cursor. Raises CursorError if it is malformed
+    or lacks any of `fields`; `datetime_fields` are parsed back to datetimes.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, dict):
+            raise ValueError("cursor is not an object")
+        for field in fields:
+            if field not in values:
+                raise KeyError(field)
+        for field in datetime_fields:
+            values[field] = datetime.fromisoformat(values[field])
+        return values
+    except (ValueError, KeyError, TypeError) as e:
+        raise CursorError(f"Invalid cursor: {e}") from e
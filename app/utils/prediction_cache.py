@@ -0,0 +1,209 @@
+"""
+Bounded cache of detector probabilities.
+
+Keys are derived from the model version and the padded token sequence fed
+to the model, so two texts that tokenize identically share an entry, and a
+new bully_model.h5/tokenizer.json never reuses old entries.
+
+Backends:
+  - MemoryCacheBackend: in-process LRU with TTL (default)
+  - SQLiteCacheBackend: a local SQLite file shared by all workers on a host
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_key(model_version, token_row):
+    """Cache key for one padded token row (a NumPy int array)"""
+    digest = hashlib.blake2b(token_row.tobytes(), digest_size=16).hexdigest()
+    return f"{model_version}:{digest}"
+
+
+class MemoryCacheBackend:
+    def __init__(self, max_entries=10000, ttl_seconds=3600):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl_seconds)
+        self._data = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        out = []
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is None:
+                    out.append(None)
+                elif entry[1] < now:
+                    del self._data[key]
+                    self.expirations += 1
+                    out.append(None)
+                else:
+                    self._data.move_to_end(key)
+                    out.append(entry[0])
+        return out
+
+    def set_many(self, items):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in items.items():
+                self._data[key] = (value, expires_at)
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, model_version):
+        """Drop every entry that was not produced by `model_version`"""
+        prefix = f"{model_version}:"
+        with self._lock:
+            for key in [k for k in self._data if not k.startswith(prefix)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCacheBackend:
+    """
+    Cache stored in a local SQLite file so every worker process on the host
+    shares hits. Eviction is oldest-first by expiry once the table exceeds
+    max_entries.
+    """
+
+    def __init__(self, path, max_entries=100000, ttl_seconds=3600):
+        self.path = path
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl_seconds)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS prediction_cache ("
+            " key TEXT PRIMARY KEY, version TEXT NOT NULL, value REAL NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_prediction_cache_expires_at ON prediction_cache (expires_at)")
+        self.evictions = 0
+        self.expirations = 0
+        self._writes_since_trim = 0
+
+    def get_many(self, keys):
+        if not keys:
+            return []
+        now = time.time()
+        keys = list(keys)
+        rows = []
+        with self._lock:
+            # Bounded IN lists (SQLite caps the number of bound parameters)
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows += self._conn.execute(
+                    f"SELECT key, value, expires_at FROM prediction_cache WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+        found = {}
+        for key, value, expires_at in rows:
+            if expires_at >= now:
+                found[key] = value
+            else:
+                self.expirations += 1
+        return [found.get(key) for key in keys]
+
+    def set_many(self, items):
+        if not items:
+            return
+        expires_at = time.time() + self.ttl
+        rows = [(key, key.split(":", 1)[0], value, expires_at) for key, value in items.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO prediction_cache (key, version, value, expires_at) VALUES (?, ?, ?, ?)", rows
+            )
+            self._writes_since_trim += len(rows)
+            if self._writes_since_trim >= max(1, self.max_entries // 10):
+                self._trim()
+
+    def _trim(self):
+        self._writes_since_trim = 0
+        self._conn.execute("DELETE FROM prediction_cache WHERE expires_at < ?", (time.time(),))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM prediction_cache").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM prediction_cache WHERE key IN "
+                "(SELECT key FROM prediction_cache ORDER BY expires_at LIMIT ?)", (excess,)
+            )
+            self.evictions += excess
+
+    def invalidate(self, model_version):
+        with self._lock:
+            self._conn.execute("DELETE FROM prediction_cache WHERE version != ?", (model_version,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM prediction_cache")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM prediction_cache").fetchone()[0]
+
+
+class PredictionCache:
+    """Front end over a cache backend, with hit/miss accounting"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_many(self, keys):
+        values = self.backend.get_many(keys)
+        hits = sum(1 for v in values if v is not None)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(values) - hits
+        return values
+
+    def set_many(self, items):
+        self.backend.set_many(items)
+
+    def invalidate(self, model_version):
+        self.backend.invalidate(model_version)
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'entries': len(self.backend),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.backend.evictions,
+            'expirations': self.backend.expirations,
+            'invalidations': self.invalidations,
+        }
+
+
+def create_prediction_cache(kind='memory', max_entries=10000, ttl_seconds=3600, path=None):
+    """Build the cache selected in Config; returns None when caching is off"""
+    kind = (kind or 'off').lower()
+    if kind == 'memory':
+        return PredictionCache(MemoryCacheBackend(max_entries, ttl_seconds))
+    if kind == 'sqlite':
+        return PredictionCache(SQLiteCacheBackend(path, max_entries, ttl_seconds))
+    if kind in ('off', 'none', ''):
+        return None
+    raise ValueError(f"Unknown prediction cache backend: {kind}")
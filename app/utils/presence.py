@@ -0,0 +1,338 @@
+"""
+Presence registry: which users are online, on which sockets, across every
+Socket.IO node.
+
+A user may have several sockets (tabs, devices); they are online while at
+least one of them is. Each socket is stored with an expiry time. The node
+that holds the socket refreshes it every `ttl / 3` seconds (sweep), so the
+sockets of a node that dies without running its disconnect handlers expire
+after `ttl` seconds and the first node to notice reports the user offline.
+
+Backends:
+  - MemoryPresenceBackend: this process only (single node, development)
+  - RedisPresenceBackend: shared by every node, for any server that speaks
+    the Redis protocol (redis-server, KeyDB, benchmarks/resp_server.py)
+
+Delivery between nodes is not done here: Flask-SocketIO's message queue
+(SOCKETIO_MESSAGE_QUEUE) carries emits to rooms whose sockets live on
+another node.
+"""
+import threading
+import time
+
+
+class MemoryPresenceBackend:
+    def __init__(self):
+        self._sockets = {}  # username -> {sid: expires_at}
+        self._version = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _live(sockets, now):
+        return any(expires_at > now for expires_at in sockets.values())
+
+    def add(self, username, sid, expires_at):
+        """Store a socket; True if the user had no live socket before"""
+        now = time.time()
+        with self._lock:
+            sockets = self._sockets.setdefault(username, {})
+            first = not self._live(sockets, now)
+            sockets[sid] = expires_at
+        return first
+
+    def remove(self, username, sid):
+        """Drop a socket; True if it was the user's last one"""
+        with self._lock:
+            sockets = self._sockets.get(username)
+            if not sockets or sockets.pop(sid, None) is None:
+                return False
+            if sockets:
+                return False  # other sockets left (expired ones are reported by prune)
+            del self._sockets[username]
+            return True
+
+    def refresh(self, entries, expires_at):
+        with self._lock:
+            for username, sid in entries:
+                self._sockets.setdefault(username, {})[sid] = expires_at
+
+    def online_among(self, usernames):
+        now = time.time()
+        with self._lock:
+            return {u for u in usernames if self._live(self._sockets.get(u, {}), now)}
+
+    def online_users(self):
+        now = time.time()
+        with self._lock:
+            return sorted(u for u, sockets in self._sockets.items() if self._live(sockets, now))
+
+    def prune(self, now):
+        """Drop expired sockets; returns the users that went offline"""
+        offline = []
+        with self._lock:
+            for username, sockets in list(self._sockets.items()):
+                expired = [sid for sid, expires_at in sockets.items() if expires_at <= now]
+                for sid in expired:
+                    del sockets[sid]
+                if expired and not sockets:
+                    del self._sockets[username]
+                    offline.append(username)
+        return offline
+
+    def next_version(self):
+        with self._lock:
+            self._version += 1
+            return self._version
+
+    def version(self):
+        return self._version
+
+
+class RedisPresenceBackend:
+    """
+    `<prefix>user:<name>` is a hash of sid -> expiry (epoch seconds) and
+    `<prefix>users` the set of names that may have sockets. The set is
+    re-added on every refresh, so a removal that raced with a connect on
+    another node is repaired within one sweep. `<prefix>version` counts
+    presence updates across all nodes.
+    """
+
+    def __init__(self, url, prefix='presence:'):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("PRESENCE_BACKEND=redis needs the 'redis' package (pip install redis)") from e
+        self.prefix = prefix
+        self._users_key = prefix + 'users'
+        self._version_key = prefix + 'version'
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+
+    def _key(self, username):
+        return f"{self.prefix}user:{username}"
+
+    @staticmethod
+    def _live(sockets, now):
+        return any(float(expires_at) > now for expires_at in sockets.values())
+
+    def add(self, username, sid, expires_at):
+        pipe = self._client.pipeline()
+        pipe.hgetall(self._key(username))
+        pipe.hset(self._key(username), sid, expires_at)
+        pipe.sadd(self._users_key, username)
+        before, _, _ = pipe.execute()
+        return not self._live(before, time.time())
+
+    def remove(self, username, sid):
+        pipe = self._client.pipeline()
+        pipe.hdel(self._key(username), sid)
+        pipe.hgetall(self._key(username))
+        removed, rest = pipe.execute()
+        if not removed or rest:
+            return False
+        self._client.srem(self._users_key, username)
+        return True
+
+    def refresh(self, entries, expires_at):
+        pipe = self._client.pipeline(transaction=False)
+        for username, sid in entries:
+            pipe.hset(self._key(username), sid, expires_at)
+            pipe.sadd(self._users_key, username)
+        pipe.execute()
+
+    def _sockets(self, usernames):
+        pipe = self._client.pipeline(transaction=False)
+        for username in usernames:
+            pipe.hgetall(self._key(username))
+        return zip(usernames, pipe.execute())
+
+    def online_among(self, usernames):
+        now = time.time()
+        return {u for u, sockets in self._sockets(list(usernames)) if self._live(sockets, now)}
+
+    def online_users(self):
+        now = time.time()
+        return sorted(u for u, sockets in self._sockets(list(self._client.smembers(self._users_key)))
+                      if self._live(sockets, now))
+
+    def prune(self, now):
+        offline = []
+        for username, sockets in self._sockets(list(self._client.smembers(self._users_key))):
+            expired = [sid for sid, expires_at in sockets.items() if float(expires_at) <= now]
+            if self._live(sockets, now):
+                if expired:
+                    self._client.hdel(self._key(username), *expired)
+                continue
+            # HDEL is atomic: only the node that actually removed the sockets reports the user
+            if expired and self._client.hdel(self._key(username), *expired):
+                offline.append(username)
+            self._client.srem(self._users_key, username)
+        return offline
+
+    def next_version(self):
+        return self._client.incr(self._version_key)
+
+    def version(self):
+        return int(self._client.get(self._version_key) or 0)
+
+
+class SocketIndex:
+    """
+    username -> set of sids and sid -> username, kept in step under one
+    lock. Every operation is O(1) except snapshots, so a disconnect costs
+    the same with ten sockets connected or a hundred thousand.
+    """
+
+    def __init__(self):
+        self._by_user = {}  # username -> set of sids
+        self._by_sid = {}   # sid -> username
+        self._lock = threading.Lock()
+
+    def add(self, username, sid):
+        """True if this is the user's first socket here"""
+        with self._lock:
+            previous = self._by_sid.get(sid)
+            if previous is not None and previous != username:
+                self._discard(previous, sid)
+            self._by_sid[sid] = username
+            sids = self._by_user.setdefault(username, set())
+            first = not sids
+            sids.add(sid)
+            return first
+
+    def remove(self, sid):
+        """(username, was_last_socket), or (None, False) for an unknown sid"""
+        with self._lock:
+            username = self._by_sid.pop(sid, None)
+            if username is None:
+                return None, False
+            return username, self._discard(username, sid)
+
+    def _discard(self, username, sid):
+        sids = self._by_user.get(username)
+        if sids is None:
+            return False
+        sids.discard(sid)
+        if sids:
+            return False
+        del self._by_user[username]
+        return True
+
+    def user_for(self, sid):
+        return self._by_sid.get(sid)
+
+    def sids(self, username):
+        with self._lock:
+            return frozenset(self._by_user.get(username, ()))
+
+    def items(self):
+        """Snapshot of (username, sid) pairs"""
+        with self._lock:
+            return [(username, sid) for sid, username in self._by_sid.items()]
+
+    def user_count(self):
+        return len(self._by_user)
+
+    def __len__(self):
+        return len(self._by_sid)
+
+    def check(self):
+        """Both directions describe the same sockets (for tests and benchmarks)"""
+        with self._lock:
+            forward = {(u, sid) for u, sids in self._by_user.items() for sid in sids}
+            reverse = set((u, sid) for sid, u in self._by_sid.items())
+            return forward == reverse and all(self._by_user.values())
+
+
+class PresenceRegistry:
+    """This node's sockets (a SocketIndex) in front of the shared backend"""
+
+    def __init__(self, backend, ttl=60):
+        self.backend = backend
+        self.ttl = float(ttl)
+        self.local = SocketIndex()  # sockets connected to this node
+        self._sweeper = None
+        self._start_lock = threading.Lock()
+        self.expired_users = 0
+
+    def connect(self, username, sid):
+        """Register a socket; True if the user just came online"""
+        self.local.add(username, sid)
+        return self.backend.add(username, sid, time.time() + self.ttl)
+
+    def disconnect(self, sid):
+        """Forget a socket; returns (username, went_offline), username None for an unknown sid"""
+        username, _ = self.local.remove(sid)
+        if username is None:
+            return None, False
+        return username, self.backend.remove(username, sid)
+
+    def user_for(self, sid):
+        """Username of a socket of this node (request.sid is always local)"""
+        return self.local.user_for(sid)
+
+    def is_online(self, username):
+        return bool(self.backend.online_among([username]))
+
+    def online_among(self, usernames):
+        return self.backend.online_among(usernames)
+
+    def online_users(self):
+        return self.backend.online_users()
+
+    def next_version(self):
+        """Number for the next presence update (monotonic across nodes)"""
+        return self.backend.next_version()
+
+    def version(self):
+        return self.backend.version()
+
+    def sweep(self):
+        """Refresh this node's sockets and expire everyone else's stale ones"""
+        entries = self.local.items()
+        now = time.time()
+        if entries:
+            self.backend.refresh(entries, now + self.ttl)
+        offline = self.backend.prune(now)
+        self.expired_users += len(offline)
+        return offline
+
+    def start_sweeper(self, on_offline):
+        """Sweep every ttl/3 seconds in a daemon thread; on_offline(users) gets the expired users"""
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        with self._start_lock:
+            if self._sweeper is None or not self._sweeper.is_alive():
+                self._sweeper = threading.Thread(target=self._sweep_forever, args=(on_offline,),
+                                                 name='presence-sweeper', daemon=True)
+                self._sweeper.start()
+
+    def _sweep_forever(self, on_offline):
+        while True:
+            time.sleep(self.ttl / 3)
+            try:
+                offline = self.sweep()
+                if offline:
+                    on_offline(offline)
+            except Exception as e:
+                print(f"❌ Presence sweep failed: {str(e)}")
+
+    def stats(self):
+        return {
+            'backend': type(self.backend).__name__,
+            'local_sockets': len(self.local),
+            'local_users': self.local.user_count(),
+            'ttl_seconds': self.ttl,
+            'expired_users': self.expired_users,
+        }
+
+
+def create_presence_registry(kind='memory', redis_url=None, ttl=60):
+    """Build the presence registry selected in Config"""
+    kind = (kind or 'memory').lower()
+    if kind == 'memory':
+        backend = MemoryPresenceBackend()
+    elif kind == 'redis':
+        backend = RedisPresenceBackend(redis_url)
+    else:
+        raise ValueError(f"Unknown presence backend: {kind}")
+    return PresenceRegistry(backend, ttl=ttl)
@@ -0,0 +1,172 @@
+"""
+Presence updates as small deltas to the people who care.
+
+Joins and leaves are collected for PRESENCE_DELTA_MS and sent in one
+batch. Each client gets a single `presence_delta` per batch listing only
+its contacts (conversation partners):
+
+    {"version": 42, "joined": ["alice"], "left": ["bob"]}
+
+Clients that need a full picture (first connect, after a reconnect or a
+missed delta) send `presence_snapshot` and receive
+
+    {"version": 41, "online": ["alice", "carol"]}
+
+Versions come from the presence backend and grow across all nodes. A
+delta whose version is not above the snapshot's was already included in
+it and can be skipped. Applying a delta again does no harm, because
+joined/left only set a state.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import select, union
+
+from app.extensions import socketio
+from app.models import db, Message
+
+
+def conversation_partners(username):
+    """Everyone `username` has exchanged a message with (two index seeks)"""
+    sent = select(Message.receiver.label('partner')).where(Message.sender == username)
+    received = select(Message.sender.label('partner')).where(Message.receiver == username)
+    return set(db.session.execute(union(sent, received)).scalars())
+
+
+class ContactCache:
+    """Conversation partners per user, kept for `ttl` seconds (LRU of `max_entries` users)"""
+
+    def __init__(self, ttl=300, max_entries=50000):
+        self.ttl = float(ttl)
+        self.max_entries = max(1, int(max_entries))
+        self._entries = OrderedDict()  # username -> (expires_at, set of partners)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, username):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(username)
+                self.hits += 1
+                return entry[1]
+        partners = conversation_partners(username)
+        with self._lock:
+            self.misses += 1
+            self._entries[username] = (now + self.ttl, partners)
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return partners
+
+    def add_pair(self, a, b):
+        """A message between a and b: make them contacts in cached entries"""
+        with self._lock:
+            for user, partner in ((a, b), (b, a)):
+                entry = self._entries.get(user)
+                if entry is not None and partner not in entry[1]:
+                    # Cached sets are never changed in place; readers may be iterating them
+                    self._entries[user] = (entry[0], entry[1] | {partner})
+
+
+class PresenceFeed:
+    def __init__(self, presence, contacts, flush_ms=250):
+        self.presence = presence
+        self.contacts = contacts
+        self.flush_interval = max(0.01, float(flush_ms) / 1000.0)
+        self._app = None
+        self._pending = {}  # username -> online (the last change in this window wins)
+        self._lock = threading.Lock()
+        self._has_work = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        # Counters
+        self._changes = 0
+        self._batches = 0
+        self._deltas = 0
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    def start(self, app):
+        """Start the flush thread (it needs the app for contact lookups)"""
+        self._app = app
+        self._ensure_started()
+
+    def record(self, username, online):
+        """Queue a join (online=True) or leave for the next batch"""
+        with self._lock:
+            self._pending[username] = online
+            self._changes += 1
+        self._has_work.set()
+
+    def snapshot(self, username):
+        """Online contacts of `username` with the version they are current as of"""
+        version = self.presence.version()
+        contacts = self.contacts.get(username)
+        return {'version': version, 'online': sorted(self.presence.online_among(contacts))}
+
+    def flush(self):
+        """Send the pending changes, one delta per interested online user; needs an app context"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        # recipient -> ([joined], [left])
+        deltas = {}
+        for username, online in pending.items():
+            for contact in self.contacts.get(username):
+                joined, left = deltas.setdefault(contact, ([], []))
+                (joined if online else left).append(username)
+        recipients = self.presence.online_among(list(deltas)) if deltas else set()
+
+        version = self.presence.next_version()
+        for recipient in recipients:
+            joined, left = deltas[recipient]
+            socketio.emit('presence_delta', {'version': version, 'joined': sorted(joined), 'left': sorted(left)},
+                          to=recipient)
+        with self._lock:
+            self._batches += 1
+            self._deltas += len(recipients)
+        return len(recipients)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'changes': self._changes,
+                'batches': self._batches,
+                'deltas_sent': self._deltas,
+                'pending': len(self._pending),
+                'flush_ms': self.flush_interval * 1000.0,
+                'contact_cache_hits': self.contacts.hits,
+                'contact_cache_misses': self.contacts.misses,
+            }
+
+    # -----------------------------
+    # Flush thread
+    # -----------------------------
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='presence-feed', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._has_work.wait()
+            time.sleep(self.flush_interval)  # let the window fill up
+            self._has_work.clear()
+            with self._app.app_context():
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"❌ Presence delta flush failed: {str(e)}")
+                finally:
+                    db.session.remove()
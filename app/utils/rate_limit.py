@@ -0,0 +1,196 @@
+"""
+Token-bucket rate limits for chat messages, typing events and comments.
+
+Every event kind has up to two buckets, one per user and one per client
+IP, each given as "<burst>/<seconds>": up to <burst> events at once,
+refilled evenly over <seconds>. An event goes through only when every
+bucket it belongs to has a token, and then takes one from each. A
+rejected event is dropped before the detector runs, so a flood costs
+neither an inference nor a database write.
+
+Backends:
+  - MemoryBucketBackend: buckets in this process (one node)
+  - RedisBucketBackend: buckets shared by every node, updated by one
+    Lua script per check and timed by the Redis server's clock. While
+    Redis is unreachable the limiter falls back to its local buckets.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+# Event kinds whose accepted events run the detector
+INFERENCE_EVENTS = ('message', 'comment')
+
+
+def parse_limit(spec):
+    """'30/10' -> (capacity 30, refill rate 3 per second); empty -> None (no limit)"""
+    spec = (spec or '').strip()
+    if not spec:
+        return None
+    try:
+        burst, seconds = spec.split('/')
+        burst, seconds = float(burst), float(seconds)
+    except ValueError:
+        raise ValueError(f"Rate limit must look like '<burst>/<seconds>', got {spec!r}")
+    if burst < 1 or seconds <= 0:
+        raise ValueError(f"Rate limit {spec!r} needs a burst of at least 1 and a positive period")
+    return burst, burst / seconds
+
+
+class MemoryBucketBackend:
+    def __init__(self, max_keys=100000):
+        self.max_keys = max(1, int(max_keys))
+        self._buckets = OrderedDict()  # key -> (tokens, updated at, capacity, rate), least recently used first
+        self._lock = threading.Lock()
+
+    def take(self, limits):
+        """
+        Take one token from each bucket in `limits` ([(key, capacity, rate)]),
+        or from none of them. Returns (allowed, seconds until a retry can pass).
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            wait = 0.0
+            for key, capacity, rate in limits:
+                tokens, updated, _, _ = self._buckets.get(key, (capacity, now, capacity, rate))
+                tokens = min(capacity, tokens + (now - updated) * rate)
+                levels.append(tokens)
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) / rate)
+            if wait > 0:
+                return False, wait
+            for (key, capacity, rate), tokens in zip(limits, levels):
+                self._buckets[key] = (tokens - 1, now, capacity, rate)
+                self._buckets.move_to_end(key)
+            # Past max_keys drop the least recently used buckets, the ones most likely refilled by now
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return True, 0.0
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+# KEYS: bucket keys; ARGV: capacity and rate of each key in turn.
+# Returns {1, "0"} or {0, "<seconds to wait>"} (Lua numbers would be truncated to integers).
+_TAKE_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local levels = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    levels[i] = tokens
+    if tokens < 1 then
+        wait = math.max(wait, (1 - tokens) / rate)
+    end
+end
+if wait > 0 then
+    return {0, tostring(wait)}
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i - 1])
+    local rate = tonumber(ARGV[2 * i])
+    redis.call('HSET', key, 'tokens', tostring(levels[i] - 1), 'ts', tostring(now))
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000) + 1000)
+end
+return {1, '0'}
+"""
+
+
+class RedisBucketBackend:
+    """One `<prefix><bucket>` hash per bucket, expiring once it would be full again"""
+
+    def __init__(self, url, prefix='ratelimit:'):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis needs the 'redis' package (pip install redis)") from e
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=1)
+        self._take = self._client.register_script(_TAKE_SCRIPT)
+
+    def take(self, limits):
+        keys = [self.prefix + key for key, _, _ in limits]
+        args = [value for _, capacity, rate in limits for value in (repr(capacity), repr(rate))]
+        allowed, wait = self._take(keys=keys, args=args)
+        return bool(int(allowed)), float(wait)
+
+
+class RateLimiter:
+    def __init__(self, limits, backend=None, fallback_seconds=10):
+        """
+        `limits` is {kind: {'user': spec, 'ip': spec}} with parse_limit specs.
+        `backend` is the shared store; None keeps every bucket in this process.
+        """
+        self.limits = {kind: {scope: parse_limit(spec) for scope, spec in scopes.items()}
+                       for kind, scopes in limits.items()}
+        self.shared = backend
+        self.local = MemoryBucketBackend()
+        self.fallback_seconds = float(fallback_seconds)
+        self._shared_retry_at = 0.0
+        self._lock = threading.Lock()
+
+        # Counters: kind -> [allowed, rejected]
+        self._counts = {kind: [0, 0] for kind in self.limits}
+        self._shared_errors = 0
+
+    def allow(self, kind, user=None, ip=None):
+        """Whether one `kind` event from `user` at `ip` may go through: (allowed, retry after seconds)"""
+        scopes = self.limits.get(kind, {})
+        buckets = []
+        for scope, ident in (('user', user), ('ip', ip)):
+            limit = scopes.get(scope)
+            if limit is not None and ident:
+                buckets.append((f"{kind}:{scope}:{ident}", limit[0], limit[1]))
+        allowed, retry_after = self._take(buckets) if buckets else (True, 0.0)
+        with self._lock:
+            self._counts.setdefault(kind, [0, 0])[0 if allowed else 1] += 1
+        return allowed, retry_after
+
+    def _take(self, buckets):
+        if self.shared is not None and time.monotonic() >= self._shared_retry_at:
+            try:
+                return self.shared.take(buckets)
+            except Exception as e:
+                with self._lock:
+                    self._shared_errors += 1
+                    self._shared_retry_at = time.monotonic() + self.fallback_seconds
+                print(f"⚠️ Shared rate limit store unavailable, using local buckets for "
+                      f"{self.fallback_seconds:g}s: {str(e)}")
+        return self.local.take(buckets)
+
+    def stats(self):
+        with self._lock:
+            events = {kind: {'allowed': allowed, 'rejected': rejected}
+                      for kind, (allowed, rejected) in self._counts.items()}
+            shared_errors = self._shared_errors
+        # Every rejected message or comment is a detector run (and a row) that never happened
+        saved = sum(events[kind]['rejected'] for kind in INFERENCE_EVENTS if kind in events)
+        ran = sum(events[kind]['allowed'] for kind in INFERENCE_EVENTS if kind in events)
+        return {
+            'backend': type(self.local if self.shared is None else self.shared).__name__,
+            'events': events,
+            'inference_saved': saved,
+            'inference_saved_fraction': saved / (saved + ran) if saved + ran else 0.0,
+            'local_buckets': len(self.local),
+            'shared_errors': shared_errors,
+        }
+
+
+def create_rate_limiter(kind='memory', redis_url=None, limits=None):
+    """Build the rate limiter selected in Config"""
+    kind = (kind or 'memory').lower()
+    if kind == 'memory':
+        backend = None
+    elif kind == 'redis':
+        backend = RedisBucketBackend(redis_url)
+    else:
+        raise ValueError(f"Unknown rate limit backend: {kind}")
+    return RateLimiter(limits or {}, backend=backend)
@@ -0,0 +1,165 @@
+"""
+Coalesced read receipts.
+
+Marking messages as read used to be one UPDATE and commit per socket event
+and per history fetch. Here the message ids are collected per reader, and a
+background thread applies them every READ_RECEIPT_FLUSH_MS in one
+transaction, with one UPDATE per reader. The flush happens sooner when
+READ_RECEIPT_MAX_PENDING ids are waiting.
+
+A `mark_as_read` event is answered with `messages_marked_read` after its
+ids were written, not before. Code that reads the flags of one user (history,
+the unread counts of the conversation list) treats pending_ids(username) as
+read instead of forcing a flush, so a reader always sees their own receipts
+and reads never commit. With write-behind persistence the
+flush waits for queued messages first, so a receipt never misses its row.
+"""
+import threading
+from collections import defaultdict
+
+from flask import current_app
+
+from app.extensions import socketio
+from app.models import db, Message
+from app.utils.message_writer import message_writer
+from config import Config
+
+
+class ReadReceiptCoalescer:
+    def __init__(self, flush_ms=200, max_pending=5000):
+        self.flush_interval = max(0.0, float(flush_ms)) / 1000.0
+        self.max_pending = max(1, int(max_pending))
+        self._app = None
+        self._lock = threading.Lock()
+        self._pending = defaultdict(set)   # reader -> message ids
+        self._notices = defaultdict(list)  # reader -> [(sid, ids)] to answer after the write
+        self._pending_count = 0
+        self._has_work = threading.Event()
+        self._flush_now = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        # Counters
+        self._events = 0
+        self._ids = 0
+        self._flushes = 0
+        self._rows = 0
+        self._failures = 0
+
+    # -----------------------------
+    # Public API
+    # -----------------------------
+    def add(self, username, message_ids, sid=None):
+        """
+        Queue `message_ids` (received by `username`) to be marked read. With a
+        `sid`, that socket gets `messages_marked_read` once they are written.
+        """
+        ids = set(message_ids)
+        if self._app is None:
+            self._app = current_app._get_current_object()
+        with self._lock:
+            self._events += 1
+            self._ids += len(ids)
+            before = len(self._pending[username])
+            self._pending[username].update(ids)
+            self._pending_count += len(self._pending[username]) - before
+            if sid is not None:
+                self._notices[username].append((sid, sorted(ids)))
+            full = self._pending_count >= self.max_pending
+        self._ensure_started()
+        self._has_work.set()
+        if full:
+            self._flush_now.set()
+
+    def flush(self, username=None):
+        """Write pending receipts now (all readers, or only `username`); needs an app context"""
+        with self._lock:
+            if username is None:
+                pending, notices = dict(self._pending), dict(self._notices)
+                self._pending.clear()
+                self._notices.clear()
+            else:
+                pending = {username: self._pending.pop(username)} if username in self._pending else {}
+                notices = {username: self._notices.pop(username)} if username in self._notices else {}
+            self._pending_count -= sum(len(ids) for ids in pending.values())
+        if not pending:
+            return 0
+
+        for reader in pending:
+            message_writer.sync(reader)  # the messages may still wait for their group commit
+        try:
+            rows = 0
+            for reader, ids in pending.items():
+                rows += Message.query.filter(
+                    Message.id.in_(ids),
+                    Message.receiver == reader,
+                    Message.is_read == False
+                ).update({'is_read': True}, synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            # Put everything back; the next flush retries
+            with self._lock:
+                self._failures += 1
+                for reader, ids in pending.items():
+                    before = len(self._pending[reader])
+                    self._pending[reader].update(ids)
+                    self._pending_count += len(self._pending[reader]) - before
+                for reader, waiting in notices.items():
+                    self._notices[reader][:0] = waiting
+            self._has_work.set()
+            print(f"❌ Error writing read receipts: {str(e)}")
+            return 0
+
+        with self._lock:
+            self._flushes += 1
+            self._rows += rows
+        for waiting in notices.values():
+            for sid, ids in waiting:
+                socketio.emit('messages_marked_read', {'count': len(ids), 'message_ids': ids}, to=sid)
+        return rows
+
+    def pending_ids(self, username):
+        """Ids of `username` queued but not written yet (a failed flush puts them back)"""
+        with self._lock:
+            return set(self._pending.get(username, ()))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'events': self._events,
+                'ids': self._ids,
+                'flushes': self._flushes,
+                'rows_updated': self._rows,
+                'failures': self._failures,
+                'pending': self._pending_count,
+                'flush_ms': self.flush_interval * 1000.0,
+                'avg_events_per_flush': self._events / self._flushes if self._flushes else 0.0,
+            }
+
+    # -----------------------------
+    # Flush thread
+    # -----------------------------
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='read-receipts', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._has_work.wait()
+            # Let the window fill up, unless max_pending was reached
+            self._flush_now.wait(self.flush_interval)
+            self._has_work.clear()
+            self._flush_now.clear()
+            with self._app.app_context():
+                try:
+                    self.flush()
+                finally:
+                    db.session.remove()
+
+
+read_receipts = ReadReceiptCoalescer(Config.READ_RECEIPT_FLUSH_MS, Config.READ_RECEIPT_MAX_PENDING)
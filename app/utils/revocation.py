@@ -0,0 +1,171 @@
+"""
+Revocation store for JWTs (replaces the in-memory blacklist set).
+
+/logout revokes a token's JTI until the token's own `exp`; after that the
+token is rejected by its signature check anyway, so the entry can go.
+
+Backends:
+  - SQLRevocationBackend: the `revoked_token` table (jti primary key,
+    indexed expires_at) in the app database, shared by every worker
+  - RedisRevocationBackend: one key per JTI with a TTL, for any server
+    that speaks the Redis protocol (redis-server, KeyDB, a local stand-in)
+  - MemoryRevocationBackend: per process, lost on restart (development)
+
+RevocationStore sits in front of the backend in each worker:
+  - JTIs this worker revoked are remembered locally, so they are rejected
+    without a lookup
+  - a "not revoked" answer is cached for `negative_ttl` seconds, so a token
+    that is used many times costs one backend lookup per window. A logout
+    done on another worker is therefore seen at most `negative_ttl`
+    seconds late.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+
+class MemoryRevocationBackend:
+    def __init__(self):
+        self._data = {}  # jti -> exp (epoch seconds)
+        self._lock = threading.Lock()
+
+    def add(self, jti, exp):
+        now = time.time()
+        with self._lock:
+            self._data[jti] = exp
+            # Drop entries whose token has expired on its own
+            for key in [k for k, v in self._data.items() if v <= now]:
+                del self._data[key]
+
+    def contains(self, jti):
+        exp = self._data.get(jti)
+        return exp is not None and exp > time.time()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLRevocationBackend:
+    """Stores revocations in the RevokedToken table; expired rows are purged on write"""
+
+    def __init__(self, purge_interval=300):
+        self.purge_interval = float(purge_interval)
+        self._last_purge = 0.0
+
+    def add(self, jti, exp):
+        from app.models import db, RevokedToken
+        expires_at = datetime.utcfromtimestamp(exp)
+        try:
+            db.session.merge(RevokedToken(jti=jti, expires_at=expires_at))
+            if time.time() - self._last_purge >= self.purge_interval:
+                self._last_purge = time.time()
+                RevokedToken.query.filter(RevokedToken.expires_at < datetime.utcnow()).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def contains(self, jti):
+        from app.models import db, RevokedToken
+        row = db.session.get(RevokedToken, jti)
+        return row is not None and row.expires_at > datetime.utcnow()
+
+    def __len__(self):
+        from app.models import RevokedToken
+        return RevokedToken.query.filter(RevokedToken.expires_at >= datetime.utcnow()).count()
+
+
+class RedisRevocationBackend:
+    """One `<prefix><jti>` key per revoked token, expiring with the token"""
+
+    def __init__(self, url, prefix='revoked:'):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("REVOCATION_BACKEND=redis needs the 'redis' package (pip install redis)") from e
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def add(self, jti, exp):
+        ttl = int(exp - time.time()) + 1
+        if ttl > 0:
+            self._client.set(self.prefix + jti, 1, ex=ttl)
+
+    def contains(self, jti):
+        return bool(self._client.exists(self.prefix + jti))
+
+    def __len__(self):
+        return sum(1 for _ in self._client.scan_iter(match=self.prefix + '*'))
+
+
+class RevocationStore:
+    """Per-worker front end over a revocation backend"""
+
+    def __init__(self, backend, negative_ttl=30, max_cached=100000):
+        self.backend = backend
+        self.negative_ttl = float(negative_ttl)
+        self.max_cached = max(1, int(max_cached))
+        self._revoked = {}                # jti -> exp, revoked by this worker
+        self._not_revoked = OrderedDict()  # jti -> checked until (monotonic)
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.local_hits = 0
+
+    def revoke(self, jti, exp):
+        """Revoke `jti` until `exp` (the token's expiry, epoch seconds)"""
+        self.backend.add(jti, exp)
+        now = time.time()
+        with self._lock:
+            self._not_revoked.pop(jti, None)
+            self._revoked[jti] = exp
+            if len(self._revoked) > self.max_cached:
+                for key in [k for k, v in self._revoked.items() if v <= now]:
+                    del self._revoked[key]
+
+    def is_revoked(self, jti):
+        now = time.monotonic()
+        with self._lock:
+            if jti in self._revoked:
+                self.local_hits += 1
+                return True
+            valid_until = self._not_revoked.get(jti)
+            if valid_until is not None and valid_until > now:
+                self.local_hits += 1
+                return False
+
+        revoked = self.backend.contains(jti)
+        with self._lock:
+            self.lookups += 1
+            if revoked:
+                self._not_revoked.pop(jti, None)
+            elif self.negative_ttl > 0:
+                self._not_revoked[jti] = now + self.negative_ttl
+                self._not_revoked.move_to_end(jti)
+                while len(self._not_revoked) > self.max_cached:
+                    self._not_revoked.popitem(last=False)
+        return revoked
+
+    def stats(self):
+        checks = self.lookups + self.local_hits
+        return {
+            'backend': type(self.backend).__name__,
+            'backend_lookups': self.lookups,
+            'local_hits': self.local_hits,
+            'local_hit_rate': self.local_hits / checks if checks else 0.0,
+            'negative_cache_entries': len(self._not_revoked),
+        }
+
+
+def create_revocation_store(kind='sql', redis_url=None, negative_ttl=30, max_cached=100000):
+    """Build the revocation store selected in Config"""
+    kind = (kind or 'sql').lower()
+    if kind == 'sql':
+        backend = SQLRevocationBackend()
+    elif kind == 'redis':
+        backend = RedisRevocationBackend(redis_url)
+    elif kind == 'memory':
+        backend = MemoryRevocationBackend()
+    else:
+        raise ValueError(f"Unknown revocation backend: {kind}")
+    return RevocationStore(backend, negative_ttl=negative_ttl, max_cached=max_cached)
@@ -0,0 +1,88 @@
+"""
+Text normalisation shared by training (train_model.py, the lexicon build)
+and serving (the detector).
+
+Output is identical to the original four-pass cleaner:
+
+    t = str(t).lower()
+    t = re.sub(r'http\\S+', ' ', t)
+    t = re.sub(r'@\\w+', ' @user ', t)
+    t = re.sub(r'[^a-z0-9@#\\s\\!\\?\\.\\,\\'\\u2600-\\u27BF]+', ' ', t)
+    t = re.sub(r'\\s+', ' ', t).strip()
+
+but runs two precompiled passes:
+  1. URLs and mentions in one scan. A mention stops where a URL starts,
+     because the original removed URLs first and never saw that part.
+  2. Disallowed characters and whitespace in one scan. Whitespace was
+     allowed by pass 3 and then collapsed by pass 4, so treating it as
+     "disallowed" gives the same single spaces.
+"""
+import re
+from functools import lru_cache
+
+_URL_OR_MENTION_RE = re.compile(r'http\S+|@(?:(?!http\S)\w)+')
+_DISALLOWED_RE = re.compile(r"[^a-z0-9@#\!\?\.\,\'\u2600-\u27BF]+")
+
+# Batch mode joins texts with a separator that both passes treat as a
+# boundary (it is whitespace), and keeps it out of the pass 2 replacement.
+_BATCH_SEP = '\x1e'
+_DISALLOWED_KEEP_SEP_RE = re.compile(r"[^a-z0-9@#\!\?\.\,\'\u2600-\u27BF\x1e]+")
+
+CACHE_SIZE = 8192
+CACHE_MAX_LEN = 128
+
+
+def _replace_url_or_mention(m):
+    return ' ' if m.group().startswith('http') else ' @user '
+
+
+def clean_text(t):
+    t = str(t).lower()
+    t = _URL_OR_MENTION_RE.sub(_replace_url_or_mention, t)
+    return _DISALLOWED_RE.sub(' ', t).strip()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _clean_text_memo(t):
+    return clean_text(t)
+
+
+def clean_text_cached(t):
+    """clean_text with an LRU memo for short strings (repeated chat messages)"""
+    if isinstance(t, str) and len(t) <= CACHE_MAX_LEN:
+        return _clean_text_memo(t)
+    return clean_text(t)
+
+
+def _clean_joined(texts):
+    lowered = [str(t).lower() for t in texts]
+    joined = _BATCH_SEP.join(lowered)
+    if joined.count(_BATCH_SEP) != len(lowered) - 1:
+        # A text contains the separator itself: clean one by one
+        return [clean_text(t) for t in lowered]
+    joined = _URL_OR_MENTION_RE.sub(_replace_url_or_mention, joined)
+    joined = _DISALLOWED_KEEP_SEP_RE.sub(' ', joined)
+    return [part.strip() for part in joined.split(_BATCH_SEP)]
+
+
+def clean_texts(texts):
+    """
+    Clean many texts at once.
+
+    Accepts a pandas Series (returns a Series with the same index), a NumPy
+    array (returns an object array of the same shape) or any iterable
+    (returns a list).
+    """
+    if hasattr(texts, 'index') and hasattr(texts, 'to_numpy'):
+        import pandas as pd
+        return pd.Series(_clean_joined(texts.tolist()) if len(texts) else [],
+                         index=texts.index, name=texts.name, dtype=object)
+    if hasattr(texts, 'shape') and hasattr(texts, 'ravel'):
+        import numpy as np
+        flat = texts.ravel().tolist()
+        out = np.empty(len(flat), dtype=object)
+        if flat:
+            out[:] = _clean_joined(flat)
+        return out.reshape(texts.shape)
+    texts = list(texts)
+    return _clean_joined(texts) if texts else []
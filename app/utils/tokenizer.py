@@ -0,0 +1,78 @@
+"""
+Pure-Python reader for the Keras tokenizer saved in models/tokenizer.json.
+
+Produces exactly the same sequences as
+`tensorflow.keras.preprocessing.text.tokenizer_from_json(...).texts_to_sequences`
+and `pad_sequences(..., padding='post', truncating='post')`, without
+importing TensorFlow.
+"""
+import json
+
+import numpy as np
+
+
+class KerasTokenizer:
+    def __init__(self, word_index, num_words=None, filters='', lower=True, split=' ', oov_token=None):
+        self.word_index = word_index
+        self.num_words = num_words
+        self.lower = lower
+        self.split = split
+        self.oov_token = oov_token
+        self.oov_index = word_index.get(oov_token) if oov_token is not None else None
+        self._filter_map = str.maketrans({c: split for c in filters})
+
+    @classmethod
+    def from_json(cls, json_string):
+        config = json.loads(json_string)['config']
+        if config.get('char_level'):
+            raise ValueError("Character-level tokenizers are not supported")
+        word_index = config['word_index']
+        if isinstance(word_index, str):
+            word_index = json.loads(word_index)
+        return cls(
+            word_index,
+            num_words=config.get('num_words'),
+            filters=config.get('filters', ''),
+            lower=config.get('lower', True),
+            split=config.get('split', ' '),
+            oov_token=config.get('oov_token'),
+        )
+
+    def text_to_word_sequence(self, text):
+        if self.lower:
+            text = text.lower()
+        return [w for w in text.translate(self._filter_map).split(self.split) if w]
+
+    def texts_to_sequences(self, texts):
+        word_index = self.word_index
+        num_words = self.num_words
+        oov_index = self.oov_index
+        sequences = []
+        for text in texts:
+            vect = []
+            for w in self.text_to_word_sequence(text):
+                i = word_index.get(w)
+                if i is not None:
+                    if num_words and i >= num_words:
+                        if oov_index is not None:
+                            vect.append(oov_index)
+                    else:
+                        vect.append(i)
+                elif self.oov_token is not None:
+                    vect.append(oov_index)
+            sequences.append(vect)
+        return sequences
+
+
+def load_tokenizer(path):
+    with open(path, "r") as f:
+        return KerasTokenizer.from_json(f.read())
+
+
+def pad_sequences(sequences, maxlen):
+    """Post-pad and post-truncate to `maxlen` (int32, zero padding)"""
+    out = np.zeros((len(sequences), maxlen), dtype='int32')
+    for row, seq in enumerate(sequences):
+        seq = seq[:maxlen]
+        out[row, :len(seq)] = seq
+    return out
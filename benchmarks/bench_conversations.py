@@ -0,0 +1,147 @@
+"""
+Benchmark: GET /api/chat/conversations, single aggregated query vs. the
+original per-partner COUNT + last-message queries.
+
+    python benchmarks/bench_conversations.py [--contacts 300] [--messages-per-contact 20]
+
+Seeds a throwaway SQLite database (or --database-uri), checks both versions
+return the same conversations, and prints SQL statement counts and latency.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def legacy_conversations(db, Message, current_username):
+    """The original endpoint body: 2 DISTINCT queries + 2 queries per partner"""
+    from sqlalchemy import or_, and_
+    sent_to = db.session.query(Message.receiver).filter(Message.sender == current_username).distinct().all()
+    received_from = db.session.query(Message.sender).filter(Message.receiver == current_username).distinct().all()
+    conversations = []
+    for username in set([u[0] for u in sent_to] + [u[0] for u in received_from]):
+        unread_count = Message.query.filter(
+            Message.sender == username, Message.receiver == current_username, Message.is_read == False
+        ).count()
+        last_message = Message.query.filter(
+            or_(
+                and_(Message.sender == current_username, Message.receiver == username),
+                and_(Message.sender == username, Message.receiver == current_username)
+            )
+        ).order_by(Message.timestamp.desc()).first()
+        conversations.append({'username': username, 'unread_count': unread_count,
+                              'last_message': last_message.to_dict() if last_message else None})
+    conversations.sort(key=lambda x: x['last_message']['timestamp'] if x['last_message'] else '', reverse=True)
+    return conversations
+
+
+def seed(db, User, Message, contacts, per_contact):
+    rng = random.Random(0)
+    users = [User(username='me', password='x', email='me@example.com')]
+    users += [User(username=f'user{i}', password='x', email=f'user{i}@example.com') for i in range(contacts)]
+    db.session.add_all(users)
+    start = datetime(2026, 1, 1)
+    rows = []
+    for i in range(contacts):
+        for j in range(per_contact):
+            outgoing = rng.random() < 0.5
+            rows.append({
+                'id': f'{i:06d}-{j:06d}',
+                'sender': 'me' if outgoing else f'user{i}',
+                'receiver': f'user{i}' if outgoing else 'me',
+                'content': 'hello there',
+                'timestamp': start + timedelta(seconds=rng.randrange(10_000_000)),
+                'is_bullying': False,
+                'bullying_probability': 0.0,
+                'is_read': outgoing or rng.random() < 0.7,
+            })
+    db.session.commit()
+    db.session.execute(Message.__table__.insert(), rows)
+    db.session.commit()
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--contacts', type=int, default=300)
+    parser.add_argument('--messages-per-contact', type=int, default=20)
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--database-uri', default=None, help='Defaults to a temporary SQLite file')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench_conversations.db')
+    os.environ['DATABASE_URI'] = args.database_uri or f'sqlite:///{db_path}'
+    os.environ.setdefault('MAX_BULLYING_COUNT', '5')
+    os.environ.setdefault('JWT_SECRET_KEY', 'bench-secret-key-bench-secret-key')
+    os.environ.setdefault('REVOCATION_BACKEND', 'memory')
+
+    from sqlalchemy import event
+    from flask_jwt_extended import create_access_token
+    from app import create_app
+    from app.models import db, User, Message
+    from app.routes.chat import conversation_summaries
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        seed(db, User, Message, args.contacts, args.messages_per_contact)
+        me = User.query.filter_by(username='me').first()
+        token = create_access_token(identity=me.id)
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *a, **k: statements.append(1))
+
+        legacy_time, legacy = timed(lambda: legacy_conversations(db, Message, 'me'), args.repeat)
+        statements.clear()
+        legacy_conversations(db, Message, 'me')
+        legacy_queries = len(statements)
+
+        new_time, rows = timed(lambda: conversation_summaries('me'), args.repeat)
+        statements.clear()
+        conversation_summaries('me')
+        new_queries = len(statements)
+
+        got = {p: (int(u), m.id) for m, p, u in rows}
+        want = {c['username']: (c['unread_count'], c['last_message']['id']) for c in legacy}
+        assert got == want, "aggregated query disagrees with the legacy endpoint"
+
+    # Full endpoint, paging through every conversation
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    statements.clear()
+    start = time.perf_counter()
+    seen, cursor, pages = [], None, 0
+    while True:
+        query = f'/api/chat/conversations?limit={args.page_size}' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(query, headers=headers).get_json()
+        seen += [c['username'] for c in body['conversations']]
+        pages += 1
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+    paged_time = time.perf_counter() - start
+    assert sorted(seen) == sorted(want) and len(seen) == len(set(seen)), "pagination lost or repeated rows"
+
+    print(f"contacts: {args.contacts}, messages: {args.contacts * args.messages_per_contact}")
+    print(f"legacy        : {legacy_queries:5d} queries  {legacy_time * 1000:8.2f} ms")
+    print(f"single query  : {new_queries:5d} queries  {new_time * 1000:8.2f} ms  ({legacy_time / new_time:.1f}x)")
+    print(f"endpoint, {pages} pages of {args.page_size}: {len(statements) / pages:.1f} queries/page  "
+          f"{paged_time / pages * 1000:.2f} ms/page")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Query plans and latency of the chat/comment hot queries, with and without
+the composite indexes on `messages` and `comment`.
+
+    python benchmarks/bench_indexes.py [--messages 1000000] [--database-uri mysql+mysqlconnector://...]
+
+Seeds a throwaway SQLite database by default (or the given empty database),
+then for each query prints the plan and best-of-N time with the indexes
+dropped and again after creating them.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+HOT_USER = 'user0'
+HOT_PARTNER = 'user1'
+
+
+def seed(db, User, Post, Comment, Message, users, messages, comments, posts, chunk=50000):
+    rng = random.Random(0)
+    start = datetime(2025, 1, 1)
+    names = [f'user{i}' for i in range(users)]
+    db.session.execute(User.__table__.insert(), [
+        {'id': f'u{i}', 'username': name, 'password': 'x', 'email': f'{name}@example.com'}
+        for i, name in enumerate(names)
+    ])
+    db.session.execute(Post.__table__.insert(), [
+        {'id': f'p{i}', 'content': 'post', 'user_id': f'u{i % users}'} for i in range(posts)
+    ])
+    db.session.commit()
+
+    def message_rows(lo, hi):
+        for n in range(lo, hi):
+            # A tenth of the traffic involves the hot user, mostly with one partner
+            if n % 10 == 0:
+                a, b = HOT_USER, HOT_PARTNER if rng.random() < 0.5 else rng.choice(names)
+            else:
+                a, b = rng.choice(names), rng.choice(names)
+            if rng.random() < 0.5:
+                a, b = b, a
+            yield {
+                'id': f'm{n:09d}', 'sender': a, 'receiver': b, 'content': 'hello there',
+                'timestamp': start + timedelta(seconds=n * 5 + rng.randrange(5)),
+                'is_bullying': rng.random() < 0.03, 'bullying_probability': 0.0,
+                'is_read': rng.random() < 0.8,
+            }
+
+    for lo in range(0, messages, chunk):
+        db.session.execute(Message.__table__.insert(), list(message_rows(lo, min(lo + chunk, messages))))
+        db.session.commit()
+
+    for lo in range(0, comments, chunk):
+        db.session.execute(Comment.__table__.insert(), [
+            {'id': f'c{n:09d}', 'content': 'nice', 'is_bullying': rng.random() < 0.03,
+             'user_id': f'u{rng.randrange(users)}', 'post_id': f'p{rng.randrange(posts)}',
+             'created_at': start + timedelta(seconds=n * 7)}
+            for n in range(lo, min(lo + chunk, comments))
+        ])
+        db.session.commit()
+
+
+def hot_queries(db, Comment, Message):
+    """The statements behind each endpoint, as SQLAlchemy Query objects"""
+    from sqlalchemy import or_, and_, func
+    from app.routes.chat import conversation_summaries
+
+    pair = or_(
+        and_(Message.sender == HOT_USER, Message.receiver == HOT_PARTNER),
+        and_(Message.sender == HOT_PARTNER, Message.receiver == HOT_USER),
+    )
+    return {
+        'get_messages (history page)': Message.query.filter(pair).order_by(Message.timestamp.desc()).limit(50),
+        'get_conversations': None,  # run through conversation_summaries
+        'can_chat: bullying messages': db.session.query(func.count(Message.id)).filter(
+            Message.sender == HOT_USER, Message.is_bullying == True),
+        'bullying_report: received': db.session.query(func.count(Message.id)).filter(
+            Message.receiver == HOT_USER, Message.is_bullying == True),
+        'unread count from partner': db.session.query(func.count(Message.id)).filter(
+            Message.receiver == HOT_USER, Message.is_read == False, Message.sender == HOT_PARTNER),
+        'comment gating / can_chat: bullying comments': db.session.query(func.count(Comment.id)).filter(
+            Comment.user_id == 'u0', Comment.is_bullying == True),
+        'get_comments (post page)': Comment.query.filter(Comment.post_id == 'p0').order_by(Comment.created_at.desc()),
+    }, conversation_summaries
+
+
+def explain(db, query):
+    engine = db.engine
+    sql = str(query.statement.compile(dialect=engine.dialect, compile_kwargs={'literal_binds': True}))
+    prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    rows = db.session.execute(db.text(prefix + sql)).fetchall()
+    if engine.dialect.name == 'sqlite':
+        return [row[-1] for row in rows]
+    return [' | '.join(str(v) for v in row) for row in rows]
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure(db, queries, summaries, repeat, show_plans):
+    results = {}
+    for name, query in queries.items():
+        if query is None:
+            results[name] = timed(lambda: summaries(HOT_USER), repeat)
+            continue
+        if show_plans:
+            for line in explain(db, query):
+                print(f"    {name}: {line}")
+        results[name] = timed(query.all, repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=1_000_000)
+    parser.add_argument('--comments', type=int, default=200_000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--posts', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--database-uri', default=None, help='An empty database; defaults to a temporary SQLite file')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench_indexes.db')
+    os.environ['DATABASE_URI'] = args.database_uri or f'sqlite:///{db_path}'
+    os.environ.setdefault('MAX_BULLYING_COUNT', '5')
+    os.environ.setdefault('REVOCATION_BACKEND', 'memory')
+
+    from app import create_app
+    from app.models import db, User, Post, Comment, Message
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        new_indexes = [ix for table in (Message.__table__, Comment.__table__)
+                       for ix in table.indexes if ix.name.startswith(('ix_messages_', 'ix_comment_'))]
+        for ix in new_indexes:
+            ix.drop(db.engine)
+
+        start = time.perf_counter()
+        seed(db, User, Post, Comment, Message, args.users, args.messages, args.comments, args.posts)
+        print(f"seeded {args.messages} messages, {args.comments} comments in {time.perf_counter() - start:.1f}s "
+              f"({db.engine.dialect.name})")
+
+        queries, summaries = hot_queries(db, Comment, Message)
+        print("\nwithout composite indexes:")
+        before = measure(db, queries, summaries, args.repeat, show_plans=True)
+
+        start = time.perf_counter()
+        for ix in new_indexes:
+            ix.create(db.engine)
+        if db.engine.dialect.name == 'sqlite':
+            db.session.execute(db.text('ANALYZE'))
+        print(f"\ncreated {len(new_indexes)} indexes in {time.perf_counter() - start:.1f}s")
+        print("\nwith composite indexes:")
+        after = measure(db, queries, summaries, args.repeat, show_plans=True)
+
+    print(f"\n{'query':48s} {'before ms':>10s} {'after ms':>10s} {'speedup':>8s}")
+    for name in queries:
+        b, a = before[name] * 1000, after[name] * 1000
+        print(f"{name:48s} {b:10.2f} {a:10.2f} {b / a:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Latency by message length: full padded forward pass vs. length buckets
+in the NumPy backend.
+
+    python benchmarks/bench_length_buckets.py [--batch-size 1] [--model models/bully_model.npz]
+
+Uses the exported model when present, otherwise random weights with the
+production architecture (timings do not depend on the weight values).
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.utils.artifacts import MODEL_DIR, NUMPY_MODEL_FILE
+from app.utils.numpy_backend import FORMAT_VERSION, NumpyBullyModel
+
+BUCKETS = [16, 32, 64, 100]
+
+
+def random_arrays(vocab=30000, dim=100, filters=128, units=128, max_len=100, seed=0):
+    rng = np.random.RandomState(seed)
+    w = lambda *shape: (rng.randn(*shape) * 0.1).astype(np.float32)
+    arrays = {'format': np.array(FORMAT_VERSION), 'max_len': np.array(max_len),
+              'embedding': w(vocab, dim), 'attention': w(2 * units),
+              'n_convs': np.array(3), 'n_dense': np.array(2)}
+    for i, k in enumerate((2, 3, 4)):
+        arrays[f'conv{i}_kernel'], arrays[f'conv{i}_bias'] = w(k, dim, filters), w(filters)
+    for prefix in ('lstm_fw', 'lstm_bw'):
+        arrays[f'{prefix}_kernel'] = w(dim, 4 * units)
+        arrays[f'{prefix}_recurrent'] = w(units, 4 * units)
+        arrays[f'{prefix}_bias'] = w(4 * units)
+    arrays['dense0_kernel'], arrays['dense0_bias'] = w(3 * filters + 2 * units, 128), w(128)
+    arrays['dense1_kernel'], arrays['dense1_bias'] = w(128, 1), w(1)
+    return arrays
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default=os.path.join(MODEL_DIR, NUMPY_MODEL_FILE))
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if os.path.exists(args.model):
+        with np.load(args.model) as f:
+            arrays = {name: f[name] for name in f.files}
+    else:
+        print(f"{args.model} not found - using random weights")
+        arrays = random_arrays()
+    padded = NumpyBullyModel(arrays)
+    bucketed = NumpyBullyModel(arrays, buckets=BUCKETS)
+    vocab, max_len = padded.embedding.shape[0], padded.max_len
+
+    rng = np.random.RandomState(1)
+    print(f"batch size {args.batch_size}")
+    print(f"{'tokens':>6} {'padded ms':>10} {'bucketed ms':>12} {'speedup':>8} {'max diff':>9}")
+    for length in (4, 8, 15, 30, 60, 100):
+        x = np.zeros((args.batch_size, max_len), dtype=np.int32)
+        x[:, :length] = rng.randint(1, vocab, size=(args.batch_size, length))
+        diff = np.abs(padded.predict(x) - bucketed.predict(x)).max()
+        full = timed(lambda: padded.predict(x), args.repeat)
+        trimmed = timed(lambda: bucketed.predict(x), args.repeat)
+        print(f"{length:>6} {full * 1000:>10.2f} {trimmed * 1000:>12.2f} {full / trimmed:>7.1f}x {diff:>9.1e}")
+
+
+if __name__ == '__main__':
+    main()
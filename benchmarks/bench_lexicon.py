@@ -0,0 +1,80 @@
+"""
+Micro-benchmark: LexiconMatcher vs. the original per-term scan in lexical_flag.
+
+    python benchmarks/bench_lexicon.py [--lexicon-size 5000] [--texts 5000]
+
+The lexicon is read from models/lexicon.bin (or rebuilt from the CSV) and can
+be padded with extra synthetic terms to show how each approach scales.
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.utils.artifacts import MODEL_DIR, TRAIN_CSV, LEXICON_FILE
+from app.utils.lexicon import LexiconError, LexiconMatcher, generate_bad_words, load_lexicon
+from app.utils.text import clean_text
+
+
+def legacy_lexical_flag(bad_words, cleaned):
+    s_words = cleaned.split()
+    return [w for w in bad_words if w in s_words]
+
+
+def load_terms():
+    try:
+        words, _ = load_lexicon(os.path.join(MODEL_DIR, LEXICON_FILE))
+        return set(words)
+    except LexiconError:
+        return generate_bad_words(TRAIN_CSV)
+
+
+def timed(fn, texts, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for t in texts:
+            fn(t)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lexicon-size', type=int, default=0, help='Pad the lexicon with synthetic terms up to this size')
+    parser.add_argument('--texts', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with open(TRAIN_CSV, newline='', encoding='utf-8') as f:
+        texts = [clean_text(row['text']) for _, row in zip(range(args.texts), csv.DictReader(f))]
+
+    terms = load_terms()
+    i = 0
+    while len(terms) < args.lexicon_size:
+        terms.add(f"zzterm{i}")
+        i += 1
+
+    matcher = LexiconMatcher(terms)
+
+    # Same matches (modulo ordering) on every text
+    for t in texts:
+        assert set(legacy_lexical_flag(terms, t)) == set(matcher.match(t)), t
+
+    legacy = timed(lambda t: legacy_lexical_flag(terms, t), texts, args.repeat)
+    single = timed(matcher.match, texts, args.repeat)
+    start = time.perf_counter()
+    matcher.match_many(texts)
+    batch = time.perf_counter() - start
+
+    n = len(texts)
+    print(f"lexicon terms: {len(terms)}, texts: {n}")
+    print(f"legacy scan     : {legacy / n * 1e6:8.2f} us/text")
+    print(f"matcher.match   : {single / n * 1e6:8.2f} us/text  ({legacy / single:.1f}x)")
+    print(f"matcher.batch   : {batch / n * 1e6:8.2f} us/text")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Query count and latency of the comment and random-post listings.
+
+    python benchmarks/bench_listings.py [--sizes 10,100,500]
+
+Seeds a throwaway SQLite database with, for each size, a post carrying that
+many comments (each by a different user), then requests one page of each
+listing at that size and asserts the number of SQL statements stays within
+a fixed bound whatever the page size. The original per-row User lookup is
+timed alongside.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+# Statements per page: the comments page is one joined query; the random feed
+# needs a second range seek when a page wraps around its seed (its post
+# count is cached)
+MAX_QUERIES = {'comments': 1, 'random posts': 2}
+
+
+def legacy_comments(Comment, User, post_id):
+    """The original get_comments body: one User query per comment"""
+    rows = []
+    for comment in Comment.query.filter_by(post_id=post_id).order_by(Comment.created_at.desc()).all():
+        user = User.query.filter_by(id=comment.user_id).first()
+        rows.append((comment.id, user.username if user else None))
+    return rows
+
+
+def seed(db, User, Post, Comment, sizes):
+    users = max(sizes)
+    db.session.execute(User.__table__.insert(), [
+        {'id': f'u{i}', 'username': f'user{i}', 'password': 'x', 'email': f'user{i}@example.com'}
+        for i in range(users)
+    ])
+    db.session.execute(Post.__table__.insert(), [
+        {'id': f'p{i}', 'content': 'post', 'user_id': f'u{i}'} for i in range(users)
+    ])
+    # Post p<size> carries <size> comments
+    db.session.execute(Comment.__table__.insert(), [
+        {'id': f'c{size}-{i:06d}', 'content': 'nice', 'is_bullying': False, 'user_id': f'u{i}', 'post_id': f'p{size}'}
+        for size in sizes for i in range(size)
+    ])
+    db.session.commit()
+
+
+def measure(client, headers, url, statements, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        statements.clear()
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        best = min(best, time.perf_counter() - start)
+        assert response.status_code == 200, response.get_json()
+    body = response.get_json()
+    rows = body if isinstance(body, list) else body['posts']
+    assert all(row['username'] for row in rows)
+    return len(statements), best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='10,100,500')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.setdefault('MAX_BULLYING_COUNT', '5')
+    os.environ.setdefault('JWT_SECRET_KEY', 'bench-secret-key-bench-secret-key')
+    os.environ.setdefault('REVOCATION_BACKEND', 'memory')
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench_listings.db')
+    os.environ['DATABASE_URI'] = f'sqlite:///{db_path}'
+
+    from sqlalchemy import event
+    from flask_jwt_extended import create_access_token
+    from app import create_app
+    from app.models import db, User, Post, Comment
+
+    app = create_app()
+    statements = []
+    with app.app_context():
+        db.create_all()
+        seed(db, User, Post, Comment, sizes)
+        token = create_access_token(identity='u0')
+        event.listen(db.engine, 'before_cursor_execute', lambda *a, **k: statements.append(1))
+
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    counts = {}
+    print(f"{'rows':>6s} {'legacy comments':>22s} {'comments page':>22s} {'random posts page':>22s}")
+    for size in sizes:
+        with app.app_context():
+            statements.clear()
+            start = time.perf_counter()
+            legacy_comments(Comment, User, f'p{size}')
+            cells = [f"{len(statements):4d} q {(time.perf_counter() - start) * 1000:9.2f} ms"]
+        for name, url in (('comments', f'/api/comments/p{size}?per_page={size}'),
+                          ('random posts', f'/api/posts/random?per_page={min(size, 100)}')):
+            queries, seconds = measure(client, headers, url, statements, args.repeat)
+            counts.setdefault(name, set()).add(queries)
+            cells.append(f"{queries:4d} q {seconds * 1000:9.2f} ms")
+        print(f"{size:6d} " + " ".join(f"{c:>22s}" for c in cells))
+
+    for name, seen in counts.items():
+        assert max(seen) <= MAX_QUERIES[name], f"{name}: query count depends on page size {sorted(seen)}"
+    print("✅ query count per page is bounded independently of page size")
+
+
+if __name__ == '__main__':
+    main()
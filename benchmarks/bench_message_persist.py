@@ -0,0 +1,236 @@
+"""
+Benchmark: chat message persistence, one commit per message (CHAT_PERSIST_MODE=sync)
+vs. write-behind group commits (CHAT_PERSIST_MODE=write_behind).
+
+    python benchmarks/bench_message_persist.py [--messages 20000] [--threads 16] [--database-uri URI]
+
+--threads senders store --messages messages in total, the way concurrent
+send_message handlers do. The benchmark prints messages/s and the ack latency
+of each mode (for write-behind, also the time until everything is committed)
+and checks that every message is stored exactly once. A flagged message is
+added every --flag-every messages, and the bullying counters are compared
+with a full recount.
+
+It then checks crash recovery: a child process journals --crash-messages
+messages and a verdict update and exits before any group commit; a new
+writer must replay all of them (the damaged last line of a torn write is
+skipped), count the flagged ones once, and delete the old journal segments.
+A writer with --segment-kb segments must keep the journal to about one
+segment while it runs.
+
+Finally a batch with one bad row (a duplicate id) must still commit the
+good rows, with the bad one dead-lettered and counted in stats()['failures'].
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+SENDERS = 50
+
+
+def make_row(n, flag_every):
+    from app.utils.message_writer import next_seq
+    flagged = flag_every > 0 and n % flag_every == 0
+    return {
+        'id': str(uuid.uuid4()),
+        'seq': next_seq(),
+        'sender': f'user{n % SENDERS}',
+        'receiver': f'user{(n + 1) % SENDERS}',
+        'content': f'hello #{n}',
+        'timestamp': datetime.utcnow(),
+        'is_bullying': flagged,
+        'bullying_probability': 0.9 if flagged else 0.1,
+        'model_version': None,
+        'is_read': False,
+    }
+
+
+def run_senders(threads, count, send):
+    """Call send(n) for n in range(count) on `threads` threads; returns (seconds, ack latencies)"""
+    latencies = [[] for _ in range(threads)]
+
+    def worker(t):
+        for n in range(t, count, threads):
+            start = time.perf_counter()
+            send(n)
+            latencies[t].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return time.perf_counter() - start, sorted(lat for part in latencies for lat in part)
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000.0
+
+
+def setup_env(database_uri):
+    os.environ['DATABASE_URI'] = database_uri
+    os.environ.setdefault('MAX_BULLYING_COUNT', '5')
+    os.environ.setdefault('JWT_SECRET_KEY', 'bench-secret-key-bench-secret-key')
+    os.environ.setdefault('REVOCATION_BACKEND', 'memory')
+
+
+def check_counters(db):
+    from app.models import UserModerationStats
+    from app.utils.moderation import recount
+    stored = {s.user_id: (s.bullying_comment_count, s.bullying_message_count)
+              for s in UserModerationStats.query.all() if s.total}
+    assert stored == recount(), "bullying counters disagree with a recount"
+
+
+def crash_child(journal, count):
+    """Journal `count` messages and one verdict, then die before the flusher commits"""
+    from app import create_app
+    from app.utils.message_writer import MessageWriter
+    app = create_app()
+    writer = MessageWriter(journal, max_rows=count + 10, max_delay_ms=600000)
+    writer.start(app)
+    rows = [make_row(n, 0) for n in range(count)]
+    for row in rows:
+        writer.add(row)
+    writer.update(rows[0]['id'], rows[0]['sender'], {'is_bullying': True, 'bullying_probability': 0.95})
+    with open(writer._journal.segment_path(writer._journal.current), 'a') as f:
+        f.write('{"op":"insert","row":{"id":"torn')  # a write cut short by the crash
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--max-rows', type=int, default=500, help='CHAT_WRITE_BEHIND_MAX_ROWS')
+    parser.add_argument('--max-ms', type=float, default=20, help='CHAT_WRITE_BEHIND_MAX_MS')
+    parser.add_argument('--flag-every', type=int, default=50)
+    parser.add_argument('--crash-messages', type=int, default=1000)
+    parser.add_argument('--segment-kb', type=int, default=64, help='Journal segment size of the rotation check')
+    parser.add_argument('--database-uri', default=None, help='Defaults to a temporary SQLite file (WAL mode)')
+    parser.add_argument('--crash-child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.crash_child:
+        setup_env(args.database_uri)
+        return crash_child(args.crash_child[0], int(args.crash_child[1]))
+
+    workdir = tempfile.mkdtemp()
+    database_uri = args.database_uri or f"sqlite:///{os.path.join(workdir, 'bench_persist.db')}"
+    setup_env(database_uri)
+
+    from app import create_app
+    from app.models import db, User, Message
+    from app.utils.message_writer import MessageWriter
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        if db.engine.dialect.name == 'sqlite':
+            db.session.execute(db.text('PRAGMA journal_mode=WAL'))
+        db.session.add_all([User(username=f'user{i}', password='x', email=f'user{i}@example.com')
+                            for i in range(SENDERS)])
+        db.session.commit()
+
+    from app.utils.moderation import record_bullying
+
+    # One transaction per message, as handle_send_message does in 'sync' mode
+    def send_sync(n):
+        row = make_row(n, args.flag_every)
+        with app.app_context():
+            try:
+                db.session.add(Message(**row))
+                if row['is_bullying']:
+                    record_bullying(username=row['sender'], messages=1)
+                db.session.commit()
+            finally:
+                db.session.remove()
+
+    sync_s, sync_lat = run_senders(args.threads, args.messages, send_sync)
+
+    # Journal + queue; the writer commits in groups
+    writer = MessageWriter(os.path.join(workdir, 'journal.log'), max_rows=args.max_rows, max_delay_ms=args.max_ms)
+    writer.start(app)
+    start = time.perf_counter()
+    ack_s, wb_lat = run_senders(args.threads, args.messages, lambda n: writer.add(make_row(n, args.flag_every)))
+    assert writer.sync(timeout=300), "write-behind queue did not drain"
+    durable_s = time.perf_counter() - start  # until the last group commit
+    stats = writer.stats()
+
+    with app.app_context():
+        stored = db.session.query(Message.id).count()
+        distinct = db.session.query(db.func.count(db.distinct(Message.seq))).scalar()
+        assert stored == 2 * args.messages, f"{stored} rows stored, expected {2 * args.messages}"
+        assert distinct == 2 * args.messages, "sequence numbers are not unique"
+        check_counters(db)
+
+    n = args.messages
+    print(f"💾 {n} messages per mode, {args.threads} senders, {database_uri.split(':', 1)[0]}")
+    print(f"   per-message commit: {sync_s:6.2f}s {n / sync_s:9,.0f} msg/s  "
+          f"ack p50 {percentile(sync_lat, 0.5):6.2f} ms  p99 {percentile(sync_lat, 0.99):7.2f} ms")
+    print(f"   write-behind:       {durable_s:6.2f}s {n / durable_s:9,.0f} msg/s  "
+          f"ack p50 {percentile(wb_lat, 0.5):6.2f} ms  p99 {percentile(wb_lat, 0.99):7.2f} ms  "
+          f"({sync_s / durable_s:.1f}x; all acked after {ack_s:.2f}s)")
+    print(f"   {stats['batches']} group commits, {stats['avg_batch_size']:.0f} rows each on average "
+          f"(max {stats['max_batch_size']}), {stats['avg_commit_ms']:.1f} ms per commit")
+
+    # Crash recovery
+    journal = os.path.join(workdir, 'crash_journal.log')
+    count = args.crash_messages
+    subprocess.run([sys.executable, __file__, '--database-uri', database_uri, '--crash-child', journal, str(count)],
+                   check=True)
+    with app.app_context():
+        before = db.session.query(Message.id).count()
+    assert before == 2 * n, "the crashed writer committed before exiting"
+    recovered = MessageWriter(journal)
+    recovered.start(app)
+    with app.app_context():
+        after = db.session.query(Message.id).count()
+        assert after - before == count, f"replayed {after - before} of {count} journaled messages"
+        check_counters(db)
+    assert recovered.stats()['journal_segments'] == 1 and recovered.stats()['journal_bytes'] == 0, \
+        "old journal segments left after replay"
+    print(f"✅ Crash recovery: {count} journaled messages and a verdict replayed, torn line skipped, "
+          f"counters match a recount")
+
+    # Segment rotation: committed segments are deleted while the writer runs
+    rotating = MessageWriter(os.path.join(workdir, 'rotate_journal.log'), segment_mb=args.segment_kb / 1024.0)
+    rotating.start(app)
+    for n in range(count * 5):
+        rotating.add(make_row(n, 0))
+    assert rotating.sync(timeout=60), "write-behind queue did not drain"
+    rotated = rotating.stats()
+    assert rotated['journal_segments'] <= 2, f"{rotated['journal_segments']} journal segments kept"
+    assert rotated['journal_bytes'] <= 2 * args.segment_kb * 1024, f"journal is {rotated['journal_bytes']} bytes"
+    with app.app_context():
+        after = db.session.query(Message.id).count()
+    print(f"✅ Journal rotation: {count * 5} messages through {args.segment_kb} KB segments, "
+          f"{rotated['journal_segments']} segment(s) and {rotated['journal_bytes']} bytes left")
+
+    # A bad row in a group commit
+    poisoned = MessageWriter(os.path.join(workdir, 'poison_journal.log'), max_rows=100, max_delay_ms=200)
+    poisoned.start(app)
+    rows = [make_row(n, 0) for n in range(20)]
+    rows[10]['id'] = rows[3]['id']
+    for row in rows:
+        poisoned.add(row)
+    assert poisoned.sync(timeout=60), "a bad row stalled the write-behind queue"
+    with app.app_context():
+        stored = db.session.query(Message.id).count()
+    assert stored - after == len(rows) - 1, f"{stored - after} of {len(rows) - 1} good rows stored"
+    assert poisoned.stats()['failures'] == 1, poisoned.stats()
+    assert os.path.getsize(poisoned.journal_path + '.dead') > 0, "bad row not dead-lettered"
+    print(f"✅ Bad row: {len(rows) - 1} good rows committed, 1 dead-lettered")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Connect/disconnect stress test of the presence registry.
+
+    python benchmarks/bench_presence_churn.py [--sockets 50000] [--users 20000] [--threads 8]
+
+Drives a PresenceRegistry (memory backend) from several threads, the way
+concurrent Socket.IO handlers do:
+
+  1. connect --sockets sockets spread over --users users (most users
+     end up with several sockets)
+  2. a reconnect storm: every socket disconnects and reconnects with a new sid
+  3. disconnect everything
+
+It checks that each user came online and went offline exactly once per
+phase, that the sid -> user and user -> sids indexes agree throughout, and
+that nothing is left at the end. The original linear scan over
+{username: sid} is timed for comparison on --legacy-sockets sockets.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.presence import MemoryPresenceBackend, PresenceRegistry  # noqa: E402
+
+
+def run_threads(threads, work, chunks):
+    """Run work(chunk) for each chunk on `threads` threads; returns (results, seconds)"""
+    results = [None] * len(chunks)
+
+    def worker(offset):
+        for i in range(offset, len(chunks), threads):
+            results[i] = work(chunks[i])
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return results, time.perf_counter() - start
+
+
+def split(items, parts):
+    return [items[i::parts] for i in range(parts)]
+
+
+def legacy_disconnect_all(sockets):
+    """The original handle_disconnect: scan every (user, sid) pair to find the socket"""
+    online_users = {f"user{i}": sid for i, sid in enumerate(sockets)}
+    start = time.perf_counter()
+    for sid in sockets:
+        for user, user_sid in list(online_users.items()):
+            if user_sid == sid:
+                del online_users[user]
+                break
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sockets', type=int, default=50000)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--legacy-sockets', type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    registry = PresenceRegistry(MemoryPresenceBackend(), ttl=3600)
+    sockets = [(f"user{rng.randrange(args.users)}", uuid.uuid4().hex) for _ in range(args.sockets)]
+    distinct = len({user for user, _ in sockets})
+    chunks = split(sockets, args.threads * 16)
+
+    def connect(chunk):
+        return sum(registry.connect(user, sid) for user, sid in chunk)
+
+    def disconnect(chunk):
+        return sum(registry.disconnect(sid)[1] for _, sid in chunk)
+
+    came_online, connect_s = run_threads(args.threads, connect, chunks)
+    assert sum(came_online) == distinct, f"{sum(came_online)} users came online, expected {distinct}"
+    assert len(registry.local) == args.sockets and registry.local.check()
+    assert len(registry.online_users()) == distinct
+
+    # Reconnect storm: drop each socket and come back with a new sid, interleaved across threads
+    rng.shuffle(sockets)
+    renewed = [(user, sid, uuid.uuid4().hex) for user, sid in sockets]
+
+    def reconnect(chunk):
+        for user, old_sid, new_sid in chunk:
+            registry.connect(user, new_sid)
+            username, _ = registry.disconnect(old_sid)
+            assert username == user
+        return len(chunk)
+
+    _, storm_s = run_threads(args.threads, reconnect, split(renewed, args.threads * 16))
+    assert len(registry.local) == args.sockets and registry.local.check()
+    assert len(registry.online_users()) == distinct, "a user dropped offline during the reconnect storm"
+
+    sockets = [(user, new_sid) for user, _, new_sid in renewed]
+    rng.shuffle(sockets)
+    went_offline, disconnect_s = run_threads(args.threads, disconnect, split(sockets, args.threads * 16))
+    assert sum(went_offline) == distinct, f"{sum(went_offline)} users went offline, expected {distinct}"
+    assert len(registry.local) == 0 and registry.local.user_count() == 0 and registry.local.check()
+    assert registry.online_users() == []
+
+    n = args.sockets
+    print(f"👥 {n} sockets, {distinct} users, {args.threads} threads")
+    print(f"   connect:          {connect_s:.2f}s ({n / connect_s:,.0f}/s)")
+    print(f"   reconnect storm:  {storm_s:.2f}s ({n / storm_s:,.0f} reconnects/s)")
+    print(f"   disconnect:       {disconnect_s:.2f}s ({n / disconnect_s:,.0f}/s, "
+          f"{disconnect_s / n * 1e6:.1f} µs each)")
+
+    legacy = [uuid.uuid4().hex for _ in range(args.legacy_sockets)]
+    legacy_s = legacy_disconnect_all(legacy)
+    m = args.legacy_sockets
+    print(f"🐢 legacy scan, {m} sockets: {legacy_s:.2f}s ({legacy_s / m * 1e6:.1f} µs per disconnect, "
+          f"~{legacy_s * (n / m) ** 2:.0f}s projected for {n})")
+    print("✅ Indexes consistent; every user came online and went offline exactly once")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+"""
+Multi-node Socket.IO load test: cross-node delivery and shared presence.
+
+    python benchmarks/bench_presence_nodes.py [--nodes 3] [--users 30] [--messages 20] [--database URI]
+
+Starts the Redis-protocol stand-in (benchmarks/resp_server.py) and --nodes
+app processes on their own ports, all with PRESENCE_BACKEND=redis and the
+stand-in as SOCKETIO_MESSAGE_QUEUE, on a throwaway SQLite database (WAL
+mode) unless --database points at a real server. User i
+connects to node i % nodes and sends --messages messages to user i + 1,
+who is on the next node, so every delivery crosses a node. The two
+neighbours of a user are their contacts, and presence is followed from the
+`presence_snapshot` and `presence_delta` events. It checks that:
+
+  - every user sees both neighbours online, whatever their node
+  - every message arrived, and the delivery latency
+  - a user with sockets on two nodes stays online when one closes
+  - after a node is killed (no disconnect handlers), its users are reported
+    offline through the other nodes within PRESENCE_TTL
+
+The detector runs as configured for the app (DETECTOR_BACKEND and the
+model files under models/).
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from resp_server import RESPServer  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"node on port {port} did not start")
+
+
+# -----------------------------
+# Node process
+# -----------------------------
+def serve(port):
+    from app import create_app
+    from app.extensions import socketio
+    from app.utils.detector import warmup
+    app = create_app()
+    warmup()
+    socketio.run(app, host='127.0.0.1', port=port, allow_unsafe_werkzeug=True, log_output=False)
+
+
+def start_nodes(count, env, log):
+    nodes = []
+    for _ in range(count):
+        port = free_port()
+        proc = subprocess.Popen([sys.executable, __file__, '--serve', str(port)], env=env,
+                                stdout=log, stderr=subprocess.STDOUT)
+        nodes.append((port, proc))
+    for port, _ in nodes:
+        wait_for_port(port)
+    return nodes
+
+
+def init_database(usernames):
+    """Create the tables and make neighbours contacts (one message each)"""
+    from app import create_app
+    from app.models import db, Message
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        if db.engine.dialect.name == 'sqlite':
+            # Several node processes write at once
+            db.session.execute(db.text('PRAGMA journal_mode=WAL'))
+        for i, sender in enumerate(usernames):
+            db.session.add(Message(sender=sender, receiver=usernames[(i + 1) % len(usernames)], content='hi'))
+        db.session.commit()
+
+
+# -----------------------------
+# Clients
+# -----------------------------
+class User:
+    def __init__(self, name, port):
+        import socketio
+        self.name = name
+        self.port = port
+        self.received = []  # (message, latency seconds)
+        self.online = set()  # online contacts
+        self.version = 0
+        self.errors = []
+        self.client = socketio.Client(reconnection=False)
+        self.client.on('receive_message', self._on_message)
+        self.client.on('presence_snapshot', self._on_snapshot)
+        self.client.on('presence_delta', self._on_delta)
+        self.client.on('error', lambda data: self.errors.append(data))
+
+    def _on_message(self, data):
+        sent_at = float(data['message'].rsplit(' ', 1)[1])
+        self.received.append((data['message'], time.time() - sent_at))
+
+    def _on_snapshot(self, data):
+        self.online = set(data['online'])
+        self.version = data['version']
+
+    def _on_delta(self, data):
+        if data['version'] <= self.version:
+            return  # already part of the snapshot
+        self.online = (self.online | set(data['joined'])) - set(data['left'])
+        self.version = data['version']
+
+    def connect(self):
+        self.client.connect(f"http://127.0.0.1:{self.port}?username={self.name}", transports=['websocket'])
+
+    def send(self, receiver, text):
+        self.client.emit('send_message', {'sender': self.name, 'receiver': receiver, 'message': f"{text} {time.time()}"})
+
+
+def wait_until(predicate, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.1)
+    return predicate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--nodes', type=int, default=3)
+    parser.add_argument('--users', type=int, default=30)
+    parser.add_argument('--messages', type=int, default=20, help='Messages per user')
+    parser.add_argument('--interval', type=float, default=0.3,
+                        help='Seconds between the messages of one user (SQLite serialises every commit)')
+    parser.add_argument('--ttl', type=float, default=3.0, help='PRESENCE_TTL of the nodes')
+    parser.add_argument('--database', help='Database URI shared by the nodes (default: a temporary SQLite file)')
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        return serve(args.serve)
+    if args.nodes < 2:
+        parser.error("--nodes must be at least 2")
+
+    redis = RESPServer(port=free_port())
+    redis.start()
+    workdir = tempfile.mkdtemp()
+    database = args.database or f"sqlite:///{os.path.join(workdir, 'presence_nodes.db')}"
+    env = dict(os.environ, DATABASE_URI=database, PRESENCE_BACKEND='redis',
+               PRESENCE_REDIS_URL=redis.url, SOCKETIO_MESSAGE_QUEUE=redis.url, PRESENCE_TTL=str(args.ttl),
+               REVOCATION_BACKEND='memory', CHAT_CLASSIFY_MODE='blocking')
+    os.environ.update(env)
+    names = [f"user{i}" for i in range(args.users)]
+    init_database(names)
+
+    log_path = os.path.join(workdir, 'nodes.log')
+    log = open(log_path, 'w')
+    nodes = start_nodes(args.nodes, env, log)
+    print(f"🌐 {args.nodes} nodes on ports {', '.join(str(p) for p, _ in nodes)}, queue {redis.url}, log {log_path}")
+    users = []
+    try:
+        users = [User(name, nodes[i % args.nodes][0]) for i, name in enumerate(names)]
+        for user in users:
+            user.connect()
+        neighbours = {u.name: {names[i - 1], names[(i + 1) % len(names)]} for i, u in enumerate(users)}
+        assert wait_until(lambda: all(u.online == neighbours[u.name] for u in users), 10), "presence did not converge"
+        print(f"✅ Presence: every user sees both neighbours online across {args.nodes} nodes")
+
+        # Every message goes to the next user, who is connected to the next node
+        total = args.users * args.messages
+        start = time.perf_counter()
+        def sender(user, receiver):
+            for n in range(args.messages):
+                user.send(receiver.name, f"hello {receiver.name} #{n}")
+                time.sleep(args.interval)
+
+        threads = [threading.Thread(target=sender, args=(u, users[(i + 1) % args.users])) for i, u in enumerate(users)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        delivered = wait_until(lambda: sum(len(u.received) for u in users) >= total, 60)
+        elapsed = time.perf_counter() - start
+        received = sum(len(u.received) for u in users)
+        latencies = sorted(lat for u in users for _, lat in u.received)
+        print(f"✉️ {received}/{total} cross-node messages delivered in {elapsed:.2f}s "
+              f"({received / elapsed:.0f} msg/s), latency p50 {latencies[len(latencies) // 2] * 1000:.1f} ms "
+              f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms")
+        errors = [e for u in users for e in u.errors]
+        assert delivered and not errors, f"missing messages or errors: {errors[:3]}"
+
+        # Two sockets for one user on different nodes; user1 (next node) watches
+        second = User(users[0].name, nodes[1][0])
+        second.connect()
+        users[0].client.disconnect()
+        time.sleep(0.5)
+        assert wait_until(lambda: users[0].name in users[1].online, 2), "user went offline with a socket left"
+        second.client.disconnect()
+        assert wait_until(lambda: users[0].name not in users[1].online, 5), "user stayed online without sockets"
+        print("✅ Multiple sockets: online until the last one closed")
+
+        # A node dies without running its disconnect handlers
+        port, victim = nodes[-1]
+        victim.send_signal(signal.SIGKILL)
+        victim.wait()
+        gone = {u.name for u in users[1:] if u.port == port}
+        observers = [u for u in users[1:] if u.port != port]
+        start = time.perf_counter()
+        expired = wait_until(lambda: not any(u.online & gone for u in observers), args.ttl * 3)
+        assert expired, "sockets of the dead node never expired"
+        print(f"✅ Heartbeat expiry: {len(gone)} users of the killed node offline after "
+              f"{time.perf_counter() - start:.1f}s (PRESENCE_TTL {args.ttl:g}s)")
+    finally:
+        for user in users:
+            try:
+                user.client.disconnect()
+            except Exception:
+                pass
+        for _, proc in nodes:
+            if proc.poll() is None:
+                proc.terminate()
+                proc.wait()
+        redis.shutdown()
+        log.close()
+
+
+if __name__ == '__main__':
+    main()
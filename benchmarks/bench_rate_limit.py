@@ -0,0 +1,166 @@
+"""
+Flood test of the rate limiter: detector runs and time spent with and without it.
+
+    python benchmarks/bench_rate_limit.py [--flood 2000] [--users 20] [--backend memory|redis]
+
+Runs each scenario through the Socket.IO and HTTP test clients, once with
+the limiter off and once on (the RATE_LIMIT_* defaults from Config, plus
+per-IP limits of 100/10 for messages and typing and 50/60 for comments
+unless RATE_LIMIT_*_IP is set):
+
+  - message flood: one user sends --flood messages back to back while
+    --users others, each on their own IP, send --normal messages each
+  - shared-IP flood: --sybils accounts on one IP send --normal messages each
+    (each under its user limit, together over the IP limit)
+  - comment flood: one user posts --flood / 10 comments
+  - typing flood: one user sends --flood typing events
+
+It counts the detector runs (predict_text calls), checks that every message
+of the normal users got through with the limiter on, and reports the
+limiter's own `inference_saved` metric. With --backend redis the buckets
+live in the Redis-protocol stand-in (benchmarks/resp_server.py, needs the
+'lupa' package for its Lua scripts).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--flood', type=int, default=2000, help='Events sent by the flooding user')
+    parser.add_argument('--users', type=int, default=20, help='Normal users next to the flooder')
+    parser.add_argument('--normal', type=int, default=5, help='Messages per normal user')
+    parser.add_argument('--sybils', type=int, default=100, help='Accounts sharing one IP')
+    parser.add_argument('--backend', choices=('memory', 'redis'), default='memory')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'bench_rate_limit.db')}"
+    os.environ.setdefault('MAX_BULLYING_COUNT', '1000000')
+    os.environ.setdefault('JWT_SECRET_KEY', 'bench-secret-key-bench-secret-key')
+    os.environ.setdefault('REVOCATION_BACKEND', 'memory')
+    os.environ['CHAT_CLASSIFY_MODE'] = 'blocking'
+    os.environ['RATE_LIMIT_BACKEND'] = args.backend
+    os.environ.setdefault('RATE_LIMIT_MESSAGE_IP', '100/10')
+    os.environ.setdefault('RATE_LIMIT_TYPING_IP', '100/10')
+    os.environ.setdefault('RATE_LIMIT_COMMENT_IP', '50/60')
+    if args.backend == 'redis':
+        from resp_server import RESPServer
+        redis = RESPServer(port=0)
+        redis.start()
+        os.environ['RATE_LIMIT_REDIS_URL'] = redis.url
+
+    from flask_jwt_extended import create_access_token
+    from app import create_app
+    from app.extensions import socketio
+    from app.models import db, User, Post
+    from app.routes import chat, comment
+    from app.utils.detector import warmup
+
+    # Count detector runs where the routes call it
+    runs = [0]
+
+    def counted(predict):
+        def wrapper(*a, **k):
+            runs[0] += 1
+            return predict(*a, **k)
+        return wrapper
+    chat.predict_text = counted(chat.predict_text)
+    comment.predict_text = counted(comment.predict_text)
+
+    app = create_app()
+    limiter = app.rate_limiter
+    names = ['flooder'] + [f'user{i}' for i in range(args.users)] + [f'sybil{i}' for i in range(args.sybils)]
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([User(username=n, password='x', email=f'{n}@example.com') for n in names])
+        db.session.add(Post(id='post1', content='hello', user_id=None))
+        db.session.commit()
+        flooder_id = User.query.filter_by(username='flooder').first().id
+        token = create_access_token(identity=flooder_id)
+    warmup()
+
+    def connect(name, ip):
+        http = app.test_client()
+        http.environ_base['REMOTE_ADDR'] = ip
+        client = socketio.test_client(app, query_string=f'username={name}', flask_test_client=http)
+        client.get_received()
+        return client
+
+    def send(client, name, n):
+        client.emit('send_message', {'sender': name, 'receiver': 'user0', 'message': f'hello from {name} #{n}'})
+
+    def delivered(client):
+        return sum(1 for event in client.get_received() if event['name'] == 'message_sent')
+
+    def scenarios():
+        results = {}
+        flooder = connect('flooder', '10.0.0.1')
+        normals = [(f'user{i}', connect(f'user{i}', f'10.1.0.{i + 1}')) for i in range(args.users)]
+        sybils = [(f'sybil{i}', connect(f'sybil{i}', '10.2.0.1')) for i in range(args.sybils)]
+
+        start, before = time.perf_counter(), runs[0]
+        for n in range(args.flood):
+            send(flooder, 'flooder', n)
+            if n % (args.flood // args.normal or 1) == 0:
+                for name, client in normals:
+                    send(client, name, n)
+        results['message flood'] = (time.perf_counter() - start, runs[0] - before, delivered(flooder),
+                                    [delivered(client) for _, client in normals])
+
+        start, before = time.perf_counter(), runs[0]
+        for n in range(args.normal):
+            for name, client in sybils:
+                send(client, name, n)
+        results['shared-IP flood'] = (time.perf_counter() - start, runs[0] - before,
+                                      sum(delivered(client) for _, client in sybils), None)
+
+        http = app.test_client()
+        headers = {'Authorization': f'Bearer {token}'}
+        start, before = time.perf_counter(), runs[0]
+        accepted = sum(http.post('/api/comment/post1', json={'content': f'comment {n}'}, headers=headers,
+                                 environ_base={'REMOTE_ADDR': '10.0.0.1'}).status_code == 200
+                       for n in range(args.flood // 10))
+        results['comment flood'] = (time.perf_counter() - start, runs[0] - before, accepted, None)
+
+        start = time.perf_counter()
+        for n in range(args.flood):
+            flooder.emit('typing', {'sender': 'flooder', 'receiver': 'user0', 'is_typing': n % 2 == 0})
+        typing = sum(1 for event in normals[0][1].get_received() if event['name'] == 'user_typing')
+        results['typing flood'] = (time.perf_counter() - start, 0, typing, None)
+
+        for client in [flooder] + [c for _, c in normals + sybils]:
+            client.disconnect()
+        return results
+
+    app.rate_limiter = None
+    off = scenarios()
+    app.rate_limiter = limiter
+    on = scenarios()
+
+    sent = {'message flood': args.flood, 'shared-IP flood': args.sybils * args.normal,
+            'comment flood': args.flood // 10, 'typing flood': args.flood}
+    print(f"🚦 limiter backend {args.backend}; {args.users} normal users, {args.sybils} accounts on one IP")
+    print(f"   {'scenario':16s} {'sent':>6s} | {'limiter off':>28s} | {'limiter on':>28s}")
+    for name in off:
+        cells = []
+        for seconds, inference, accepted, _ in (off[name], on[name]):
+            cells.append(f"{accepted:5d} ok {inference:5d} runs {seconds:6.2f}s")
+        print(f"   {name:16s} {sent[name]:6d} | {cells[0]:>28s} | {cells[1]:>28s}")
+
+    normal_delivered = on['message flood'][3]
+    assert all(count == args.normal for count in normal_delivered), \
+        f"normal users were throttled: {normal_delivered}"
+    stats = limiter.stats()
+    print(f"✅ Every normal user's {args.normal} messages went through; "
+          f"inference_saved {stats['inference_saved']} ({stats['inference_saved_fraction']:.0%} of message/comment "
+          f"events), shared store errors {stats['shared_errors']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Parity check: the NumPy backend must reproduce the Keras model's
+probabilities over the training CSV.
+
+    python export_model.py
+    python benchmarks/check_backend_parity.py [--tolerance 1e-4] [--limit 0]
+
+Requires TensorFlow (for the reference Keras model).
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.utils import detector
+from app.utils.artifacts import TRAIN_CSV
+from app.utils.text import clean_texts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tolerance', type=float, default=1e-4)
+    parser.add_argument('--limit', type=int, default=0, help='Only check the first N rows (0 = all)')
+    parser.add_argument('--batch-size', type=int, default=256)
+    args = parser.parse_args()
+
+    with open(TRAIN_CSV, newline='', encoding='utf-8') as f:
+        texts = [row['text'] for row in csv.DictReader(f)]
+    if args.limit:
+        texts = texts[:args.limit]
+
+    x = detector._cleaned_to_input(detector._load_tokenizer(), clean_texts(texts))
+
+    keras_model = detector._load_keras_model()
+    numpy_model = detector._load_numpy_model()
+
+    start = time.perf_counter()
+    expected = keras_model.predict(x, batch_size=args.batch_size, verbose=0)[:, 0]
+    keras_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = np.concatenate([numpy_model.predict(x[i:i + args.batch_size])[:, 0]
+                             for i in range(0, len(x), args.batch_size)])
+    numpy_time = time.perf_counter() - start
+
+    diff = np.abs(expected - actual)
+    worst = int(diff.argmax())
+    label_flips = int(((expected >= 0.5) != (actual >= 0.5)).sum())
+    print(f"rows: {len(texts)}")
+    print(f"max |keras - numpy|: {diff.max():.2e} (row {worst}: {texts[worst]!r})")
+    print(f"mean |keras - numpy|: {diff.mean():.2e}, label flips at 0.5: {label_flips}")
+    print(f"keras: {keras_time:.2f}s, numpy: {numpy_time:.2f}s")
+
+    if diff.max() > args.tolerance:
+        raise SystemExit(f"❌ NumPy backend differs from Keras by more than {args.tolerance}")
+    print("✅ NumPy backend matches Keras")
+
+
+if __name__ == '__main__':
+    main()
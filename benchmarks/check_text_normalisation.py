@@ -0,0 +1,107 @@
+"""
+Golden check and timing for app.utils.text.
+
+Every row of the training CSV (plus randomly generated edge cases) must
+clean to exactly the same string as the original four-regex cleaner.
+
+    python benchmarks/check_text_normalisation.py [--fuzz 20000] [--no-timing]
+
+Exits 0 when every text matches and 1 on any mismatch (the first few are
+printed), so CI runs it as a plain step after installing requirements.txt:
+
+    python benchmarks/check_text_normalisation.py --no-timing
+
+It needs no database or server env (MAX_BULLYING_COUNT etc.).
+"""
+import argparse
+import csv
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.utils.artifacts import TRAIN_CSV
+from app.utils.text import clean_text, clean_texts
+
+
+def reference_clean_text(t):
+    """The original cleaner, kept verbatim as the golden reference"""
+    t = str(t).lower()
+    t = re.sub(r'http\S+', ' ', t)
+    t = re.sub(r'@\w+', ' @user ', t)
+    t = re.sub(r'[^a-z0-9@#\s\!\?\.\,\'\u2600-\u27BF]+', ' ', t)
+    t = re.sub(r'\s+', ' ', t).strip()
+    return t
+
+
+FUZZ_PIECES = ['http', 'xhttpz', 'https://x.co/a', '@', '@bob', '@httpx', 'HTTP', ' ', '\t', '\n', '\x1e',
+               '_', 'é', 'İ', 'Σ', 'ß', '!', '?', '.', ',', "'", '#', '☀', '➿', '⠀',
+               '😀', 'abc', '123', '<', '>', '-', ' ', '　']
+
+
+def fuzz_texts(n, seed=0):
+    rng = random.Random(seed)
+    return [''.join(rng.choice(FUZZ_PIECES) for _ in range(rng.randint(0, 12))) for _ in range(n)]
+
+
+def check(texts, label, batch=None, show=5):
+    """Compare clean_text and clean_texts (or `batch`, already cleaned) with the reference; number of mismatches"""
+    expected = [reference_clean_text(t) for t in texts]
+    single = [clean_text(t) for t in texts]
+    batch = clean_texts(texts) if batch is None else list(batch)
+    if len(batch) != len(texts):
+        print(f"❌ {label}: {len(batch)} batch results for {len(texts)} texts")
+        return len(texts)
+    mismatches = [(t, e, s, b) for t, e, s, b in zip(texts, expected, single, batch) if not (e == s == b)]
+    for t, e, s, b in mismatches[:show]:
+        print(f"❌ {label}: mismatch for {t!r}: expected {e!r}, got {s!r} / {b!r}")
+    if mismatches:
+        print(f"❌ {label}: {len(mismatches)} of {len(texts)} texts differ")
+    else:
+        print(f"✅ {label}: {len(texts)} texts identical")
+    return len(mismatches)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fuzz', type=int, default=20000)
+    parser.add_argument('--no-timing', action='store_true', help='Only run the checks (CI)')
+    args = parser.parse_args()
+
+    with open(TRAIN_CSV, newline='', encoding='utf-8') as f:
+        texts = [row['text'] for row in csv.DictReader(f)]
+
+    failures = check(texts, 'training CSV')
+    failures += check(fuzz_texts(args.fuzz), 'fuzz')
+    try:
+        import pandas as pd
+    except ImportError:
+        pd = None
+    if pd is not None:
+        failures += check(texts, 'pandas Series batch', batch=clean_texts(pd.Series(texts)).tolist())
+
+    if failures:
+        return 1
+    if args.no_timing:
+        return 0
+
+    n = len(texts)
+    ref = timed(lambda: [reference_clean_text(t) for t in texts])
+    new = timed(lambda: [clean_text(t) for t in texts])
+    batch = timed(lambda: clean_texts(texts))
+    print(f"reference : {ref / n * 1e6:6.2f} us/text")
+    print(f"clean_text: {new / n * 1e6:6.2f} us/text ({ref / new:.1f}x)")
+    print(f"clean_texts: {batch / n * 1e6:6.2f} us/text ({ref / batch:.1f}x)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,424 @@
+"""
+Minimal in-memory server speaking the Redis protocol (RESP2/RESP3), as a local
+stand-in for redis-server in benchmarks and multi-node tests.
+
+    python benchmarks/resp_server.py [--port 6399]
+
+Implements the commands used by the presence registry, the revocation
+store, the rate limiter and the Socket.IO message queue: strings with
+expiry, hashes, sets, MULTI/EXEC and PUBLISH/SUBSCRIBE, over RESP2 or RESP3
+(HELLO). EVAL/EVALSHA run Lua scripts when the 'lupa' package is installed.
+Single database, no persistence.
+"""
+import argparse
+import fnmatch
+import hashlib
+import socketserver
+import threading
+import time
+
+
+class Simple(str):
+    """A +simple string reply"""
+
+
+class Error(str):
+    """An -error reply"""
+
+
+class Push(list):
+    """An out-of-band pub/sub reply (a plain array in RESP2)"""
+
+
+OK = Simple('OK')
+
+
+# -----------------------------
+# Encoding
+# -----------------------------
+def encode(value, resp3=False):
+    if isinstance(value, Error):
+        return b'-' + value.encode() + b'\r\n'
+    if isinstance(value, Simple):
+        return b'+' + value.encode() + b'\r\n'
+    if value is None:
+        return b'_\r\n' if resp3 else b'$-1\r\n'
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, int):
+        return b':%d\r\n' % value
+    if isinstance(value, str):
+        value = value.encode()
+    if isinstance(value, bytes):
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+    if isinstance(value, dict):
+        prefix = b'%' if resp3 else b'*'
+        count = len(value) if resp3 else 2 * len(value)
+        value = [item for pair in value.items() for item in pair]
+    else:
+        prefix = b'*'
+        if resp3 and isinstance(value, (set, frozenset)):
+            prefix = b'~'
+        elif resp3 and isinstance(value, Push):
+            prefix = b'>'
+        count = len(value)
+    return prefix + b'%d\r\n' % count + b''.join(encode(v, resp3) for v in value)
+
+
+def read_command(rfile):
+    """One command as a list of bytes, or None at EOF"""
+    line = rfile.readline()
+    if not line:
+        return None
+    if not line.startswith(b'*'):
+        return line.split()  # inline command
+    args = []
+    for _ in range(int(line[1:])):
+        size = int(rfile.readline()[1:])
+        args.append(rfile.read(size + 2)[:-2])
+    return args
+
+
+# -----------------------------
+# Store
+# -----------------------------
+class Store:
+    def __init__(self):
+        self.data = {}
+        self.expires = {}  # key -> epoch seconds
+        self.channels = {}  # channel -> set of handlers
+        self.scripts = {}   # sha1 (hex bytes) -> script source
+        self.lock = threading.RLock()
+        self._lua = None
+        self._compiled = {}
+
+    def _get(self, key):
+        expires_at = self.expires.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return self.data.get(key)
+
+    def _container(self, key, kind):
+        value = self._get(key)
+        if value is None:
+            value = self.data[key] = kind()
+        return value
+
+    def _drop_if_empty(self, key):
+        if not self.data.get(key):
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+
+    def execute(self, args):
+        name = args[0].decode().lower()
+        handler = getattr(self, 'cmd_' + name, None)
+        if handler is None:
+            return Error(f"ERR unknown command '{name}'")
+        with self.lock:
+            try:
+                return handler(*args[1:])
+            except (TypeError, ValueError) as e:
+                return Error(f"ERR {name}: {e}")
+
+    # Connection
+    def cmd_ping(self, message=None):
+        return Simple('PONG') if message is None else message
+
+    def cmd_select(self, db):
+        return OK
+
+    def cmd_client(self, *args):
+        return OK
+
+    def cmd_time(self):
+        now = time.time()
+        return [str(int(now)).encode(), str(int(now % 1 * 1000000)).encode()]
+
+    def cmd_flushall(self, *args):
+        self.data.clear()
+        self.expires.clear()
+        return OK
+
+    # Strings and keys
+    def cmd_get(self, key):
+        return self._get(key)
+
+    def cmd_set(self, key, value, *options):
+        self.data[key] = value
+        self.expires.pop(key, None)
+        options = [o.lower() for o in options]
+        for flag, scale in ((b'ex', 1.0), (b'px', 0.001)):
+            if flag in options:
+                self.expires[key] = time.time() + float(options[options.index(flag) + 1]) * scale
+        return OK
+
+    def cmd_incrby(self, key, amount):
+        value = int(self._get(key) or 0) + int(amount)
+        self.data[key] = str(value).encode()
+        return value
+
+    def cmd_incr(self, key):
+        return self.cmd_incrby(key, 1)
+
+    def cmd_exists(self, *keys):
+        return sum(1 for key in keys if self._get(key) is not None)
+
+    def cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._get(key) is not None:
+                del self.data[key]
+                self.expires.pop(key, None)
+                removed += 1
+        return removed
+
+    def cmd_expire(self, key, seconds):
+        if self._get(key) is None:
+            return 0
+        self.expires[key] = time.time() + float(seconds)
+        return 1
+
+    def cmd_pexpire(self, key, milliseconds):
+        return self.cmd_expire(key, float(milliseconds) / 1000.0)
+
+    def cmd_scan(self, cursor, *options):
+        options = [o.lower() if i % 2 == 0 else o for i, o in enumerate(options)]
+        pattern = options[options.index(b'match') + 1].decode() if b'match' in options else '*'
+        keys = [k for k in list(self.data) if self._get(k) is not None and fnmatch.fnmatchcase(k.decode(), pattern)]
+        return [b'0', keys]
+
+    # Hashes
+    def cmd_hset(self, key, *pairs):
+        value = self._container(key, dict)
+        added = 0
+        for field, item in zip(pairs[::2], pairs[1::2]):
+            added += field not in value
+            value[field] = item
+        return added
+
+    def cmd_hget(self, key, field):
+        return (self._get(key) or {}).get(field)
+
+    def cmd_hmget(self, key, *fields):
+        value = self._get(key) or {}
+        return [value.get(field) for field in fields]
+
+    def cmd_hdel(self, key, *fields):
+        value = self._get(key) or {}
+        removed = sum(1 for field in fields if value.pop(field, None) is not None)
+        self._drop_if_empty(key)
+        return removed
+
+    def cmd_hgetall(self, key):
+        return dict(self._get(key) or {})
+
+    def cmd_hlen(self, key):
+        return len(self._get(key) or {})
+
+    # Sets
+    def cmd_sadd(self, key, *members):
+        value = self._container(key, set)
+        before = len(value)
+        value.update(members)
+        return len(value) - before
+
+    def cmd_srem(self, key, *members):
+        value = self._get(key) or set()
+        before = len(value)
+        value.difference_update(members)
+        removed = before - len(value)
+        self._drop_if_empty(key)
+        return removed
+
+    def cmd_smembers(self, key):
+        return set(self._get(key) or ())
+
+    def cmd_scard(self, key):
+        return len(self._get(key) or ())
+
+    # Scripting
+    def cmd_script(self, subcommand, *args):
+        subcommand = subcommand.lower()
+        if subcommand == b'load':
+            sha = hashlib.sha1(args[0]).hexdigest().encode()
+            self.scripts[sha] = args[0]
+            return sha
+        if subcommand == b'exists':
+            return [int(sha.lower() in self.scripts) for sha in args]
+        if subcommand == b'flush':
+            self.scripts.clear()
+            self._compiled.clear()
+            return OK
+        return Error(f"ERR unknown SCRIPT subcommand '{subcommand.decode()}'")
+
+    def cmd_eval(self, script, numkeys, *args):
+        sha = self.cmd_script(b'load', script)
+        return self.cmd_evalsha(sha, numkeys, *args)
+
+    def cmd_evalsha(self, sha, numkeys, *args):
+        sha = sha.lower()
+        if sha not in self.scripts:
+            return Error("NOSCRIPT No matching script. Please use EVAL.")
+        try:
+            import lupa
+        except ImportError:
+            return Error("ERR scripting needs the 'lupa' package")
+        if self._lua is None:
+            self._lua = lupa.LuaRuntime(encoding=None)
+            self._lua.execute(b'redis = {}')
+            self._lua.globals().redis.call = self._lua_call
+        function = self._compiled.get(sha)
+        if function is None:
+            function = self._compiled[sha] = self._lua.eval(b'function(KEYS, ARGV) ' + self.scripts[sha] + b' end')
+        n = int(numkeys)
+        reply = function(self._lua.table_from(list(args[:n])), self._lua.table_from(list(args[n:])))
+        return self._from_lua(reply)
+
+    def _lua_call(self, *args):
+        reply = self.execute([a if isinstance(a, bytes) else str(a).encode() for a in args])
+        if isinstance(reply, Error):
+            raise RuntimeError(reply)
+        return self._to_lua(reply)
+
+    def _to_lua(self, value):
+        if value is None:
+            return False
+        if isinstance(value, Simple):
+            return self._lua.table_from({b'ok': value.encode()})
+        if isinstance(value, dict):
+            value = [item for pair in value.items() for item in pair]
+        if isinstance(value, (list, set, frozenset)):
+            return self._lua.table_from([self._to_lua(v) for v in value])
+        return value
+
+    def _from_lua(self, value):
+        import lupa
+        if lupa.lua_type(value) == 'table':
+            items = []
+            for i in range(1, len(value) + 1):
+                if value[i] is None:
+                    break
+                items.append(self._from_lua(value[i]))
+            return items
+        if value is True:
+            return 1
+        if value is None or value is False:
+            return None
+        if isinstance(value, float):
+            return int(value)
+        return value
+
+    # Pub/sub
+    def cmd_publish(self, channel, message):
+        receivers = list(self.channels.get(channel, ()))
+        for handler in receivers:
+            handler.push(Push([b'message', channel, message]))
+        return len(receivers)
+
+
+# -----------------------------
+# Server
+# -----------------------------
+class _Handler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.write_lock = threading.Lock()
+        self.subscriptions = set()
+        self.resp3 = False
+
+    def push(self, reply):
+        try:
+            with self.write_lock:
+                self.wfile.write(encode(reply, self.resp3))
+                self.wfile.flush()
+        except OSError:
+            pass
+
+    def handle(self):
+        store = self.server.store
+        queued = None
+        while True:
+            args = read_command(self.rfile)
+            if args is None:
+                break
+            if not args:
+                continue
+            name = args[0].lower()
+            if name in (b'subscribe', b'unsubscribe'):
+                self._subscription(store, name, args[1:])
+                continue
+            if name == b'hello':
+                self.resp3 = len(args) > 1 and args[1] == b'3'
+                self.push({b'server': b'resp-stand-in', b'version': b'7.0.0', b'proto': 3 if self.resp3 else 2})
+                continue
+            if name == b'multi':
+                queued = []
+                self.push(OK)
+            elif name == b'exec':
+                with store.lock:
+                    replies = [store.execute(command) for command in queued or []]
+                queued = None
+                self.push(replies)
+            elif name == b'discard':
+                queued = None
+                self.push(OK)
+            elif queued is not None:
+                queued.append(args)
+                self.push(Simple('QUEUED'))
+            else:
+                self.push(store.execute(args))
+
+    def _subscription(self, store, name, channels):
+        with store.lock:
+            for channel in channels or list(self.subscriptions):
+                if name == b'subscribe':
+                    self.subscriptions.add(channel)
+                    store.channels.setdefault(channel, set()).add(self)
+                else:
+                    self.subscriptions.discard(channel)
+                    store.channels.get(channel, set()).discard(self)
+                self.push(Push([name, channel, len(self.subscriptions)]))
+
+    def finish(self):
+        with self.server.store.lock:
+            for channel in self.subscriptions:
+                self.server.store.channels.get(channel, set()).discard(self)
+        super().finish()
+
+
+class RESPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=6399):
+        super().__init__((host, port), _Handler)
+        self.store = Store()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self):
+        """Serve in a daemon thread"""
+        thread = threading.Thread(target=self.serve_forever, name='resp-server', daemon=True)
+        thread.start()
+        return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6399)
+    args = parser.parse_args()
+    server = RESPServer(args.host, args.port)
+    print(f"🧪 Redis-protocol stand-in on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
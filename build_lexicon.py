@@ -0,0 +1,31 @@
+"""
+Build models/lexicon.bin from the training CSV.
+
+train_model.py runs this automatically; use it directly to rebuild the
+lexicon for an existing model without retraining.
+"""
+import argparse
+import time
+
+from app.utils.artifacts import MODEL_DIR, TRAIN_CSV
+from app.utils.lexicon import build_lexicon
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--csv', default=TRAIN_CSV, help='Training CSV with text,label columns')
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--min-bully-freq', type=int, default=2)
+    parser.add_argument('--max-non-bully-freq', type=int, default=1)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    header = build_lexicon(args.csv, model_dir=args.model_dir,
+                           min_bully_freq=args.min_bully_freq,
+                           max_non_bully_freq=args.max_non_bully_freq)
+    print(f"✅ Wrote {header['count']} words (training CSV {header['source_sha256']}) "
+          f"in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()  # Load from .env file
@@ -8,6 +9,98 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
     MAX_BULLYING_COUNT = int(os.getenv('MAX_BULLYING_COUNT'))
+
+    # JWT revocation store: 'sql' (revoked_token table), 'redis' or 'memory' (per process, lost on restart)
+    REVOCATION_BACKEND = os.getenv('REVOCATION_BACKEND', 'sql').lower()
+    REVOCATION_REDIS_URL = os.getenv('REVOCATION_REDIS_URL', 'redis://localhost:6379/0')
+    REVOCATION_NEGATIVE_CACHE_TTL = float(os.getenv('REVOCATION_NEGATIVE_CACHE_TTL', 30))  # Seconds a "not revoked" answer is reused
+    REVOCATION_CACHE_SIZE = int(os.getenv('REVOCATION_CACHE_SIZE', 100000))
+
+    # Detector inference backend: 'keras' (bully_model.h5) or 'numpy' (bully_model.npz, no TensorFlow)
+    DETECTOR_BACKEND = os.getenv('DETECTOR_BACKEND', 'keras').lower()
+    # Sequence-length buckets for the numpy backend (empty = always run the full padded length)
+    DETECTOR_LENGTH_BUCKETS = [int(b) for b in os.getenv('DETECTOR_LENGTH_BUCKETS', '16,32,64,100').split(',') if b.strip()]
+
+    # Local detector service (run_detector_service.py); empty = always run the model in-process
+    DETECTOR_SERVICE_SOCKET = os.getenv('DETECTOR_SERVICE_SOCKET', '')
+    DETECTOR_SERVICE_TIMEOUT = float(os.getenv('DETECTOR_SERVICE_TIMEOUT', 2))              # Seconds per request
+    DETECTOR_SERVICE_RETRY_SECONDS = float(os.getenv('DETECTOR_SERVICE_RETRY_SECONDS', 10))  # In-process fallback before retrying
+    DETECTOR_SERVICE_HEALTH_SECONDS = float(os.getenv('DETECTOR_SERVICE_HEALTH_SECONDS', 5))  # Readiness reuses an answer this long
+    DETECTOR_SERVICE_WORKERS = int(os.getenv('DETECTOR_SERVICE_WORKERS', os.cpu_count() or 1))
+    DETECTOR_SERVICE_THREADS = int(os.getenv('DETECTOR_SERVICE_THREADS', 1))                # Math threads per worker
+
+    # Detector micro-batching
+    DETECTOR_BATCHING = os.getenv('DETECTOR_BATCHING', 'true').lower() == 'true'
+    DETECTOR_BATCH_SIZE = int(os.getenv('DETECTOR_BATCH_SIZE', 32))        # Max texts per forward pass
+    DETECTOR_BATCH_WAIT_MS = float(os.getenv('DETECTOR_BATCH_WAIT_MS', 5))  # Latency budget before a partial flush
+    DETECTOR_QUEUE_SIZE = int(os.getenv('DETECTOR_QUEUE_SIZE', 1024))      # Max pending requests
+    DETECTOR_BATCH_TIMEOUT = float(os.getenv('DETECTOR_BATCH_TIMEOUT', 2))  # Seconds before predicting directly instead
+
+    # Detector prediction cache: 'memory' (per process), 'sqlite' (shared by workers on a host) or 'off'
+    DETECTOR_CACHE = os.getenv('DETECTOR_CACHE', 'memory')
+    DETECTOR_CACHE_SIZE = int(os.getenv('DETECTOR_CACHE_SIZE', 10000))
+    DETECTOR_CACHE_TTL = float(os.getenv('DETECTOR_CACHE_TTL', 3600))       # Seconds
+    DETECTOR_CACHE_PATH = os.getenv('DETECTOR_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'cyberscan_prediction_cache.sqlite3'))
+    DETECTOR_RELOAD_CHECK_SECONDS = float(os.getenv('DETECTOR_RELOAD_CHECK_SECONDS', 5))  # How often to stat the model files
+
+    # When chat messages are classified: 'blocking' (classify, then deliver),
+    # 'async' (deliver now, push 'message_classified' later) or 'hold' (wait up to the timeout)
+    CHAT_CLASSIFY_MODE = os.getenv('CHAT_CLASSIFY_MODE', 'blocking').lower()
+    CHAT_CLASSIFY_HOLD_TIMEOUT = float(os.getenv('CHAT_CLASSIFY_HOLD_TIMEOUT', 0.5))  # Seconds
+    CHAT_CLASSIFY_WORKERS = int(os.getenv('CHAT_CLASSIFY_WORKERS', 4))
+
+    # How chat messages are stored: 'sync' (commit before the ack) or 'write_behind'
+    # (journal, ack, then group commits of up to MAX_ROWS rows or MAX_MS of messages)
+    CHAT_PERSIST_MODE = os.getenv('CHAT_PERSIST_MODE', 'sync').lower()
+    CHAT_WRITE_BEHIND_MAX_ROWS = int(os.getenv('CHAT_WRITE_BEHIND_MAX_ROWS', 500))
+    CHAT_WRITE_BEHIND_MAX_MS = float(os.getenv('CHAT_WRITE_BEHIND_MAX_MS', 20))
+    CHAT_WRITE_BEHIND_MAX_QUEUE = int(os.getenv('CHAT_WRITE_BEHIND_MAX_QUEUE', 100000))  # Senders wait past this many
+    CHAT_WRITE_BEHIND_SYNC_MS = float(os.getenv('CHAT_WRITE_BEHIND_SYNC_MS', 500))  # Max wait of a read for the user's queued writes
+    # Journal of accepted, uncommitted messages (<path>.000001, ... segments), replayed on start. It is locked:
+    # a second process on the same path refuses to start, so give every server process its own path.
+    CHAT_JOURNAL_PATH = os.getenv('CHAT_JOURNAL_PATH', os.path.join(tempfile.gettempdir(), 'cyberscan_message_journal.log'))
+    CHAT_JOURNAL_SEGMENT_MB = float(os.getenv('CHAT_JOURNAL_SEGMENT_MB', 16))  # Committed segments are deleted
+
+    # Presence registry: 'memory' (one node) or 'redis' (shared by every node)
+    PRESENCE_BACKEND = os.getenv('PRESENCE_BACKEND', 'memory').lower()
+    PRESENCE_REDIS_URL = os.getenv('PRESENCE_REDIS_URL', 'redis://localhost:6379/0')
+    PRESENCE_TTL = float(os.getenv('PRESENCE_TTL', 60))  # Seconds a socket of a silent node stays online
+    PRESENCE_DELTA_MS = float(os.getenv('PRESENCE_DELTA_MS', 250))          # Join/leave batching window
+    PRESENCE_CONTACTS_TTL = float(os.getenv('PRESENCE_CONTACTS_TTL', 300))  # Seconds conversation partners are cached
+    # Also broadcast the full 'online_users' list and 'user_joined' to everyone (clients without deltas).
+    # On for one more release so existing clients keep working; set to false once they use the deltas.
+    PRESENCE_FULL_BROADCAST = os.getenv('PRESENCE_FULL_BROADCAST', 'true').lower() in ('1', 'true', 'yes')
+    # Socket.IO message queue for several nodes, e.g. redis://localhost:6379/0 (empty = single node)
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE', '')
+
+    # Read receipts are written in one transaction per window instead of one per event
+    READ_RECEIPT_FLUSH_MS = float(os.getenv('READ_RECEIPT_FLUSH_MS', 200))
+    READ_RECEIPT_MAX_PENDING = int(os.getenv('READ_RECEIPT_MAX_PENDING', 5000))  # Flush early past this many ids
+
+    # Reverse proxies in front of the app whose X-Forwarded-For is trusted for the client IP (0 = none)
+    TRUSTED_PROXIES = int(os.getenv('TRUSTED_PROXIES', 0))
+    # Token-bucket rate limits as "<burst>/<seconds>" (up to <burst> events, refilled over <seconds>; empty = none),
+    # per user and per client IP. Rejected events are dropped before the detector runs. The per-IP limits are off
+    # by default: behind a proxy every client has the proxy's address unless TRUSTED_PROXIES is set.
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory').lower()  # 'memory' (per process) or 'redis' (shared)
+    RATE_LIMIT_REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0')
+    RATE_LIMIT_MESSAGE_USER = os.getenv('RATE_LIMIT_MESSAGE_USER', '20/10')
+    RATE_LIMIT_MESSAGE_IP = os.getenv('RATE_LIMIT_MESSAGE_IP', '')  # e.g. 100/10
+    RATE_LIMIT_TYPING_USER = os.getenv('RATE_LIMIT_TYPING_USER', '20/10')
+    RATE_LIMIT_TYPING_IP = os.getenv('RATE_LIMIT_TYPING_IP', '')    # e.g. 100/10
+    RATE_LIMIT_COMMENT_USER = os.getenv('RATE_LIMIT_COMMENT_USER', '10/60')
+    RATE_LIMIT_COMMENT_IP = os.getenv('RATE_LIMIT_COMMENT_IP', '')  # e.g. 50/60
+
+    # Post moderation queue (moderation_worker.py)
+    MODERATION_BATCH_SIZE = int(os.getenv('MODERATION_BATCH_SIZE', 64))
+    MODERATION_POLL_SECONDS = float(os.getenv('MODERATION_POLL_SECONDS', 1))
+    MODERATION_VISIBILITY_TIMEOUT = float(os.getenv('MODERATION_VISIBILITY_TIMEOUT', 300))  # Seconds before a claimed job is retried
+    MODERATION_MAX_ATTEMPTS = int(os.getenv('MODERATION_MAX_ATTEMPTS', 3))
+    MODERATION_THRESHOLD = float(os.getenv('MODERATION_THRESHOLD', 0.6))
+
+    # Seconds the random feed reuses its cached post count for 'total'/'pages'
+    FEED_COUNT_CACHE_SECONDS = float(os.getenv('FEED_COUNT_CACHE_SECONDS', 60))
     
     # SQLAlchemy pool settings to prevent lock timeouts
     SQLALCHEMY_ENGINE_OPTIONS = {
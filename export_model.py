@@ -0,0 +1,37 @@
+"""
+Export models/bully_model.h5 to models/bully_model.npz for the NumPy
+inference backend (DETECTOR_BACKEND=numpy).
+
+train_model.py runs this automatically; use it directly for an existing
+model. Check the result with benchmarks/check_backend_parity.py.
+"""
+import argparse
+import os
+
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # suppress TensorFlow info/warning logs
+
+from app.utils.artifacts import MODEL_DIR, MODEL_FILE, NUMPY_MODEL_FILE
+
+
+def export(model_dir=MODEL_DIR):
+    from tensorflow.keras.models import load_model
+    from app.utils.layers import SimpleAttention
+    from app.utils.numpy_backend import export_keras_model
+
+    model = load_model(os.path.join(model_dir, MODEL_FILE),
+                       compile=False,
+                       custom_objects={'SimpleAttention': SimpleAttention})
+    path = os.path.join(model_dir, NUMPY_MODEL_FILE)
+    export_keras_model(model, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    args = parser.parse_args()
+    print(f"✅ Wrote {export(args.model_dir)}")
+
+
+if __name__ == '__main__':
+    main()
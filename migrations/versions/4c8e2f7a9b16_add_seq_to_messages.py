@@ -0,0 +1,26 @@
+"""add seq to messages
+
+Revision ID: 4c8e2f7a9b16
+Revises: f6c1d3b8e527
+Create Date: 2026-10-18 16:21:07.553190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c8e2f7a9b16'
+down_revision = 'f6c1d3b8e527'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('seq', sa.BigInteger(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.drop_column('seq')
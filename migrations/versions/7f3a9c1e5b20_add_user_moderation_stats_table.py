@@ -0,0 +1,33 @@
+"""add user_moderation_stats table
+
+Run `python moderation_stats.py backfill` after upgrading to fill the
+counters from existing comments and messages.
+
+Revision ID: 7f3a9c1e5b20
+Revises: e5b2f8a1c7d4
+Create Date: 2026-10-18 11:48:05.114720
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7f3a9c1e5b20'
+down_revision = 'e5b2f8a1c7d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_moderation_stats',
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('bullying_comment_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('bullying_message_count', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('user_moderation_stats')
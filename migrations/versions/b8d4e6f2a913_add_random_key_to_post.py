@@ -0,0 +1,41 @@
+"""add random_key to Post for the random feed
+
+Revision ID: b8d4e6f2a913
+Revises: 7f3a9c1e5b20
+Create Date: 2026-10-18 12:30:44.802117
+
+"""
+import random
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d4e6f2a913'
+down_revision = '7f3a9c1e5b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('random_key', sa.Float(), nullable=True))
+
+    # Give existing posts a uniform key, in batches
+    conn = op.get_bind()
+    post = sa.table('post', sa.column('id', sa.String), sa.column('random_key', sa.Float))
+    ids = [row[0] for row in conn.execute(sa.select(post.c.id))]
+    update = post.update().where(post.c.id == sa.bindparam('post_id')).values(random_key=sa.bindparam('key'))
+    for start in range(0, len(ids), 1000):
+        conn.execute(update, [{'post_id': i, 'key': random.random()} for i in ids[start:start + 1000]])
+
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.alter_column('random_key', existing_type=sa.Float(), nullable=False)
+        batch_op.create_index(batch_op.f('ix_post_random_key'), ['random_key'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_post_random_key'))
+        batch_op.drop_column('random_key')
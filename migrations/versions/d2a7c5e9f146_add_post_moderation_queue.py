@@ -0,0 +1,57 @@
+"""add moderation verdict to Post and the moderation_job queue
+
+Run `python moderation_worker.py --enqueue-backlog` to classify existing posts.
+
+Revision ID: d2a7c5e9f146
+Revises: b8d4e6f2a913
+Create Date: 2026-10-18 13:21:09.447062
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a7c5e9f146'
+down_revision = 'b8d4e6f2a913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('is_bullying', sa.Boolean(), nullable=True))
+        batch_op.add_column(sa.Column('bullying_probability', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('model_version', sa.String(length=16), nullable=True))
+        batch_op.add_column(sa.Column('moderated_at', sa.DateTime(), nullable=True))
+
+    op.create_table('moderation_job',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('post_id', sa.String(length=36), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('enqueued_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('worker', sa.String(length=64), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['post_id'], ['post.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('moderation_job', schema=None) as batch_op:
+        batch_op.create_index('ix_moderation_job_status_id', ['status', 'id'], unique=False)
+        batch_op.create_index('ix_moderation_job_post_id', ['post_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('moderation_job', schema=None) as batch_op:
+        batch_op.drop_index('ix_moderation_job_post_id')
+        batch_op.drop_index('ix_moderation_job_status_id')
+
+    op.drop_table('moderation_job')
+
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_column('moderated_at')
+        batch_op.drop_column('model_version')
+        batch_op.drop_column('bullying_probability')
+        batch_op.drop_column('is_bullying')
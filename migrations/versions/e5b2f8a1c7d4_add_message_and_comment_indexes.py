@@ -0,0 +1,42 @@
+"""add composite indexes for message and comment queries
+
+Revision ID: e5b2f8a1c7d4
+Revises: c41e7a2b9d03
+Create Date: 2026-10-18 11:02:17.530964
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b2f8a1c7d4'
+down_revision = 'c41e7a2b9d03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.create_index('ix_messages_sender_receiver_timestamp', ['sender', 'receiver', 'timestamp'], unique=False)
+        batch_op.create_index('ix_messages_receiver_sender_timestamp', ['receiver', 'sender', 'timestamp'], unique=False)
+        batch_op.create_index('ix_messages_receiver_is_read_sender', ['receiver', 'is_read', 'sender'], unique=False)
+        batch_op.create_index('ix_messages_sender_is_bullying', ['sender', 'is_bullying'], unique=False)
+        batch_op.create_index('ix_messages_receiver_is_bullying', ['receiver', 'is_bullying'], unique=False)
+
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.create_index('ix_comment_post_id_created_at', ['post_id', 'created_at'], unique=False)
+        batch_op.create_index('ix_comment_user_id_is_bullying', ['user_id', 'is_bullying'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.drop_index('ix_comment_user_id_is_bullying')
+        batch_op.drop_index('ix_comment_post_id_created_at')
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.drop_index('ix_messages_receiver_is_bullying')
+        batch_op.drop_index('ix_messages_sender_is_bullying')
+        batch_op.drop_index('ix_messages_receiver_is_read_sender')
+        batch_op.drop_index('ix_messages_receiver_sender_timestamp')
+        batch_op.drop_index('ix_messages_sender_receiver_timestamp')
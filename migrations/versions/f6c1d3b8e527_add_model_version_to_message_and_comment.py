@@ -0,0 +1,34 @@
+"""add model_version to messages and comment, bullying_probability to comment
+
+Revision ID: f6c1d3b8e527
+Revises: d2a7c5e9f146
+Create Date: 2026-10-18 14:05:52.913378
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6c1d3b8e527'
+down_revision = 'd2a7c5e9f146'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('model_version', sa.String(length=16), nullable=True))
+
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('bullying_probability', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('model_version', sa.String(length=16), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.drop_column('model_version')
+        batch_op.drop_column('bullying_probability')
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.drop_column('model_version')
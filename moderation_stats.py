@@ -0,0 +1,49 @@
+"""
+Maintain the user_moderation_stats counters.
+
+    python moderation_stats.py backfill   # recount every user from comments/messages
+    python moderation_stats.py check      # report users whose counters drifted (exit 1 if any)
+    python moderation_stats.py check --fix
+
+Run backfill once after `flask db upgrade` adds the table. Writes that land
+while a backfill runs can be overwritten by the recount, so follow it with
+`check --fix` if the server was live.
+"""
+import argparse
+import sys
+import time
+
+from app import create_app
+from app.utils.moderation import backfill, find_mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['backfill', 'check'])
+    parser.add_argument('--fix', action='store_true', help='With check: recount the users that drifted')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        start = time.perf_counter()
+        if args.command == 'backfill':
+            rows = backfill()
+            print(f"✅ Backfilled counters for {rows} users in {time.perf_counter() - start:.2f}s")
+            return 0
+
+        mismatches = find_mismatches()
+        for user_id, stored, actual in mismatches:
+            print(f"⚠️ {user_id}: stored comments/messages {stored}, actual {actual}")
+        if not mismatches:
+            print(f"✅ All counters consistent ({time.perf_counter() - start:.2f}s)")
+            return 0
+        if args.fix:
+            backfill([user_id for user_id, _, _ in mismatches])
+            print(f"🔧 Fixed {len(mismatches)} users")
+            return 0
+        print(f"❌ {len(mismatches)} users out of sync (run with --fix)")
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Moderation worker: classifies queued posts in batches.
+
+    python moderation_worker.py                    # run until interrupted
+    python moderation_worker.py --enqueue-backlog  # first queue every unclassified post
+    python moderation_worker.py --once             # drain the queue, then exit
+
+Several workers may run at once; each claims its own batch of jobs. Every
+--report-every seconds it prints throughput, backlog and per-item latency
+(enqueue to verdict).
+"""
+import argparse
+import time
+from collections import deque
+
+from app import create_app
+from app.models import db
+from app.utils import detector
+from app.utils.moderation_queue import (
+    claim_batch, complete_batch, enqueue_backlog, fail_batch, queue_stats, requeue_stale, worker_name
+)
+from config import Config
+
+
+class WorkerStats:
+    def __init__(self, window=1000):
+        self.started = time.monotonic()
+        self.processed = 0
+        self.failed_batches = 0
+        self.latencies = deque(maxlen=window)  # seconds from enqueue to verdict
+
+    def record(self, jobs, finished_at):
+        self.processed += len(jobs)
+        self.latencies.extend((finished_at - enqueued_at).total_seconds() for _, _, enqueued_at, _ in jobs)
+
+    def report(self, backlog):
+        elapsed = time.monotonic() - self.started
+        latencies = sorted(self.latencies)
+        p50 = latencies[len(latencies) // 2] if latencies else 0.0
+        p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0.0
+        print(f"📊 processed {self.processed} ({self.processed / elapsed if elapsed else 0:.1f}/s), "
+              f"backlog {backlog['pending']} pending / {backlog['processing']} in progress / "
+              f"{backlog['failed']} failed, latency p50 {p50 * 1000:.0f} ms p95 {p95 * 1000:.0f} ms")
+
+
+def process_one_batch(worker, batch_size, stats):
+    jobs = claim_batch(worker, batch_size)
+    if not jobs:
+        return 0
+    try:
+        verdicts = detector.predict_batch([content for _, _, _, content in jobs],
+                                          threshold=Config.MODERATION_THRESHOLD)
+        finished_at = complete_batch(jobs, verdicts, verdicts[0]['model_version'])
+    except Exception as e:
+        print(f"❌ Moderation batch of {len(jobs)} failed: {e}")
+        stats.failed_batches += 1
+        fail_batch(jobs, e, Config.MODERATION_MAX_ATTEMPTS)
+        return len(jobs)
+    stats.record(jobs, finished_at)
+    return len(jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=Config.MODERATION_BATCH_SIZE)
+    parser.add_argument('--poll', type=float, default=Config.MODERATION_POLL_SECONDS, help='Seconds to sleep when idle')
+    parser.add_argument('--report-every', type=float, default=10.0)
+    parser.add_argument('--enqueue-backlog', action='store_true', help='Queue unclassified posts before starting')
+    parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+    args = parser.parse_args()
+
+    app = create_app()
+    worker = worker_name()
+    stats = WorkerStats()
+    with app.app_context():
+        detector.warmup()
+        if args.enqueue_backlog:
+            print(f"📥 Queued {enqueue_backlog(detector.MODEL_VERSION)} posts from the backlog")
+        print(f"👷 Moderation worker {worker} started (batch size {args.batch_size})")
+
+        last_report = time.monotonic()
+        last_requeue = float('-inf')  # reclaim jobs of dead workers right away
+        try:
+            while True:
+                now = time.monotonic()
+                if now - last_requeue >= Config.MODERATION_VISIBILITY_TIMEOUT / 2:
+                    requeue_stale(Config.MODERATION_VISIBILITY_TIMEOUT, Config.MODERATION_MAX_ATTEMPTS)
+                    last_requeue = now
+                if now - last_report >= args.report_every:
+                    stats.report(queue_stats())
+                    last_report = now
+
+                if process_one_batch(worker, args.batch_size, stats):
+                    continue
+                if args.once:
+                    break
+                time.sleep(args.poll)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stats.report(queue_stats())
+            db.session.remove()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""
+Re-score stored chat messages and comments with the model currently on disk.
+
+    python rescore.py [--tables messages,comment] [--workers 4] [--chunk-size 1000]
+
+Run it after train_model.py ships a new model. Rows are read in primary-key
+order, one chunk at a time (a keyset query streamed through a server-side
+cursor), so memory stays flat however large the tables are. Chunks are
+classified on a process pool through detector.predict_batch and written
+back with one bulk UPDATE per chunk, together with the model version that
+produced each verdict.
+
+The per-user bullying counters move in the same transaction as each chunk:
++1 for a row that becomes flagged, -1 for one that is no longer flagged. The
+chunk's rows are re-read (locked) inside that transaction, so the counters
+stay right while the server keeps recording new flags; there is no global
+recount at the end. Rows classified with the current model in the meantime
+are left alone.
+
+The job is resumable: rows that already carry the current model version are
+skipped, and the last finished primary key of each table is kept in a
+checkpoint file, so an interrupted run continues where it stopped.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from sqlalchemy import bindparam, or_, select
+
+from app import create_app
+from app.models import db, Message, Comment
+from app.utils import detector
+from app.utils.artifacts import model_version
+from app.utils.moderation import record_bullying
+
+TABLES = {'messages': Message, 'comment': Comment}
+DEFAULT_CHECKPOINT = os.path.join(tempfile.gettempdir(), 'cyberscan_rescore_checkpoint.json')
+
+
+# -----------------------------
+# Pool workers
+# -----------------------------
+_threshold = 0.6
+
+
+def _init_worker(threshold):
+    global _threshold
+    _threshold = threshold
+    detector.warmup()
+
+
+def _score_chunk(texts):
+    """(probability, label) per text, and the model version that produced them"""
+    results = detector.predict_batch(texts, threshold=_threshold)
+    return [(r['probability'], bool(r['label'])) for r in results], results[0]['model_version']
+
+
+class _InlineExecutor:
+    """--workers 0: score in this process"""
+
+    def __init__(self, threshold):
+        _init_worker(threshold)
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+# -----------------------------
+# Checkpoint
+# -----------------------------
+def load_checkpoint(path, version):
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {'model_version': version, 'tables': {}}
+    if state.get('model_version') != version:
+        print(f"🔁 Checkpoint is for model {state.get('model_version')} - starting over")
+        return {'model_version': version, 'tables': {}}
+    return state
+
+
+def save_checkpoint(path, state):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+# -----------------------------
+# Reading and writing chunks
+# -----------------------------
+def read_chunk(table, version, after_id, size):
+    """Next `size` rows after `after_id` (primary-key order) not yet scored by `version`"""
+    query = select(table.c.id, table.c.content).where(
+        or_(table.c.model_version.is_(None), table.c.model_version != version)
+    )
+    if after_id is not None:
+        query = query.where(table.c.id > after_id)
+    query = query.order_by(table.c.id).limit(size)
+    with db.engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=size).execute(query)
+        return [tuple(row) for row in result]
+
+
+def write_chunk(model, rows, scores, version):
+    """Write one chunk's verdicts and move its owners' counters by the flags that changed, in one transaction"""
+    table = model.__table__
+    owner = table.c.sender if model is Message else table.c.user_id
+    verdicts = {row_id: (float(probability), bool(label)) for (row_id, _), (probability, label) in zip(rows, scores)}
+    stmt = table.update().where(table.c.id == bindparam('r_id')).values(
+        is_bullying=bindparam('r_label'),
+        bullying_probability=bindparam('r_probability'),
+        model_version=bindparam('r_version'),
+    )
+    try:
+        # Current flags, locked until commit so a concurrent verdict cannot slip in between
+        current = db.session.execute(
+            select(table.c.id, owner, table.c.is_bullying, table.c.model_version)
+            .where(table.c.id.in_(list(verdicts))).with_for_update()
+        ).all()
+        params = []
+        deltas = Counter()
+        for row_id, who, was_flagged, row_version in current:
+            if row_version == version:
+                continue  # classified with this model since the chunk was read
+            probability, label = verdicts[row_id]
+            params.append({'r_id': row_id, 'r_label': label, 'r_probability': probability, 'r_version': version})
+            if who is not None and label != bool(was_flagged):
+                deltas[who] += 1 if label else -1
+        if params:
+            db.session.execute(stmt, params)
+        for who, delta in deltas.items():
+            if model is Message:
+                record_bullying(username=who, messages=delta)
+            else:
+                record_bullying(user_id=who, comments=delta)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def rescore_table(name, executor, version, state, args):
+    model = TABLES[name]
+    table = model.__table__
+    progress = state['tables'].setdefault(name, {'last_id': None, 'rows': 0, 'done': False})
+    if progress['done']:
+        print(f"⏭️ {name}: already rescored with model {version}")
+        return 0
+
+    start = last_report = time.perf_counter()
+    after_id = progress['last_id']
+    rows_done = 0
+    in_flight = deque()
+    exhausted = False
+    while True:
+        # Keep every worker busy, with chunks written back in key order
+        while not exhausted and len(in_flight) < args.max_in_flight:
+            rows = read_chunk(table, version, after_id, args.chunk_size)
+            if not rows:
+                exhausted = True
+                break
+            after_id = rows[-1][0]
+            in_flight.append((rows, executor.submit(_score_chunk, [content for _, content in rows])))
+        if not in_flight:
+            break
+
+        rows, future = in_flight.popleft()
+        scores, used_version = future.result()
+        if used_version != version:
+            raise RuntimeError(f"Model changed during the run ({version} -> {used_version}); run rescore again")
+        write_chunk(model, rows, scores, version)
+
+        rows_done += len(rows)
+        progress['last_id'] = rows[-1][0]
+        progress['rows'] += len(rows)
+        save_checkpoint(args.checkpoint, state)
+
+        now = time.perf_counter()
+        if now - last_report >= args.report_every:
+            print(f"   {name}: {progress['rows']} rows, {rows_done / (now - start):.0f} rows/s")
+            last_report = now
+
+    progress['done'] = True
+    save_checkpoint(args.checkpoint, state)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {name}: rescored {rows_done} rows in {elapsed:.1f}s "
+          f"({rows_done / elapsed if elapsed else 0:.0f} rows/s)")
+    return rows_done
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tables', default=','.join(TABLES), help='Comma-separated: ' + ', '.join(TABLES))
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help='Scoring processes (0 = score in this process)')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--max-in-flight', type=int, default=None, help='Chunks queued ahead (default: 2 per worker)')
+    parser.add_argument('--threshold', type=float, default=0.6)
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT)
+    parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint')
+    parser.add_argument('--report-every', type=float, default=10.0)
+    args = parser.parse_args()
+    args.max_in_flight = args.max_in_flight or 2 * max(1, args.workers)
+
+    tables = [t.strip() for t in args.tables.split(',') if t.strip()]
+    for name in tables:
+        if name not in TABLES:
+            parser.error(f"unknown table {name!r}")
+
+    version = model_version()
+    state = {'model_version': version, 'tables': {}} if args.restart else load_checkpoint(args.checkpoint, version)
+    print(f"🤖 Rescoring {', '.join(tables)} with model {version} ({args.workers} workers)")
+
+    app = create_app()
+    if args.workers:
+        executor = ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(args.threshold,))
+    else:
+        executor = _InlineExecutor(args.threshold)
+    try:
+        with app.app_context():
+            start = time.perf_counter()
+            total = sum(rescore_table(name, executor, version, state, args) for name in tables)
+            elapsed = time.perf_counter() - start
+            print(f"🏁 {total} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} rows/s)")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,4 +7,11 @@ app = create_app()
 # db.create_all() can cause lock issues in production
 
 if __name__ == '__main__':
+    # Load the detector in the background so the first message doesn't pay for it
+    from app.utils.detector import warmup
+    warmup(background=True)
+    if app.config['CHAT_PERSIST_MODE'] == 'write_behind':
+        # Replay what a crash left in the message journal before taking new messages
+        from app.utils.message_writer import message_writer
+        message_writer.start(app)
     socketio.run(app, debug=True, allow_unsafe_werkzeug=True)
\ No newline at end of file
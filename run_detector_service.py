@@ -0,0 +1,40 @@
+"""
+Run the detector as a local multi-process service.
+
+    python run_detector_service.py [--socket /tmp/cyberscan-detector.sock] [--workers 8] [--threads 1]
+
+Loads the model once and forks --workers processes that all serve the same
+Unix socket (see app/utils/detector_service.py). Point the app at it with
+DETECTOR_SERVICE_SOCKET; while the service is unreachable the app runs the
+detector in-process as before.
+"""
+import argparse
+import os
+
+from config import Config
+
+
+def configure_threads(threads):
+    """Limit BLAS/OpenMP threads per worker; must run before NumPy or TensorFlow is imported"""
+    for name in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'NUMEXPR_NUM_THREADS'):
+        os.environ[name] = str(threads)
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--socket', default=Config.DETECTOR_SERVICE_SOCKET or '/tmp/cyberscan-detector.sock')
+    parser.add_argument('--workers', type=int, default=Config.DETECTOR_SERVICE_WORKERS)
+    parser.add_argument('--threads', type=int, default=Config.DETECTOR_SERVICE_THREADS, help='Math threads per worker')
+    parser.add_argument('--no-pin', action='store_true', help='Do not pin each worker to its own core')
+    args = parser.parse_args()
+
+    configure_threads(args.threads)
+    from app.utils.detector_service import DetectorPool
+
+    DetectorPool(args.socket, args.workers, threads=args.threads, pin=not args.no_pin).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -92,7 +92,7 @@ def main():
     model_files = [
         'models/bully_model.h5',
         'models/tokenizer.json',
-        'cyberbullying_data.csv'
+        'models/lexicon.bin'
     ]
     
     all_exist = True
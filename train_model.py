@@ -10,7 +10,6 @@ from tensorflow.keras.models import Model
 from tensorflow.keras.preprocessing.text import Tokenizer # pyright: ignore[reportMissingImports]
 from tensorflow.keras.preprocessing.sequence import pad_sequences # type: ignore
 from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping # type: ignore
-import re
 
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # suppress TensorFlow info/warning logs
 
@@ -30,15 +29,10 @@ df = pd.read_csv("cyberbullying_data.csv")
 # -----------------------
 # Clean & Preprocess
 # -----------------------
-def clean_text(t):
-    t = t.lower()
-    t = re.sub(r'http\S+', ' ', t)            # remove urls
-    t = re.sub(r'@\w+', ' @user ', t)         # normalize mentions
-    t = re.sub(r'[^a-z0-9@#\s\!\?\.\,\'\u2600-\u27BF]+', ' ', t)  # keep basic punctuation and symbols/emojis range
-    t = re.sub(r'\s+', ' ', t).strip()
-    return t
+# Same normalisation as the detector uses at serving time
+from app.utils.text import clean_texts
 
-df['text_clean'] = df['text'].astype(str).apply(clean_text)
+df['text_clean'] = clean_texts(df['text'].astype(str))
 
 # -----------------------
 # Tokenizer
@@ -115,4 +109,13 @@ history = model.fit(X_train, y_train,
 
 # Save final model (Keras .h5)
 model.save(os.path.join(MODEL_DIR, "bully_model_final.h5"))
-print("Saved model and tokenizer in", MODEL_DIR)
+
+# Lean CPU export of the served (best) checkpoint for DETECTOR_BACKEND=numpy
+from export_model import export
+export(MODEL_DIR)
+
+# Precompiled lexicon, versioned against the training CSV it is built from
+from app.utils.lexicon import build_lexicon
+lexicon_header = build_lexicon("cyberbullying_data.csv", model_dir=MODEL_DIR)
+print(f"Saved lexicon with {lexicon_header['count']} words")
+print("Saved model, NumPy export, tokenizer and lexicon in", MODEL_DIR)